@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+比較用に残した変更前の変換処理(セルごとにDataFrameを作成して結合する)
+flatten_table_inf, flatten_data_catalogと時間を比べ, 結果が同じことを確認する
+
+author: WeLLiving@well-living
+"""
+
+import pandas as pd
+
+
+#%%
+def flatten_table_inf_loop(table_inf):
+    """
+    変更前のget_StatsListのTABLE_INFの展開. 文字列のTITLEのセルは結合されない.
+    """
+    TABLE_INF = pd.DataFrame(table_inf)
+    df_lt = [TABLE_INF]
+    for col in ('STAT_NAME', 'GOV_ORG', 'TITLE', 'MAIN_CATEGORY', 'SUB_CATEGORY',
+                'STATISTICS_NAME_SPEC', 'TITLE_SPEC'):
+        df_col = []
+        for i, dct in enumerate(TABLE_INF[col]):
+            if type(dct) == dict:
+                df_tmp = pd.DataFrame(dct, index=[i])
+                df_tmp.columns = [col + '_' + c for c in df_tmp.columns]
+                df_col += [df_tmp]
+        df_lt += [pd.concat(df_col, axis=0)]
+    TABLE_INF = pd.concat(df_lt, axis=1)
+    return TABLE_INF.drop(['STAT_NAME', 'GOV_ORG', 'TITLE', 'MAIN_CATEGORY', 'SUB_CATEGORY',
+                           'STATISTICS_NAME_SPEC', 'TITLE_SPEC'], axis=1)
+
+def flatten_data_catalog_loop(data_catalog_inf):
+    """
+    変更前のget_estat_DataCatalogのDATASETの展開.
+    """
+    DATA_CATALOG_INF = pd.DataFrame(data_catalog_inf)
+    DATASET = []
+    for i, dct in enumerate(DATA_CATALOG_INF['DATASET']):
+        df_lt = []
+        tmp_lt = []
+        for key, value in dct.items():
+            if type(value) == dict:
+                df_tmp1 = pd.DataFrame(value, index=[i])
+                df_tmp1.columns = [key + '_' + c1 for c1 in df_tmp1.columns]
+                df_lt += [df_tmp1]
+            else:
+                tmp_lt += [[key, value]]
+            df_tmp1 = pd.concat(df_lt, axis=1)
+            df_tmp2 = pd.DataFrame(tmp_lt, columns=['key', i])
+            df_tmp2 = df_tmp2.set_index('key')
+            df_tmp2 = df_tmp2.T
+        DATASET += [pd.concat([df_tmp1, df_tmp2], axis=1)]
+    return pd.concat(DATASET, axis=0)
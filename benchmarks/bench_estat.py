@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+eStatReaderの変換処理のベンチマーク(asv形式)
+APIにはリクエストせず, fpy_datareader.testingで生成したレスポンスを使う
+
+author: WeLLiving@well-living
+"""
+
+import contextlib
+import io
+import json
+import math
+
+from benchmarks.baseline import flatten_data_catalog_loop, flatten_table_inf_loop
+from fpy_datareader.estat import eStatReader, flatten_data_catalog, flatten_table_inf
+from fpy_datareader.testing import make_data_catalog, make_stats_data, make_stats_list
+
+
+#%%
+class OfflineReader(eStatReader):
+    """
+    _get_jsonが生成済みのレスポンスを返すeStatReader.
+    """
+    def __init__(self, payloads):
+        super().__init__('benchmark')
+        self.payloads = payloads
+
+    def _get_json(self, endpoint, params):
+        return self.payloads[endpoint]
+
+
+def stats_data_shape(rows):
+    # 表章項目2 × 分類10 × 地域48 × 時間軸で約rows件
+    return {'tab': 2, 'cat01': 10, 'area': 48, 'time': max(1, math.ceil(rows / 960))}
+
+#%%
+class StatsData:
+    params = [10000, 100000]
+    param_names = ['rows']
+    number = 1
+    repeat = 3
+    timeout = 600
+
+    def setup(self, rows):
+        jsn = make_stats_data(stats_data_shape(rows), n_rows=rows)
+        self.content = json.dumps(jsn, ensure_ascii=False).encode('utf-8')
+        self.reader = OfflineReader({})
+        self.reader.statsDataId = '0000000001'
+        self.reader.json = jsn
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.reader.estat_json_to_df()
+        self.data_value = self.reader.data_value
+
+    def time_decode(self, rows):
+        json.loads(self.content)
+
+    def time_estat_json_check(self, rows):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.reader.estat_json_check()
+
+    def time_estat_json_to_df(self, rows):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.reader.estat_json_to_df()
+
+    def time_estat_json_to_df_typed(self, rows):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.reader.estat_json_to_df(typed=True)
+
+    def time_tab_pivot(self, rows):
+        self.reader.data_value = self.data_value
+        self.reader.tab_pivot()
+
+    def time_tab_pivot_numeric(self, rows):
+        self.reader.data_value = self.data_value
+        self.reader.tab_pivot(to_numeric=True)
+
+    def peakmem_estat_json_to_df(self, rows):
+        self.time_estat_json_to_df(rows)
+
+    def peakmem_tab_pivot(self, rows):
+        self.time_tab_pivot(rows)
+
+#%%
+class StatsList:
+    params = [180000]
+    param_names = ['tables']
+    number = 1
+    repeat = 3
+    timeout = 600
+
+    def setup(self, tables):
+        jsn = make_stats_list(tables)
+        self.content = json.dumps(jsn, ensure_ascii=False).encode('utf-8')
+        self.reader = OfflineReader({'getStatsList': jsn})
+
+    def time_decode(self, tables):
+        json.loads(self.content)
+
+    def time_get_StatsList(self, tables):
+        self.reader.get_StatsList()
+
+    def peakmem_get_StatsList(self, tables):
+        self.reader.get_StatsList()
+
+#%%
+class FlattenTableInf:
+    # 変更前(セルごとのDataFrame)との比較. 変更前は18万件では数分かかるため件数を減らす
+    params = [1000, 10000]
+    param_names = ['tables']
+    number = 1
+    repeat = 3
+    timeout = 600
+
+    def setup(self, tables):
+        self.table_inf = make_stats_list(tables)['GET_STATS_LIST']['DATALIST_INF']['TABLE_INF']
+
+    def time_flatten_table_inf(self, tables):
+        flatten_table_inf(self.table_inf)
+
+    def time_flatten_table_inf_baseline(self, tables):
+        flatten_table_inf_loop(self.table_inf)
+
+#%%
+class DataCatalog:
+    params = [100]
+    param_names = ['datasets']
+    number = 1
+    repeat = 3
+
+    def setup(self, datasets):
+        jsn = make_data_catalog(datasets)
+        self.reader = OfflineReader({'getDataCatalog': jsn})
+        self.data_catalog_inf = jsn['GET_DATA_CATALOG']['DATA_CATALOG_LIST_INF']['DATA_CATALOG_INF']
+
+    def time_get_estat_DataCatalog(self, datasets):
+        self.reader.get_estat_DataCatalog()
+
+    def time_flatten_data_catalog(self, datasets):
+        flatten_data_catalog(self.data_catalog_inf)
+
+    def time_flatten_data_catalog_baseline(self, datasets):
+        flatten_data_catalog_loop(self.data_catalog_inf)
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""
+import時間のベンチマーク(asvのtimeraw形式, 新しいPythonプロセスで計測)
+
+author: WeLLiving@well-living
+"""
+
+
+#%%
+class ImportTime:
+    def timeraw_import_fpy_datareader(self):
+        return 'import fpy_datareader'
+
+    def timeraw_import_estat(self):
+        return 'from fpy_datareader.estat import eStatReader'
+
+    def timeraw_import_estat_async(self):
+        return 'from fpy_datareader.estat_async import AsyncEStatReader'
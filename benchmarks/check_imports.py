@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+import fpy_datareaderとeStatReaderの参照が重い依存パッケージ(pandas, numpy, requests, pyarrow等)を
+読み込まずに終わることと, 読み込み時間が上限以下であることを新しいPythonプロセスで確認する
+
+    python -m benchmarks.check_imports --max-seconds 0.1
+
+author: WeLLiving@well-living
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+
+#%%
+HEAVY_MODULES = ('pandas', 'numpy', 'requests', 'pyarrow', 'ijson', 'aiohttp')
+
+# 新しいプロセスで実行するコード
+STATEMENTS = {
+    'import fpy_datareader': 'import fpy_datareader',
+    'fpy_datareader.eStatReader': 'import fpy_datareader; fpy_datareader.eStatReader',
+    'from fpy_datareader.estat import eStatReader': 'from fpy_datareader.estat import eStatReader',
+    'from fpy_datareader.estat_async import AsyncEStatReader': 'from fpy_datareader.estat_async import AsyncEStatReader',
+}
+
+SCRIPT = '''
+import json, time
+start = time.perf_counter()
+%s
+elapsed = time.perf_counter() - start
+from fpy_datareader.lazy import is_loaded
+print(json.dumps({'elapsed': elapsed, 'loaded': [m for m in %r if is_loaded(m)]}))
+'''
+
+
+def measure(statement, repeat=5):
+    """
+    statementを新しいPythonプロセスでrepeat回実行し, 最短の時間(秒)と読み込まれた重い依存パッケージを返す.
+    """
+    results = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', SCRIPT % (statement, HEAVY_MODULES)],
+                             check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    return min(r['elapsed'] for r in results), results[0]['loaded']
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='import時間の確認')
+    parser.add_argument('--max-seconds', type=float, default=0.1, help='読み込み時間の上限(秒)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+    failed = False
+    for name, statement in STATEMENTS.items():
+        elapsed, loaded = measure(statement, args.repeat)
+        ok = (not loaded) and (elapsed <= args.max_seconds)
+        failed |= not ok
+        print('%-4s %-58s %7.1fms %s' % ('OK' if ok else 'FAIL', name, elapsed * 1000,
+                                          ('loaded: ' + ', '.join(loaded)) if loaded else ''))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
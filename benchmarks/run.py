@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+asvを使わずにbench_estatのベンチマークを実行し, 処理ごとの時間とメモリ(tracemalloc)を表示する
+
+    python -m benchmarks.run
+    python -m benchmarks.run --rows 1000000 --tables 180000 --repeat 5 -k tab_pivot
+
+author: WeLLiving@well-living
+"""
+
+import argparse
+import gc
+import statistics
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks import bench_estat
+
+
+#%%
+def measure(bench, name, param, repeat=3):
+    """
+    bench.<name>(param)をrepeat回実行し, 時間(秒)の最小値・中央値と
+    1回目の実行中に確保したメモリの最大値(MB)を返す.
+    メモリはtracemallocで追跡できるもの(Pythonオブジェクト, numpy配列)のみ.
+    """
+    func = getattr(bench, name)
+    times = []
+    for i in range(repeat):
+        gc.collect()
+        if i == 0:
+            tracemalloc.start()
+        start = time.perf_counter()
+        func(param)
+        elapsed = time.perf_counter() - start
+        if i == 0:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        else:
+            # tracemallocを有効にした1回目は遅くなるため時間には含めない
+            times.append(elapsed)
+    if not times:
+        times = [elapsed]
+    return {'min_s': min(times), 'median_s': statistics.median(times), 'peak_mb': peak / 1024 ** 2}
+
+def run(params, repeat=3, keyword=None):
+    results = []
+    for cls in (bench_estat.StatsData, bench_estat.StatsList, bench_estat.FlattenTableInf, bench_estat.DataCatalog):
+        names = [name for name in dir(cls) if name.startswith('time_')]
+        if keyword is not None:
+            names = [name for name in names if keyword in name]
+        if not names:
+            continue
+        for param in params.get(cls.__name__, cls.params):
+            bench = cls()
+            start = time.perf_counter()
+            bench.setup(param)
+            print('%s(%s) setup %.2fs' % (cls.__name__, param, time.perf_counter() - start))
+            for name in names:
+                result = measure(bench, name, param, repeat + 1)
+                result.update({'benchmark': cls.__name__ + '.' + name[len('time_'):], 'param': param})
+                print('  %-40s %8.3fs %8.1fMB' % (result['benchmark'], result['median_s'], result['peak_mb']))
+                results.append(result)
+    return pd.DataFrame(results, columns=['benchmark', 'param', 'min_s', 'median_s', 'peak_mb'])
+
+#%%
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=bench_estat.StatsData.params,
+                        help='getStatsDataの件数')
+    parser.add_argument('--tables', type=int, nargs='+', default=bench_estat.StatsList.params,
+                        help='getStatsListの統計表数')
+    parser.add_argument('--baseline-tables', type=int, nargs='+', default=bench_estat.FlattenTableInf.params,
+                        help='変更前の処理と比べるgetStatsListの統計表数')
+    parser.add_argument('--datasets', type=int, nargs='+', default=bench_estat.DataCatalog.params,
+                        help='getDataCatalogのデータセット数')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('-k', '--keyword', help='名前にkeywordを含むベンチマークだけ実行')
+    parser.add_argument('--csv', help='結果を保存するCSVファイル')
+    args = parser.parse_args(argv)
+    params = {'StatsData': args.rows, 'StatsList': args.tables, 'FlattenTableInf': args.baseline_tables, 
+              'DataCatalog': args.datasets}
+    results = run(params, args.repeat, args.keyword)
+    if args.csv:
+        results.to_csv(args.csv, index=False)
+    return results
+
+
+if __name__ == '__main__':
+    main()
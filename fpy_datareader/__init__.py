@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+FPy DataReader
+
+サブモジュールと主なクラスは最初にアクセスしたときに読み込む.
+
+author: WeLLiving@well-living
+"""
+
+import importlib
+
+
+_SUBMODULES = (
+    'cache', 'catalog', 'data', 'estat', 'estat_async', 'fake_server',
+    'instrument', 'lazy', 'parquet', 'ratelimit', 'singleflight', 'testing',
+)
+
+# 名前: 定義しているサブモジュール
+_ATTRIBUTES = {
+    'eStatReader': 'estat',
+    'estatReader': 'estat',
+    'DataReader': 'data',
+    'AsyncEStatReader': 'estat_async',
+    'FileCache': 'cache',
+    'CatalogStore': 'catalog',
+    'StageStats': 'instrument',
+    'SingleFlight': 'singleflight',
+    'TokenBucket': 'ratelimit',
+    'FileTokenBucket': 'ratelimit',
+}
+
+__all__ = list(_SUBMODULES) + list(_ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module('.' + name, __name__)
+    if name in _ATTRIBUTES:
+        value = getattr(importlib.import_module('.' + _ATTRIBUTES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
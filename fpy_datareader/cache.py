@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+e-StatAPIのレスポンスをディスクにキャッシュする
+
+author: WeLLiving@well-living
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+#%%
+def request_key(endpoint, params):
+    """
+    リクエストを正規化したキャッシュキーを返す.
+
+    Parameters
+    ----------
+    endpoint : string
+        リクエスト先のURL(クエリ文字列を除く).
+    params : dict
+        リクエストパラメータ. appIdとNoneの値は無視する.
+
+    Returns
+    -------
+    key : string
+        エンドポイントとソート済みパラメータから計算したSHA-256のハッシュ値.
+    """
+    items = sorted((str(k), str(v)) for k, v in params.items()
+                   if (k != 'appId') and (v is not None))
+    canonical = json.dumps([endpoint.rstrip('?'), items], ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+#%%
+class FileCache:
+    def __init__(self, directory, ttl=None, max_size=1024 ** 3, compresslevel=6, evict_every=1000):
+        """
+        レスポンス本文をgzip圧縮してディスクに保存するキャッシュ.
+        書き込みは一時ファイルからのrenameで行うため, 複数プロセスで同じ
+        ディレクトリを共有できる.
+
+        Parameters
+        ----------
+        directory : string
+            キャッシュファイルを保存するディレクトリ.
+        ttl : int, float
+            有効期間(秒). Noneの場合は期限なし. The default is None.
+        max_size : int
+            キャッシュ全体の上限サイズ(バイト). 超えた場合は最終参照が古いものから削除.
+            The default is 1GiB.
+        compresslevel : int
+            gzipの圧縮レベル. The default is 6.
+        evict_every : int
+            書き込みごとにはディレクトリを走査せず, 合計サイズの見積もりが上限を超えた場合と
+            evict_every回の書き込みごとに走査して削除する(他のプロセスの書き込み, 期限切れを反映). 
+            The default is 1000.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self.compresslevel = compresslevel
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        # 複数のスレッドで共有するため, 件数と合計サイズの見積もりはロックの中で更新する
+        self._lock = threading.Lock()
+        self._size = None
+        self._writes = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.gz')
+
+    def get(self, key):
+        """
+        キャッシュからレスポンス本文を取得. 存在しない, または期限切れの場合はNone.
+        """
+        path = self._path(key)
+        try:
+            mtime = os.path.getmtime(path)
+            if (self.ttl is not None) and (time.time() - mtime > self.ttl):
+                os.remove(path)
+                raise FileNotFoundError(path)
+            with gzip.open(path, 'rb') as f:
+                content = f.read()
+        except (FileNotFoundError, EOFError, OSError):
+            with self._lock:
+                self.misses += 1
+            return None
+        # mtimeは保存時刻(TTLの基準)のまま, atimeを最終参照時刻(LRUの基準)に更新
+        try:
+            os.utime(path, (time.time(), mtime))
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return content
+
+    def __contains__(self, key):
+        """
+        キャッシュに期限内のレスポンス本文があるか(本文は読み込まない).
+        """
+        try:
+            mtime = os.path.getmtime(self._path(key))
+        except OSError:
+            return False
+        return (self.ttl is None) or (time.time() - mtime <= self.ttl)
+
+    def set(self, key, content):
+        """
+        レスポンス本文をキャッシュに保存.
+        """
+        with self.writer(key) as f:
+            f.write(content)
+
+    def writer(self, key):
+        """
+        レスポンス本文を少しずつ書き込んで保存するファイルオブジェクト(CacheWriter).
+        withを抜けるか, commit()で保存する. 例外で抜けた場合とdiscard()では保存しない.
+        """
+        return CacheWriter(self, key)
+
+    def _written(self, size, old_size):
+        with self._lock:
+            self._writes += 1
+            scan = (self._size is None) or (self._writes % self.evict_every == 0)
+            if self._size is not None:
+                self._size += size - old_size
+            over = (self.max_size is not None) and (self._size is not None) and (self._size > self.max_size)
+        if scan or over:
+            self.evict()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.gz'):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+        with self._lock:
+            self._size = 0
+
+    def evict(self):
+        """
+        期限切れのファイルを削除し, 上限サイズを超えている場合は最終参照が古い順に削除.
+        """
+        now = time.time()
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.gz'):
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            if (self.ttl is not None) and (now - st.st_mtime > self.ttl):
+                self._remove(entry.path)
+                continue
+            entries.append((st.st_atime, st.st_size, entry.path))
+            total += st.st_size
+        if (self.max_size is not None) and (total > self.max_size):
+            for _, size, path in sorted(entries):
+                self._remove(path)
+                total -= size
+                if total <= self.max_size:
+                    break
+        with self._lock:
+            self._size = total
+
+    @staticmethod
+    def _remove(path):
+        # 他のプロセスが先に削除している場合がある
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        """
+        ヒット数, ミス数, ヒット率を辞書型で返す.
+        """
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+        }
+
+#%%
+class CacheWriter:
+    def __init__(self, cache, key):
+        """
+        FileCacheの一時ファイルにgzip圧縮しながら書き込み, commit()で
+        キャッシュファイルにrenameする. FileCache.writerで作成する.
+
+        Parameters
+        ----------
+        cache : FileCache
+            保存先のキャッシュ.
+        key : string
+            キャッシュキー.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.cache = cache
+        self.path = cache._path(key)
+        fd, self.tmp_path = tempfile.mkstemp(dir=cache.directory, suffix='.tmp')
+        self._raw = os.fdopen(fd, 'wb')
+        self._fp = gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=cache.compresslevel)
+        self.closed = False
+
+    def write(self, data):
+        return self._fp.write(data)
+
+    def _close(self):
+        self.closed = True
+        try:
+            self._fp.close()
+        finally:
+            self._raw.close()
+
+    def commit(self):
+        """
+        書き込んだ内容をキャッシュに保存.
+        """
+        if self.closed:
+            return
+        try:
+            self._close()
+            size = os.path.getsize(self.tmp_path)
+            try:
+                old_size = os.path.getsize(self.path)
+            except OSError:
+                old_size = 0
+            os.replace(self.tmp_path, self.path)
+        except BaseException:
+            FileCache._remove(self.tmp_path)
+            raise
+        self.cache._written(size, old_size)
+
+    def discard(self):
+        """
+        書き込んだ内容を保存せずに一時ファイルを削除. commit()後は何もしない.
+        """
+        if self.closed:
+            return
+        try:
+            self._close()
+        finally:
+            FileCache._remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
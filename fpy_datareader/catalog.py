@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+e-Statの統計表情報(統計表情報取得API)をSQLiteに保存して検索する
+
+author: WeLLiving@well-living
+"""
+
+import sqlite3
+import threading
+
+from fpy_datareader.lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+
+#%%
+# flatten_table_infで展開したTABLE_INFの列
+CATALOG_COLUMNS = (
+    '@id', 'STAT_NAME_@code', 'STAT_NAME_$', 'GOV_ORG_@code', 'GOV_ORG_$',
+    'STATISTICS_NAME', 'TITLE_@no', 'TITLE_$', 'CYCLE', 'SURVEY_DATE', 'OPEN_DATE',
+    'SMALL_AREA', 'COLLECT_AREA', 'MAIN_CATEGORY_@code', 'MAIN_CATEGORY_$',
+    'SUB_CATEGORY_@code', 'SUB_CATEGORY_$', 'OVERALL_TOTAL_NUMBER', 'UPDATED_DATE',
+    'STATISTICS_NAME_SPEC_TABULATION_CATEGORY',
+    'STATISTICS_NAME_SPEC_TABULATION_SUB_CATEGORY1',
+    'STATISTICS_NAME_SPEC_TABULATION_SUB_CATEGORY2',
+    'STATISTICS_NAME_SPEC_TABULATION_SUB_CATEGORY3',
+    'STATISTICS_NAME_SPEC_TABULATION_SUB_CATEGORY4',
+    'STATISTICS_NAME_SPEC_TABULATION_SUB_CATEGORY5',
+    'DESCRIPTION', 'TITLE_SPEC_TABLE_CATEGORY', 'TITLE_SPEC_TABLE_NAME',
+    'TITLE_SPEC_TABLE_EXPLANATION', 'TITLE_SPEC_TABLE_SUB_CATEGORY1',
+    'TITLE_SPEC_TABLE_SUB_CATEGORY2', 'TITLE_SPEC_TABLE_SUB_CATEGORY3',
+)
+
+# 全文検索の対象(タイトル, 統計名, 統計調査名・表題の詳細)
+FTS_COLUMNS = {
+    'title': ('TITLE_$',),
+    'statistics_name': ('STATISTICS_NAME', 'STAT_NAME_$'),
+    'spec': tuple(col for col in CATALOG_COLUMNS
+                  if col.startswith('STATISTICS_NAME_SPEC_') or col.startswith('TITLE_SPEC_')),
+}
+
+# B-treeインデックスを作成する列
+INDEX_COLUMNS = (
+    'GOV_ORG_@code', 'GOV_ORG_$', 'MAIN_CATEGORY_@code', 'MAIN_CATEGORY_$',
+    'SUB_CATEGORY_@code', 'CYCLE', 'SURVEY_DATE',
+)
+
+
+def _quote(col):
+    return '"%s"' % col
+
+def _bigrams(text):
+    """
+    2文字以下の語句を検索するための文字bigram(空白区切り). 
+    語の末尾の1文字も加えるため, 1文字の語句は前方一致で検索できる.
+    """
+    tokens = []
+    for word in (text or '').split():
+        tokens += [word[i:i + 2] for i in range(len(word) - 1)]
+        tokens.append(word[-1])
+    return ' '.join(tokens)
+
+def _bigram_phrase(term):
+    """
+    語句をbigramの連続(FTS5のフレーズ)にする. tables_bigramで部分一致を検索できる.
+    """
+    return ' '.join(term[i:i + 2] for i in range(len(term) - 1))
+
+
+#%%
+class CatalogStore:
+    def __init__(self, path='estat_catalog.sqlite3'):
+        """
+        統計表情報を保存するSQLiteデータベース.
+        タイトル, 統計名, 詳細(SPEC)の全文検索インデックス(FTS5)と,
+        作成機関, 分野, 周期, 調査年月のB-treeインデックスを持つ.
+        trigramが使えないSQLite(3.34より前)では, すべての語句を文字bigramのインデックスで検索する(trigram=False).
+
+        Parameters
+        ----------
+        path : string
+            SQLiteファイルのパス. ':memory:'の場合はメモリ上に作成.
+            The default is 'estat_catalog.sqlite3'.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            # 検索中も更新できるようにWALモードにする
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._lock = threading.Lock()
+        self.conn.create_function('bigrams', 1, _bigrams, deterministic=True)
+        self._create()
+
+    def close(self):
+        self.conn.close()
+
+    def _create(self):
+        columns = ', '.join(
+            _quote(col) + (' INTEGER' if col == 'OVERALL_TOTAL_NUMBER' else ' TEXT')
+            for col in CATALOG_COLUMNS
+        )
+        with self.conn:
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS tables ('
+                'rowid INTEGER PRIMARY KEY, %s, UNIQUE ("@id"))' % columns
+            )
+            for col in INDEX_COLUMNS:
+                name = 'idx_tables_' + ''.join(c for c in col if c.isalnum() or c == '_')
+                self.conn.execute(
+                    'CREATE INDEX IF NOT EXISTS %s ON tables (%s)' % (name, _quote(col))
+                )
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS catalog_meta (key TEXT PRIMARY KEY, value TEXT)'
+            )
+            exists = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'tables_fts'"
+            ).fetchone()
+            if not exists:
+                # 日本語は分かち書きされないため部分一致ができるtrigramを使う(SQLite 3.34以降)
+                try:
+                    self.conn.execute(
+                        "CREATE VIRTUAL TABLE tables_fts USING fts5(%s, tokenize='trigram')"
+                        % ', '.join(FTS_COLUMNS)
+                    )
+                except sqlite3.OperationalError:
+                    self.conn.execute(
+                        'CREATE VIRTUAL TABLE tables_fts USING fts5(%s)' % ', '.join(FTS_COLUMNS)
+                    )
+            # trigramがない場合(unicode61)は日本語の部分一致ができないため, すべての語句をbigramで検索する
+            sql = self.conn.execute(
+                "SELECT sql FROM sqlite_master WHERE name = 'tables_fts'"
+            ).fetchone()[0]
+            self.trigram = 'trigram' in sql
+            exists = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'tables_bigram'"
+            ).fetchone()
+            if not exists:
+                # trigramで検索できない2文字以下の語句(人口, 賃金等)の全文検索インデックス
+                self.conn.execute(
+                    'CREATE VIRTUAL TABLE tables_bigram USING fts5(text)'
+                )
+                self.conn.execute(
+                    'INSERT INTO tables_bigram (rowid, text) SELECT rowid, bigrams(%s) FROM tables'
+                    % self._fts_text()
+                )
+
+    @staticmethod
+    def _fts_text():
+        """
+        全文検索の対象の列を空白区切りで連結するSQL式.
+        """
+        return " || ' ' || ".join(
+            "coalesce(%s, '')" % _quote(col) for cols in FTS_COLUMNS.values() for col in cols
+        )
+
+    def get_meta(self, key, default=None):
+        """
+        同期日時等の管理情報を取得する.
+        """
+        with self._lock:
+            row = self.conn.execute('SELECT value FROM catalog_meta WHERE key = ?', (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def set_meta(self, key, value):
+        with self._lock, self.conn:
+            self.conn.execute(
+                'INSERT INTO catalog_meta VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value',
+                (key, str(value)),
+            )
+
+    def upsert(self, TABLE_INF):
+        """
+        統計表情報を追加・更新する(統計表ID '@id'が同じものは上書き).
+
+        Parameters
+        ----------
+        TABLE_INF : pandas.core.frame.DataFrame
+            flatten_table_infで展開した統計表情報.
+
+        Returns
+        -------
+        count : int
+            追加・更新した件数.
+        """
+        if TABLE_INF.shape[0] == 0:
+            return 0
+        df = TABLE_INF.reindex(columns=list(CATALOG_COLUMNS)).astype(object)
+        df = df.where(df.notna(), None)
+        rows = list(map(tuple, df.to_numpy()))
+        placeholders = ', '.join('?' * len(CATALOG_COLUMNS))
+        updates = ', '.join(
+            '%s = excluded.%s' % (_quote(col), _quote(col)) for col in CATALOG_COLUMNS[1:]
+        )
+        fts_values = ', '.join(
+            " || ' ' || ".join("coalesce(%s, '')" % _quote(col) for col in cols)
+            for cols in FTS_COLUMNS.values()
+        )
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT INTO tables (%s) VALUES (%s) ON CONFLICT ("@id") DO UPDATE SET %s'
+                % (', '.join(_quote(col) for col in CATALOG_COLUMNS), placeholders, updates),
+                rows,
+            )
+            # 更新した統計表の全文検索インデックスを洗い替える
+            self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS _upsert_ids (id TEXT PRIMARY KEY)')
+            self.conn.execute('DELETE FROM _upsert_ids')
+            self.conn.executemany('INSERT OR IGNORE INTO _upsert_ids VALUES (?)', [(row[0],) for row in rows])
+            self.conn.execute(
+                'DELETE FROM tables_fts WHERE rowid IN '
+                '(SELECT rowid FROM tables WHERE "@id" IN (SELECT id FROM _upsert_ids))'
+            )
+            self.conn.execute(
+                'INSERT INTO tables_fts (rowid, %s) SELECT rowid, %s FROM tables '
+                'WHERE "@id" IN (SELECT id FROM _upsert_ids)' % (', '.join(FTS_COLUMNS), fts_values)
+            )
+            self.conn.execute(
+                'DELETE FROM tables_bigram WHERE rowid IN '
+                '(SELECT rowid FROM tables WHERE "@id" IN (SELECT id FROM _upsert_ids))'
+            )
+            self.conn.execute(
+                'INSERT INTO tables_bigram (rowid, text) SELECT rowid, bigrams(%s) FROM tables '
+                'WHERE "@id" IN (SELECT id FROM _upsert_ids)' % self._fts_text()
+            )
+            self.conn.execute('DELETE FROM _upsert_ids')
+        return len(rows)
+
+    def search(self, query=None, gov_org=None, main_category=None, sub_category=None,
+               cycle=None, survey_date=None, limit=100):
+        """
+        統計表情報を検索する.
+
+        Parameters
+        ----------
+        query : string
+            タイトル, 統計名, 詳細(SPEC)から検索する語句. 空白区切りで複数指定した場合はAND検索.
+        gov_org : string
+            作成機関のコードまたは名称.
+        main_category : string
+            分野(大分類)のコードまたは名称.
+        sub_category : string
+            分野(小分類)のコードまたは名称.
+        cycle : string
+            周期('年次', '月次'等).
+        survey_date : string, int
+            調査年月. 前方一致('2020'は'202001'等も含む).
+        limit : int
+            最大件数. Noneの場合はすべて. The default is 100.
+
+        Returns
+        -------
+        TABLE_INF : pandas.core.frame.DataFrame
+            条件に一致した統計表情報(flatten_table_infと同じ列).
+        """
+        sql, params = self._search_sql(query, gov_org, main_category, sub_category, cycle, survey_date, limit)
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return pd.DataFrame(rows, columns=list(CATALOG_COLUMNS))
+
+    def _search_sql(self, query=None, gov_org=None, main_category=None, sub_category=None,
+                    cycle=None, survey_date=None, limit=100):
+        where = []
+        params = []
+        if query:
+            for term in str(query).split():
+                phrase = '"%s"' % term.replace('"', '""')
+                if (len(term) >= 3) and self.trigram:
+                    # trigramは3文字以上の語句で全文検索インデックスを使える
+                    where.append('t.rowid IN (SELECT rowid FROM tables_fts WHERE tables_fts MATCH ?)')
+                    params.append(phrase)
+                elif len(term) >= 3:
+                    # 連続するbigramの一致
+                    where.append('t.rowid IN (SELECT rowid FROM tables_bigram WHERE tables_bigram MATCH ?)')
+                    params.append('"%s"' % _bigram_phrase(term).replace('"', '""'))
+                else:
+                    # 2文字はbigramの一致, 1文字はbigramの前方一致
+                    where.append('t.rowid IN (SELECT rowid FROM tables_bigram WHERE tables_bigram MATCH ?)')
+                    params.append(phrase if len(term) == 2 else phrase + ' *')
+        for value, code_col, name_col in (
+            (gov_org, 'GOV_ORG_@code', 'GOV_ORG_$'),
+            (main_category, 'MAIN_CATEGORY_@code', 'MAIN_CATEGORY_$'),
+            (sub_category, 'SUB_CATEGORY_@code', 'SUB_CATEGORY_$'),
+        ):
+            if value is not None:
+                where.append('(t.%s = ? OR t.%s = ?)' % (_quote(code_col), _quote(name_col)))
+                params += [str(value), str(value)]
+        if cycle is not None:
+            where.append('t."CYCLE" = ?')
+            params.append(str(cycle))
+        if survey_date is not None:
+            prefix = str(survey_date)
+            where.append('t."SURVEY_DATE" >= ? AND t."SURVEY_DATE" < ?')
+            params += [prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)]
+        sql = 'SELECT %s FROM tables t' % ', '.join('t.' + _quote(col) for col in CATALOG_COLUMNS)
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY t."@id"'
+        if limit is not None:
+            sql += ' LIMIT %d' % int(limit)
+        return sql, params
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM tables').fetchone()[0]
@@ -1,7 +1,16 @@
+# -*- coding: utf-8 -*-
+"""
+pandas-datareader形式のインターフェース
 
+    df = DataReader(['0003411172', '0003411173'], 'estat', api_key=appId)
+
+author: WeLLiving@well-living
+"""
 
 from fpy_datareader.estat import estatReader
 
+
+#%%
 def DataReader(
     name,
     data_source=None,
@@ -11,7 +20,43 @@ def DataReader(
     pause=0.1,
     session=None,
     api_key=None,
+    chunksize=25,
+    max_workers=4,
+    output='concat',
+    **kwargs
 ):
+    """
+    data_sourceからnameのデータを取得する.
+
+    Parameters
+    ----------
+    name : string, list
+        統計表ID, または統計表IDのリスト.
+    data_source : string
+        'estat'のみ. The default is None.
+    start, end : string
+        時間軸事項のコードの範囲. The default is None.
+    retry_count : int
+        リトライ回数. The default is 3.
+    pause : float
+        最初のリトライまでの待機時間(秒). The default is 0.1.
+    session : requests.Session
+        共有するセッション. The default is None.
+    api_key : string
+        アプリケーションID. Noneの場合は環境変数ESTAT_APP_ID. The default is None.
+    chunksize : int
+        一度に取得を開始する統計表の数. The default is 25.
+    max_workers : int
+        同時に取得する統計表の数の上限. The default is 4.
+    output : string
+        'dict'または'concat'(estatReaderを参照). The default is 'concat'.
+    **kwargs :
+        estatReaderのその他の引数(cache, base_url, cdArea等).
+
+    Returns
+    -------
+    data : pandas.core.frame.DataFrame, dict
+    """
 
     expected_source = [
         "estat"
@@ -26,15 +71,16 @@ def DataReader(
             symbols=name,
             start=start,
             end=end,
-            adjust_price=False,
-            chunksize=25,
+            chunksize=chunksize,
+            max_workers=max_workers,
             retry_count=retry_count,
             pause=pause,
             session=session,
-            api_key=api_key
+            api_key=api_key,
+            output=output,
+            **kwargs
         ).read()
 
     else:
         msg = "data_source=%r is not implemented" % data_source
         raise NotImplementedError(msg)
-
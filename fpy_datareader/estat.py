@@ -6,21 +6,71 @@ https://www.e-stat.go.jp/api/api-info/e-stat-manual3-0
 author: WeLLiving@well-living
 """
 
+import contextlib
+import csv
+import importlib.util
+import io
+import json
+import math
+import os
+import re
+import threading
 import time
-import urllib
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-import numpy as np
-import pandas as pd
-import requests
+from fpy_datareader.cache import request_key
+from fpy_datareader.catalog import CatalogStore
+from fpy_datareader.lazy import lazy_import
+from fpy_datareader.parquet import PARTITION_COLUMNS, read_parquet, to_parquet
+from fpy_datareader.ratelimit import TokenBucket
+from fpy_datareader.singleflight import SingleFlight
 
+# 最初に使うときに読み込む
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+requests = lazy_import('requests')
+ijson = lazy_import('ijson', optional=True)
+
+
+BASE_URL = 'https://api.e-stat.go.jp'
+API_URL = BASE_URL + '/rest/%s/app/json/'
+# CSV形式のAPIはjson/を含まないURL
+SIMPLE_API_URL = BASE_URL + '/rest/%s/app/'
+SIMPLE_ENDPOINTS = ('getSimpleStatsData',)
+
+# pyarrowがある場合はCSVの読み込みにpyarrowを使う
+CSV_ENGINE = 'pyarrow' if importlib.util.find_spec('pyarrow') is not None else 'c'
+
+# 統計データ取得の絞り込み条件
+FILTER_DIMENSIONS = {
+    'tab': 'Tab', 'time': 'Time', 'area': 'Area', 
+    'cat01': 'Cat01', 'cat02': 'Cat02', 'cat03': 'Cat03',
+}
+STATS_DATA_FILTERS = tuple(
+    p % d for d in FILTER_DIMENSIONS.values() 
+    for p in ('lv%s', 'cd%s', 'cd%sFrom', 'cd%sTo')
+)
 
 #%%
-def api_info(version='3.0'):
+def _api_url(version='3.0', base_url=None, simple=False):
+    """
+    APIのURL('.../rest/<version>/app/json/'). base_urlを指定した場合はホスト部分を置き換える.
+    """
+    url = SIMPLE_API_URL if simple else API_URL
+    if base_url is not None:
+        url = base_url.rstrip('/') + url[len(BASE_URL):]
+    return url % str(version)
+
+def api_info(version='3.0', base_url=None):
     """
     Parameters
     ----------
     version : string
         e-Stat APIのバージョン. The default is '3.0'.
+    base_url : string
+        APIのホスト('http://127.0.0.1:8080'等). Noneの場合はe-Stat. The default is None.
 
     Returns
     -------
@@ -32,18 +82,940 @@ def api_info(version='3.0'):
         https://www.e-stat.go.jp/api/api-info/e-stat-manual
     """
     
-    url = 'https://api.e-stat.go.jp/rest/%s/app/json/' % str(version)
+    url = _api_url(version, base_url)
     request_urls = {}
     request_urls.update({'統計表情報取得': url + 'getStatsList?'})
     request_urls.update({'メタ情報取得': url + 'getMetaInfo?'})
     request_urls.update({'統計データ取得': url + 'getStatsData?'})
+    request_urls.update({'統計データ取得(CSV)': _api_url(version, base_url, simple=True) + 'getSimpleStatsData?'})
     request_urls.update({'データセット参照': url + 'refDataset?'})
     request_urls.update({'データカタログ情報取得': url + 'getDataCatalog?'})
     return request_urls
 
+#%%
+class RemoteDataError(IOError):
+    pass
+
+#%%
+def _init_session(session=None, pool_size=10):
+    """
+    Parameters
+    ----------
+    session : requests.Session
+        使用するセッション. Noneの場合は新規に作成. The default is None.
+    pool_size : int
+        新規作成時のコネクションプールのサイズ. The default is 10.
+
+    Returns
+    -------
+    session : requests.Session
+        keep-aliveで接続を再利用し, gzip圧縮のレスポンスを受け取るセッション.
+    """
+    if session is None:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+    session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+    return session
+
+#%%
+def _init_rate_limit(rate_limit=None):
+    """
+    rate_limitが数値の場合は1秒あたりrate_limit回のTokenBucketにする.
+    acquire()を持つオブジェクト(TokenBucket, FileTokenBucket等)はそのまま返す.
+    """
+    if (rate_limit is None) or hasattr(rate_limit, 'acquire'):
+        return rate_limit
+    return TokenBucket(rate_limit)
+
+#%%
+def _jst_today():
+    """
+    日本時間(UTC+9)の今日の日付(yyyymmdd). e-StatAPIの日付は日本時間.
+    """
+    return time.strftime('%Y%m%d', time.gmtime(time.time() + 9 * 3600))
+
+#%%
+def _result_status(jsn):
+    """
+    e-StatAPIのJSONレスポンスからRESULT.STATUSを返す. 見つからない場合はNone.
+    """
+    for value in jsn.values():
+        if isinstance(value, dict) and ('RESULT' in value):
+            return value['RESULT'].get('STATUS')
+    return None
+
+def _content_status(endpoint, content):
+    """
+    レスポンス本文(JSON, getSimpleStatsDataはCSV)のRESULT.STATUS. 読み取れない場合はNone.
+    """
+    try:
+        if endpoint in SIMPLE_ENDPOINTS:
+            return int(split_simple_stats_data(content)[0]['STATUS'])
+        return _result_status(json.loads(content))
+    except (ValueError, KeyError):
+        return None
+
+#%%
+def _stats_data_params(statsDataId, startPosition=None, limit=100000, 
+                       metaGetFlg=None, cntGetFlg=None, **filters):
+    """
+    統計データ取得APIのリクエストパラメータを作成. 
+    絞り込み条件はint型かstr型の値のみ指定する.
+    """
+    unknown = set(filters) - set(STATS_DATA_FILTERS)
+    if unknown:
+        raise TypeError('unexpected filters: %s' % ', '.join(sorted(unknown)))
+    params = {
+        'statsDataId': statsDataId,
+        'limit': limit
+    }
+    # 絞り込み条件(表章事項, 時間軸事項, 地域事項, 分類事項1～3の階層levelとコードcode)
+    for key in STATS_DATA_FILTERS:
+        value = filters.get(key)
+        if (type(value) == int) | (type(value) == str):
+            params.update({key: value})
+    # データ取得開始位置
+    if (type(startPosition) == int) | (type(startPosition) == str):
+        params.update({'startPosition': startPosition})
+    # メタ情報有無
+    if (metaGetFlg == 'Y') or (metaGetFlg == 'N'):
+        params.update({'metaGetFlg': metaGetFlg})
+    # 件数取得フラグ
+    if (cntGetFlg == 'Y') or (cntGetFlg == 'N'):
+        params.update({'cntGetFlg': cntGetFlg})
+    return params
+
+#%%
+# TABLE_INFで値が辞書型(または文字列)になる列
+NESTED_TABLE_INF_COLUMNS = (
+    'STAT_NAME', 'GOV_ORG', 'TITLE', 'MAIN_CATEGORY', 'SUB_CATEGORY', 
+    'STATISTICS_NAME_SPEC', 'TITLE_SPEC',
+)
+
+def flatten_table_inf(table_inf):
+    """
+    統計表情報取得のTABLE_INFをDataFrameに変換. 
+    STAT_NAME, GOV_ORG, TITLE, MAIN_CATEGORY, SUB_CATEGORY, STATISTICS_NAME_SPEC, TITLE_SPECの
+    辞書型のセルは'STAT_NAME_@code', 'STAT_NAME_$'のように列名に接頭辞を付けて展開する.
+    文字列のセルは'_$'の列に入れる.
+
+    Parameters
+    ----------
+    table_inf : list
+        ['GET_STATS_LIST']['DATALIST_INF']['TABLE_INF']. 1件の場合は辞書型.
+
+    Returns
+    -------
+    TABLE_INF : pandas.core.frame.DataFrame
+    """
+    if type(table_inf) == dict:
+        table_inf = [table_inf]
+    TABLE_INF = pd.DataFrame(table_inf)
+    nested = [col for col in NESTED_TABLE_INF_COLUMNS if col in TABLE_INF.columns]
+    df_lt = [TABLE_INF.drop(nested, axis=1)]
+    for col in nested:
+        cells = [
+            dct if type(dct) == dict else ({'$': dct} if type(dct) == str else {})
+            for dct in TABLE_INF[col].tolist()
+        ]
+        df_tmp = pd.DataFrame(cells, index=TABLE_INF.index)
+        # 属性('@code', '@no'等)の後に値('$')を並べる
+        df_tmp = df_tmp[sorted(df_tmp.columns, key=lambda c: c == '$')]
+        df_tmp.columns = [col + '_' + c for c in df_tmp.columns]
+        df_lt += [df_tmp]
+    return pd.concat(df_lt, axis=1)
+
+def flatten_data_catalog(data_catalog_inf):
+    """
+    データカタログ情報取得のDATA_CATALOG_INFのDATASETをDataFrameに変換.
+    辞書型の項目(STAT_NAME, ORGANIZATION, TITLE等)は'TITLE_NAME'のように列名に接頭辞を付けて展開し, 
+    その後に文字列等の項目を並べる.
+
+    Parameters
+    ----------
+    data_catalog_inf : list
+        ['GET_DATA_CATALOG']['DATA_CATALOG_LIST_INF']['DATA_CATALOG_INF']. 1件の場合は辞書型.
+
+    Returns
+    -------
+    DATASET : pandas.core.frame.DataFrame
+    """
+    if type(data_catalog_inf) == dict:
+        data_catalog_inf = [data_catalog_inf]
+    rows = []
+    for inf in data_catalog_inf:
+        row = {}
+        scalars = {}
+        for key, value in inf['DATASET'].items():
+            if type(value) == dict:
+                row.update((key + '_' + k, v) for k, v in value.items())
+            else:
+                scalars[key] = value
+        row.update(scalars)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+#%%
+def _class_list(class_obj):
+    """
+    CLASS_OBJのCLASSを常にリストで返す(要素が1つの場合は辞書型のため).
+    """
+    if type(class_obj['CLASS']) == list:
+        return class_obj['CLASS']
+    return [class_obj['CLASS']]
+
+#%%
+def _filter_class_range(class_inf, filters):
+    """
+    cd*From, cd*Toの範囲外のコードをCLASS_INFから除く.
+    範囲は前方一致で比較する(cdTimeFrom='2015'は'2015000000'以降).
+    """
+    class_obj_lt = []
+    for class_obj in class_inf['CLASS_OBJ']:
+        name = FILTER_DIMENSIONS.get(class_obj['@id'])
+        code_from = filters.get('cd%sFrom' % name) if name else None
+        code_to = filters.get('cd%sTo' % name) if name else None
+        if (code_from is None) and (code_to is None):
+            class_obj_lt += [class_obj]
+            continue
+        classes = _class_list(class_obj)
+        if code_from is not None:
+            code_from = str(code_from)
+            classes = [dct for dct in classes if dct['@code'][:len(code_from)] >= code_from]
+        if code_to is not None:
+            code_to = str(code_to)
+            classes = [dct for dct in classes if dct['@code'][:len(code_to)] <= code_to]
+        class_obj_lt += [dict(class_obj, CLASS=classes)]
+    return dict(class_inf, CLASS_OBJ=class_obj_lt)
+
+#%%
+def plan_partitions(class_inf, total_number, limit=100000, dimensions=None, max_codes=100):
+    """
+    1回あたりの件数がlimit以下になるように, 取得回数が最も少なくなる事項で統計データの取得を分割する.
+    各事項のコードあたりの件数はTOTAL_NUMBER / コード数と見積もる.
+    どの事項でもlimit以下にならない場合は, 分割後のページングを含めた取得回数が最も少ない事項で分割する.
+
+    Parameters
+    ----------
+    class_inf : dict
+        メタ情報取得で得られるCLASS_INF.
+    total_number : int
+        絞込条件に一致する統計データの件数.
+    limit : int
+        1回のリクエストで取得する件数. The default is 100000.
+    dimensions : list
+        分割に使う事項('tab', 'time', 'area', 'cat01'～'cat03')の候補. 
+        Noneの場合はすべての事項. The default is None.
+    max_codes : int
+        1回のリクエストで指定するコードの上限. The default is 100.
+
+    Returns
+    -------
+    dimension : string
+        分割に使う事項. 分割しない場合はNone.
+    partitions : list
+        分割ごとの絞り込み条件. 例: [{'cdArea': '01000,02000'}, {'cdArea': '03000'}]
+    """
+    if total_number <= limit:
+        return None, [{}]
+    best = None
+    for class_obj in class_inf['CLASS_OBJ']:
+        dimension = class_obj['@id']
+        if dimension not in FILTER_DIMENSIONS:
+            continue
+        if (dimensions is not None) and (dimension not in dimensions):
+            continue
+        codes = [dct['@code'] for dct in _class_list(class_obj)]
+        if not codes:
+            continue
+        rows_per_code = total_number / len(codes)
+        per_chunk = int(max(1, min(max_codes, limit // rows_per_code)))
+        chunks = [codes[i:i + per_chunk] for i in range(0, len(codes), per_chunk)]
+        # コードあたりの件数がlimitを超える場合は各分割でページングが必要になるため後回し
+        over_limit = rows_per_code > limit
+        calls = sum(max(1, math.ceil(len(chunk) * rows_per_code / limit)) for chunk in chunks)
+        if (best is None) or ((over_limit, calls) < best[0]):
+            best = ((over_limit, calls), dimension, chunks)
+    if best is None:
+        return None, [{}]
+    _, dimension, chunks = best
+    key = 'cd' + FILTER_DIMENSIONS[dimension]
+    return dimension, [{key: ','.join(chunk)} for chunk in chunks]
+
+#%%
+# 1回のリクエストで指定できるコードの上限
+MAX_CODES = 100
+
+def _level(dct):
+    """
+    クラスの階層(@level). 数値でない場合はNone.
+    """
+    level = str(dct.get('@level', ''))
+    return int(level) if level.isdigit() else None
+
+def _match_classes(class_obj, cond):
+    """
+    事項のクラスのうち条件condに一致するもののコードの集合.
+
+    condの形式
+        値またはリスト: コードまたは項目名(@name)のいずれかに一致
+        辞書型: 'in'(値またはリスト), 'contains'(項目名の部分一致), 
+                'from', 'to'(コードの範囲. 時間軸事項は年, 年月, 日付も指定できる),
+                'level'(階層またはリスト), 'min_level', 'max_level'の組み合わせ(AND)
+    """
+    classes = _class_list(class_obj)
+    if not isinstance(cond, dict):
+        cond = {'in': cond}
+    unknown = set(cond) - {'in', 'contains', 'from', 'to', 'level', 'min_level', 'max_level'}
+    if unknown:
+        raise TypeError('unexpected conditions: %s' % ', '.join(sorted(unknown)))
+    selected = [True] * len(classes)
+
+    def keep(mask):
+        for i, m in enumerate(mask):
+            selected[i] = selected[i] and m
+
+    if 'in' in cond:
+        values = cond['in']
+        values = [str(v) for v in (values if isinstance(values, (list, tuple, set)) else [values])]
+        known = {dct['@code'] for dct in classes} | {dct.get('@name') for dct in classes}
+        missing = [v for v in values if v not in known]
+        if missing:
+            raise KeyError('%s has no class %s' % (class_obj['@id'], ', '.join(missing)))
+        values = set(values)
+        keep([(dct['@code'] in values) or (dct.get('@name') in values) for dct in classes])
+    if 'contains' in cond:
+        keep([str(cond['contains']) in str(dct.get('@name', '')) for dct in classes])
+    if ('from' in cond) or ('to' in cond):
+        if class_obj['@id'] == 'time':
+            # 期間で比較する(2015は2015年, 2015年度, 2015年1月以降)
+            periods = parse_time_codes([dct['@code'] for dct in classes], 
+                                       names=[dct.get('@name') for dct in classes])
+            if cond.get('from') is not None:
+                start = _bound_period(cond['from']).start_time
+                keep([(p is pd.NaT) or (p.start_time >= start) for p in periods])
+            if cond.get('to') is not None:
+                end = _bound_period(cond['to']).end_time
+                keep([(p is pd.NaT) or (p.end_time <= end) for p in periods])
+        else:
+            # 前方一致で比較する(_filter_class_range)
+            if cond.get('from') is not None:
+                code_from = str(cond['from'])
+                keep([dct['@code'][:len(code_from)] >= code_from for dct in classes])
+            if cond.get('to') is not None:
+                code_to = str(cond['to'])
+                keep([dct['@code'][:len(code_to)] <= code_to for dct in classes])
+    if ('level' in cond) or ('min_level' in cond) or ('max_level' in cond):
+        levels = [_level(dct) for dct in classes]
+        if 'level' in cond:
+            lv = cond['level']
+            lv = {int(v) for v in (lv if isinstance(lv, (list, tuple, set)) else [lv])}
+            keep([level in lv for level in levels])
+        if cond.get('min_level') is not None:
+            keep([(level is not None) and (level >= int(cond['min_level'])) for level in levels])
+        if cond.get('max_level') is not None:
+            keep([(level is not None) and (level <= int(cond['max_level'])) for level in levels])
+    return {dct['@code'] for dct, m in zip(classes, selected) if m}
+
+def _narrowest_params(class_obj, codes):
+    """
+    codesを含むクラスが最も少なくなるlv*, cd*, cd*From, cd*Toの組み合わせ.
+    同じ件数の場合はパラメータの文字列が短いもの.
+
+    Returns
+    -------
+    params : dict
+    superset : set
+        paramsで取得できるクラスのコード(codesを含む).
+    """
+    name = FILTER_DIMENSIONS[class_obj['@id']]
+    classes = _class_list(class_obj)
+    all_codes = [dct['@code'] for dct in classes]
+    candidates = [({}, set(all_codes))]
+    if len(codes) <= MAX_CODES:
+        candidates.append(({'cd' + name: ','.join(c for c in all_codes if c in codes)}, set(codes)))
+
+    # コードの範囲
+    low, high = min(codes), max(codes)
+    in_range = {c for c in all_codes if low <= c <= high}
+    range_params = {}
+    if low > min(all_codes):
+        range_params['cd%sFrom' % name] = low
+    if high < max(all_codes):
+        range_params['cd%sTo' % name] = high
+    candidates.append((range_params, in_range))
+
+    # 階層の範囲(すべてのクラスに階層がある場合)
+    levels = {dct['@code']: _level(dct) for dct in classes}
+    if all(level is not None for level in levels.values()):
+        lv_low = min(levels[c] for c in codes)
+        lv_high = max(levels[c] for c in codes)
+        in_level = {c for c, level in levels.items() if lv_low <= level <= lv_high}
+        lv_params = {'lv' + name: str(lv_low) if lv_low == lv_high else '%d-%d' % (lv_low, lv_high)}
+        candidates.append((lv_params, in_level))
+        candidates.append((dict(lv_params, **range_params), in_level & in_range))
+
+    return min(candidates, key=lambda c: (len(c[1]), len(''.join('%s=%s&' % kv for kv in c[0].items()))))
+
+def compile_where(class_inf, where):
+    """
+    事項ごとの条件を統計データ取得APIの絞り込み条件(lv*, cd*, cd*From, cd*To)に変換する.
+    項目名はメタ情報でコードに変換し, 取得件数が最も少なくなるパラメータを選ぶ.
+    パラメータで絞り込めない分は取得後に絞り込む(residual).
+
+    Parameters
+    ----------
+    class_inf : dict
+        メタ情報取得で得られるCLASS_INF.
+    where : dict
+        事項ID('area', 'cat01'等)または事項名('地域'等)をキー, 条件を値とする辞書.
+        例: {'area': ['東京都', '大阪府'], 'cat01': {'max_level': 2}, 'time': {'from': 2015}}
+
+    Returns
+    -------
+    params : dict
+        get_estat_StatsDataの絞り込み条件.
+    residual : dict
+        事項IDをキー, 取得後に残すコードの集合を値とする辞書.
+    """
+    class_objs = {}
+    for class_obj in class_inf['CLASS_OBJ']:
+        class_objs[class_obj['@id']] = class_obj
+        class_objs.setdefault(class_obj['@name'], class_obj)
+    # 同じ事項の条件は積をとる
+    selected = {}
+    for key, cond in where.items():
+        if key not in class_objs:
+            raise KeyError('Unknown dimension: %r' % key)
+        dimension = class_objs[key]['@id']
+        codes = _match_classes(class_objs[key], cond)
+        selected[dimension] = (selected[dimension] & codes) if dimension in selected else codes
+        if not selected[dimension]:
+            raise ValueError('No class of %r matches %r' % (key, cond))
+    params = {}
+    residual = {}
+    for dimension, codes in selected.items():
+        if dimension not in FILTER_DIMENSIONS:
+            # APIで絞り込めない事項(cat04以降)
+            residual[dimension] = codes
+            continue
+        dim_params, superset = _narrowest_params(class_objs[dimension], codes)
+        params.update(dim_params)
+        if superset != codes:
+            residual[dimension] = codes
+    return params, residual
+
+def apply_residual(data_value, residual):
+    """
+    compile_whereのresidualで統計データを絞り込む.
+    """
+    if (not residual) or (data_value.shape[0] == 0):
+        return data_value
+    mask = np.ones(data_value.shape[0], dtype=bool)
+    for dimension, codes in residual.items():
+        mask &= data_value[dimension].isin(codes).to_numpy(dtype=bool)
+    return data_value[mask].reset_index(drop=True)
+
+#%%
+def _take(values, indexer, typed=False):
+    """
+    マスタの項目valuesからindexerの位置の値を取り出す. 位置-1はNaN.
+    typed=Trueの場合はvaluesの順のカテゴリをもつCategorical型で返す.
+    """
+    if typed:
+        codes, categories = pd.factorize(np.array(values, dtype=object))
+        # 末尾の-1は位置-1(マスタにないコード)に対応する
+        return pd.Categorical.from_codes(np.append(codes, -1).take(indexer), categories=categories)
+    return np.array(values + [np.nan], dtype=object).take(indexer)
+
+def _parse_values(values):
+    """
+    統計数値の文字列を数値に変換. 整数のみの場合はInt64型, それ以外はfloat64型.
+    数値に変換できない'-', '…', '･･･', 'X'等はNAにして, 記号をCategorical型で返す.
+    """
+    numeric = pd.to_numeric(values, errors='coerce')
+    flag = values.where(numeric.isna() & values.notna()).astype('category')
+    valid = numeric.dropna()
+    if (valid % 1 == 0).all() and (valid.abs() < 2 ** 53).all():
+        numeric = numeric.astype('Int64')
+    else:
+        numeric = numeric.astype('float64')
+    return numeric, flag
+
+#%%
+def _group_ids(df, columns):
+    """
+    dfのcolumnsの値の組み合わせごとに, 値の昇順の整数ID(0始まり)を付ける. NaNも1つの値とする.
+
+    Returns
+    -------
+    ids : numpy.ndarray
+        行ごとのID.
+    first : numpy.ndarray
+        IDごとの最初の行の位置(IDの順).
+    """
+    ids = np.zeros(df.shape[0], dtype=np.int64)
+    for col in columns:
+        codes, uniques = pd.factorize(df[col], sort=True, use_na_sentinel=False)
+        # 組み合わせの数が増えすぎないように列ごとにIDを振り直す
+        ids, _ = pd.factorize(ids * len(uniques) + codes, sort=True)
+    _, first = np.unique(ids, return_index=True)
+    return ids, first
+
+def _downcast(values):
+    """
+    float64の配列を, 整数のみの場合は最小の整数型(NaNを含む場合はInt64型)にする.
+    """
+    valid = values[~np.isnan(values)]
+    if (valid.size == 0) or np.any(valid % 1 != 0) or np.any(np.abs(valid) >= 2 ** 53):
+        return values
+    if valid.size < values.size:
+        return pd.array(values, dtype='Int64')
+    return pd.to_numeric(values, downcast='integer')
+
+#%%
+def stats_data_to_df(jsn, fillna='NULL', typed=False):
+    """
+    統計データ取得APIのJSONを属性マスタと結合しDataFrame形式に変換
+
+    Parameters
+    ----------
+    jsn : dict
+        統計データ取得APIのレスポンス.
+    fillna : string
+        '-', '…', '･･･', 'X'の値を置き換える文字列. The default is 'NULL'.
+    typed : bool
+        Trueの場合, 事項の列をCLASS_INFの順のカテゴリをもつCategorical型, 
+        '$'を数値型(整数のみの場合はInt64, それ以外はfloat64)にする.
+        数値でない'-', '…', '･･･', 'X'等はNAにして, 'flag'列(Categorical型)に記号を残す. 
+        fillnaは使わない. The default is False.
+
+    Returns
+    -------
+    data_value :  pandas.core.frame.DataFrame
+        統計数値(セル)の情報と項目名.データ件数分だけ出力.
+
+    """
+    data_value = pd.DataFrame(jsn['GET_STATS_DATA']['STATISTICAL_DATA']['DATA_INF']['VALUE'])
+    data_value.columns = [col.replace('@', '') for col in data_value.columns]
+    if typed:
+        data_value['$'], data_value['flag'] = _parse_values(data_value['$'])
+        if 'unit' in data_value.columns:
+            data_value['unit'] = data_value['unit'].astype('category')
+    else:
+        cond = (data_value['$']=='-') | (data_value['$']=='…') | (data_value['$']=='･･･') | (data_value['$']=='X')
+        data_value['$'] = data_value['$'].mask(cond, fillna)
+    
+    # コードをキーとしてマスタテーブルの項目を対応付ける
+    # 事項ごとにコードの位置(見つからない場合は-1)を求め, 項目の配列から取り出す
+    columns = {}
+    for dct in jsn['GET_STATS_DATA']['STATISTICAL_DATA']['CLASS_INF']['CLASS_OBJ']:
+        classes = _class_list(dct)
+        suffix = '_' + dct['@id'] + '_' + dct['@name']
+        fields = [('@name', dct['@name'])]
+        if type(dct['CLASS']) == list:
+            fields += [('@level', 'level' + suffix)]
+            if any('@parentCode' in c for c in classes):
+                fields += [('@parentCode', 'parentCode' + suffix)]
+        codes = pd.Index([c['@code'] for c in classes])
+        if not codes.is_unique:
+            keep = ~codes.duplicated()
+            classes = [c for c, k in zip(classes, keep) if k]
+            codes = codes[keep]
+        indexer = codes.get_indexer(data_value[dct['@id']])
+        if typed:
+            # マスタにないコードはNaNにせず, マスタの後ろのカテゴリにする
+            unknown = indexer == -1
+            category_codes, categories = indexer, codes
+            if unknown.any():
+                extra, inverse = np.unique(data_value[dct['@id']].to_numpy(dtype=str)[unknown], return_inverse=True)
+                category_codes = indexer.copy()
+                category_codes[unknown] = len(codes) + inverse
+                categories = codes.append(pd.Index(extra, dtype=object))
+            data_value[dct['@id']] = pd.Categorical.from_codes(category_codes, categories=categories)
+        for field, col in fields:
+            columns[col] = _take([c.get(field, np.nan) for c in classes], indexer, typed)
+        columns['code_name' + suffix] = _take([c['@code'] + '_' + c['@name'] for c in classes], indexer, typed)
+    data_value = pd.concat([data_value, pd.DataFrame(columns, index=data_value.index)], axis=1)
+    return data_value
+
+#%%
+def parse_stats_data_stream(fp):
+    """
+    統計データ取得APIのJSONを少しずつ読み込んで変換する. ijsonが必要.
+    DATA_INF.VALUEは行ごとの辞書型を作らずに列ごとのリストに追加し,
+    '@tab', '@area', '$'等を列とするDataFrameにする. それ以外(CLASS_INF等)は辞書型.
+
+    Parameters
+    ----------
+    fp : file-like object
+        レスポンス本文を読み込むファイルオブジェクト.
+
+    Returns
+    -------
+    jsn : dict
+        ['GET_STATS_DATA']['STATISTICAL_DATA']['DATA_INF']['VALUE']がDataFrameの統計データ.
+    """
+    if ijson is None:
+        raise ImportError('stream=True requires ijson. pip install ijson')
+    value_prefix = 'GET_STATS_DATA.STATISTICAL_DATA.DATA_INF.VALUE'
+    item_prefix = value_prefix + '.item'
+    key_start = len(item_prefix) + 1
+    builder = ijson.ObjectBuilder()
+    columns = {}
+    n = 0
+    for prefix, event, value in ijson.parse(fp, use_float=True):
+        if prefix.startswith(item_prefix):
+            if prefix == item_prefix:
+                if event == 'start_map':
+                    n += 1
+                continue
+            col = columns.get(prefix[key_start:])
+            if col is None:
+                col = columns[prefix[key_start:]] = []
+            if len(col) < n - 1:  # この列がない行はNone
+                col.extend([None] * (n - 1 - len(col)))
+            col.append(value)
+        else:
+            builder.event(event, value)
+    for col in columns.values():
+        if len(col) < n:
+            col.extend([None] * (n - len(col)))
+    jsn = builder.value
+    DATA_INF = jsn['GET_STATS_DATA'].get('STATISTICAL_DATA', {}).get('DATA_INF')
+    if DATA_INF is not None:
+        if type(DATA_INF['VALUE']) == dict:  # 1件の場合は辞書型
+            DATA_INF['VALUE'] = pd.DataFrame([DATA_INF['VALUE']])
+        else:
+            DATA_INF['VALUE'] = pd.DataFrame(columns)
+    return jsn
+
+class _TeeReader:
+    """
+    読み込んだバイト列をoutにも書き込むファイルオブジェクト(ストリームで変換しながらキャッシュに保存する).
+    """
+    def __init__(self, fp, out):
+        self.fp = fp
+        self.out = out
+
+    def read(self, size=-1):
+        data = self.fp.read(size)
+        self.out.write(data)
+        return data
+
+class _BufferedCacheWriter:
+    """
+    writerを持たないキャッシュ用. 読み込んだ本文をメモリに控え, commit()でcache.setする.
+    """
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+        self.buffer = io.BytesIO()
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+    def commit(self):
+        self.cache.set(self.key, self.buffer.getvalue())
+
+    def discard(self):
+        self.buffer = io.BytesIO()
+
+def _cache_writer(cache, key):
+    """
+    キャッシュに少しずつ書き込むファイルオブジェクト(FileCache.writer, ない場合は_BufferedCacheWriter).
+    """
+    if hasattr(cache, 'writer'):
+        return cache.writer(key)
+    return _BufferedCacheWriter(cache, key)
+
+#%%
+def split_simple_stats_data(content):
+    """
+    統計データ取得API(CSV形式, getSimpleStatsData)のレスポンスを
+    見出し部分(RESULT, PARAMETER, STATISTICAL_DATA等)と"VALUE"以降の表に分ける.
+
+    Parameters
+    ----------
+    content : bytes
+        sectionHeaderFlg=1で取得したレスポンス本文.
+
+    Returns
+    -------
+    header : dict
+        'STATUS', 'ERROR_MSG', 'TOTAL_NUMBER', 'NEXT_KEY'等の見出しの項目と値(文字列).
+    body : bytes
+        "VALUE"の次の行(列名)以降のCSV. データがない場合はb''.
+    """
+    if content.startswith(b'\xef\xbb\xbf'):  # BOM
+        content = content[3:]
+    match = re.search(rb'^"?VALUE"?\r?$', content, re.M)
+    if match is None:
+        head, body = content, b''
+    else:
+        head, body = content[:match.start()], content[match.end():].lstrip(b'\r\n')
+    header = {}
+    for row in csv.reader(io.StringIO(head.decode('utf-8'))):
+        if len(row) >= 2:
+            header.setdefault(row[0], row[1])
+    return header, body
+
+#%%
+def _read_csv_str(body):
+    """
+    CSVのすべての列を文字列として読み込む(コードの先頭の0を残す). 空文字はNaN.
+    pyarrowがある場合はpyarrowのCSVリーダーを使う.
+    """
+    if CSV_ENGINE == 'pyarrow':
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+        # read_csv(engine='pyarrow')のdtypeは型推論の後に変換されるため, 列の型を直接指定する
+        names = next(csv.reader(io.StringIO(body.split(b'\n', 1)[0].decode('utf-8'))))
+        convert_options = pa_csv.ConvertOptions(
+            column_types={name: pa.string() for name in names}, 
+            null_values=[''], strings_can_be_null=True, 
+        )
+        return pa_csv.read_csv(io.BytesIO(body), convert_options=convert_options).to_pandas()
+    return pd.read_csv(io.BytesIO(body), dtype=str, keep_default_na=False, na_values=[''])
+
+#%%
+def simple_stats_data_to_df(body, CLASS_INF, fillna='NULL', typed=False):
+    """
+    統計データ取得API(CSV形式)の表をstats_data_to_dfと同じ列のDataFrameに変換.
+    すべての列を文字列として読み込み, '{id}_code'列のコードをCLASS_INFの項目と対応付ける.
+
+    Parameters
+    ----------
+    body : bytes
+        split_simple_stats_dataで分けた"VALUE"以降のCSV.
+    CLASS_INF : dict
+        get_estat_MetaInfoで取得したメタ情報.
+    fillna : string
+        '-', '…', '･･･', 'X'の値を置き換える文字列. The default is 'NULL'.
+    typed : bool
+        Trueの場合, 事項の列をCategorical型, '$'を数値型にする(stats_data_to_df). The default is False.
+
+    Returns
+    -------
+    data_value :  pandas.core.frame.DataFrame
+        統計数値(セル)の情報と項目名.
+    """
+    value = _read_csv_str(body)
+    # 項目名の列はCLASS_INFから付け直すため, コード, 単位, 値, 注釈の列だけを残す
+    columns = {}
+    for col in value.columns:
+        if col.endswith('_code'):
+            columns[col] = '@' + col[:-len('_code')]
+        elif col in ('unit', 'annotation'):
+            columns[col] = '@' + col
+        elif col == 'value':
+            columns[col] = '$'
+    value = value[list(columns)].rename(columns=columns)
+    jsn = {'GET_STATS_DATA': {'STATISTICAL_DATA': {'CLASS_INF': CLASS_INF, 'DATA_INF': {'VALUE': value}}}}
+    return stats_data_to_df(jsn, fillna, typed)
+
+#%%
+# 時間軸事項のコード'yyyykkmmMM'(yyyy: 年, kk: '00'暦年・'10'年度, mm～MM: 開始月～終了月)
+TIME_CODE_RE = re.compile(r'^\d{10}$')
+# コードで判別できない場合に項目名から判別する
+TIME_NAME_RE = re.compile(r'^(\d{4})年(度)?(?:(\d{1,2})月)?$')
+
+def _time_freqs():
+    """
+    頻度ごとのpandasの期間型(年度は4月始まり).
+    """
+    return {
+        'Y': pd.PeriodDtype(pd.offsets.YearEnd()),
+        'FY': pd.PeriodDtype(pd.offsets.YearEnd(month=3)),
+        'Q': pd.PeriodDtype(pd.offsets.QuarterEnd(startingMonth=12)),
+        'FQ': pd.PeriodDtype(pd.offsets.QuarterEnd(startingMonth=3)),
+        'M': pd.PeriodDtype(pd.offsets.MonthEnd()),
+    }
+
+def _time_ordinals(year, fiscal, m1, m2):
+    """
+    コードを分解した配列から頻度('Y', 'FY', 'Q', 'FQ', 'M', 判別できない場合は'')と
+    1970年からの期間の番号(pandas.Periodのordinal)を求める.
+    """
+    freq = np.full(year.shape, '', dtype=object)
+    ordinal = np.zeros(year.shape, dtype='int64')
+    # 年度の1～3月は翌年
+    cal_year = year + (fiscal & (m2 >= 1) & (m2 <= 3))
+    annual = (m1 == 0) & (m2 == 0)
+    monthly = (m1 == m2) & (m1 >= 1) & (m1 <= 12) & ~fiscal
+    quarterly = (m2 - m1 == 2) & (m1 >= 1) & (m2 <= 12)
+    masks = {
+        'Y': annual & ~fiscal,
+        'FY': annual & fiscal,
+        'M': monthly,
+        'Q': quarterly & ~fiscal & (m1 % 3 == 1),
+        'FQ': quarterly & fiscal & (m1 % 3 == 1),
+    }
+    for name, mask in masks.items():
+        freq[mask] = name
+    ordinal = np.where(masks['Y'], year - 1970, ordinal)
+    # 年度は終了する年(2020年度は2021年3月期)
+    ordinal = np.where(masks['FY'], year + 1 - 1970, ordinal)
+    ordinal = np.where(masks['M'], (year - 1970) * 12 + m1 - 1, ordinal)
+    ordinal = np.where(masks['Q'], (year - 1970) * 4 + (m1 - 1) // 3, ordinal)
+    # 4～6月期が第1四半期. 3月期の年度と同じく終了する年度で数える
+    fq_year = np.where(m1 >= 4, cal_year + 1, cal_year)
+    ordinal = np.where(masks['FQ'], (fq_year - 1970) * 4 + ((m1 - 4) % 12) // 3, ordinal)
+    return freq, ordinal
+
+def parse_time_codes(codes, names=None, kind='period'):
+    """
+    時間軸事項のコード(年次'2020000000', 月次'2020000101', 四半期'2020000103',
+    年度'2020100000'等)を期間に変換する. 重複を除いたコードを配列の演算でまとめて変換する.
+
+    Parameters
+    ----------
+    codes : array-like
+        時間軸事項のコード. Categorical型でもよい.
+    names : array-like
+        codesと同じ長さの項目名('2020年', '2020年度', '2020年1月'等).
+        コードで判別できない場合に使う. The default is None.
+    kind : string
+        'period'の場合はPeriodIndex(頻度が混在する場合はPeriodのIndex),
+        'timestamp'の場合は期間の開始日のDatetimeIndex. The default is 'period'.
+
+    Returns
+    -------
+    index : pandas.core.indexes.period.PeriodIndex, pandas.core.indexes.datetimes.DatetimeIndex
+        判別できないコードはNaT.
+    """
+    if kind not in ('period', 'timestamp'):
+        raise ValueError("'kind' must be 'period' or 'timestamp'")
+    codes = pd.Series(codes)
+    if isinstance(codes.dtype, pd.CategoricalDtype):
+        inverse = codes.cat.codes.to_numpy()
+        uniques = codes.cat.categories.astype(str)
+    else:
+        inverse, uniques = pd.factorize(codes.astype(str))
+    uniques = pd.Series(np.asarray(uniques, dtype=object), dtype=object)
+    valid = uniques.str.match(TIME_CODE_RE).fillna(False).to_numpy(dtype=bool)
+    digits = uniques.where(valid, '0000000000')
+    year = digits.str.slice(0, 4).astype('int64').to_numpy()
+    fiscal = digits.str.slice(4, 6).to_numpy() == '10'
+    m1 = digits.str.slice(6, 8).astype('int64').to_numpy()
+    m2 = digits.str.slice(8, 10).astype('int64').to_numpy()
+    freq, ordinal = _time_ordinals(year, fiscal & valid, m1, m2)
+    freq[~valid] = ''
+    ordinal[~valid] = 0
+
+    if (names is not None) and (freq == '').any():
+        # 項目名(最初に出現した行)で判別する
+        names = pd.Series(np.asarray(names, dtype=object))
+        first = pd.Series(np.arange(len(inverse))).groupby(inverse).first()
+        first = first[first.index >= 0]
+        for i in np.flatnonzero(freq == ''):
+            m = TIME_NAME_RE.match(str(names.iloc[first[i]])) if i in first.index else None
+            if m is None:
+                continue
+            y, fy, month = int(m.group(1)), bool(m.group(2)), m.group(3)
+            f, o = _time_ordinals(np.array([y]), np.array([fy]), 
+                                  np.array([int(month or 0)]), np.array([int(month or 0)]))
+            freq[i], ordinal[i] = f[0], o[0]
+
+    dtypes = _time_freqs()
+    used = [f for f in dtypes if (freq == f).any()]
+    if len(used) <= 1:
+        dtype = dtypes[used[0] if used else 'Y']
+        ordinal = np.where(freq == '', pd.NaT.value, ordinal)
+        periods = pd.PeriodIndex(pd.arrays.PeriodArray(ordinal, dtype=dtype))
+        periods = periods.take(inverse, allow_fill=True, fill_value=pd.NaT)
+        return periods if kind == 'period' else periods.to_timestamp(how='start')
+    # 頻度が混在する場合は頻度ごとに変換する
+    values = np.full(len(uniques), pd.NaT, dtype=object)
+    for f in used:
+        mask = freq == f
+        periods = pd.PeriodIndex(pd.arrays.PeriodArray(ordinal[mask], dtype=dtypes[f]))
+        values[mask] = np.asarray(periods if kind == 'period' else periods.to_timestamp(how='start'), dtype=object)
+    values = np.append(values, pd.NaT)[inverse]  # -1(欠損)はNaT
+    return pd.Index(values) if kind == 'period' else pd.DatetimeIndex(values)
+
+def _bound_period(value):
+    """
+    start, end(年, 年月, 日付, Period, 時間軸事項のコード)を期間にする.
+    """
+    if isinstance(value, pd.Period):
+        return value
+    if isinstance(value, str) and TIME_CODE_RE.match(value):
+        period = parse_time_codes([value])[0]
+        if period is pd.NaT:
+            raise ValueError('Unknown time code: %r' % value)
+        return period
+    if isinstance(value, int) or (isinstance(value, str) and re.match(r'^\d{4}$', value)):
+        return pd.Period(year=int(value), freq=pd.offsets.YearEnd())
+    if isinstance(value, str) and re.match(r'^\d{4}-\d{1,2}$', value):
+        return pd.Period(value, freq=pd.offsets.MonthEnd())
+    return pd.Period(pd.Timestamp(value), freq='D')
+
+def time_code_bound(value, side='start'):
+    """
+    start, endを時間軸事項のコード(cdTimeFrom, cdTimeTo)に変換する.
+    10桁のコードはそのまま. 年(2015, '2015'), 年月('2015-04'), 日付等は
+    その期間を含むコードをすべて取得できるように広げる(範囲外の行はtruncate_timeで除く).
+    年度のコード('yyyy10mmMM')は年度の年で始まり, 1～3月は前年の年度のコードになるため,
+    開始が1～3月の場合は前年の年度の1月, 終了が4月以降の場合はその年の年度の終了月までにする.
+
+    Parameters
+    ----------
+    value : string, int, date, datetime, Timestamp, Period
+        期間の開始または終了.
+    side : string
+        'start'または'end'. The default is 'start'.
+
+    Returns
+    -------
+    code : string
+    """
+    if value is None:
+        return None
+    if isinstance(value, str) and TIME_CODE_RE.match(value):
+        return value
+    period = _bound_period(value)
+    if side == 'start':
+        ts = period.start_time
+        if ts.month <= 3:
+            # 前年の年度の1～3月(yyyy100103等)から. 暦年の年次(yyyy000000)も含む
+            return '%d100101' % (ts.year - 1)
+        return '%d00%02d%02d' % (ts.year, ts.month, ts.month)
+    ts = period.end_time
+    if ts.month >= 4:
+        # その年の年度の4月～終了月(yyyy100406等)まで
+        return '%d10%02d%02d' % (ts.year, ts.month, ts.month)
+    return '%d00%02d%02d' % (ts.year, ts.month, ts.month)
+
+def truncate_time(data_value, start=None, end=None, column='time'):
+    """
+    期間がstart～endに含まれない行を除く(cdTimeFrom, cdTimeToのコードの範囲では除けない年度, 四半期等).
+    判別できないコードの行は残す.
+    """
+    if ((start is None) and (end is None)) or (column not in data_value.columns) or (data_value.shape[0] == 0):
+        return data_value
+    periods = parse_time_codes(data_value[column], kind='period')
+    uniques = pd.Index(periods.unique())
+    inverse = uniques.get_indexer(periods)
+    keep = np.ones(len(uniques), dtype=bool)
+    for i, period in enumerate(uniques):
+        if period is pd.NaT:
+            continue
+        if start is not None:
+            keep[i] &= period.start_time >= _bound_period(start).start_time
+        if end is not None:
+            keep[i] &= period.end_time <= _bound_period(end).end_time
+    return data_value[keep[inverse]]
+
 #%%
 class eStatReader:
-    def __init__(self, appId, version='3.0'):
+    def __init__(self, appId, version='3.0', cache=None, 
+                 session=None, pool_size=10, timeout=30, 
+                 retry_count=3, pause=0.1, pause_multiplier=2, catalog=None, 
+                 reuse_meta=True, meta_cache_size=128, base_url=None, hooks=None, coalesce=True, 
+                 rate_limit=None):
         """
         Parameters
         ----------
@@ -51,18 +1023,359 @@ class eStatReader:
             取得したアプリケーションIDを指定.
         version : string, float
             e-Stat APIのバージョン. The default is '3.0'.
+        cache : object
+            get(key)とset(key, content)を持つレスポンスキャッシュ.
+            fpy_datareader.cache.FileCache等. Noneの場合はキャッシュしない. The default is None.
+        session : requests.Session
+            すべてのリクエストで共有するセッション. Noneの場合はpool_sizeの
+            コネクションプールを持つセッションを作成. The default is None.
+        pool_size : int
+            session=Noneの場合のコネクションプールのサイズ. The default is 10.
+        timeout : int, float
+            1リクエストあたりのタイムアウト(秒). The default is 30.
+        retry_count : int
+            5xxエラー, 接続エラー時のリトライ回数. The default is 3.
+        pause : float
+            最初のリトライまでの待機時間(秒). The default is 0.1.
+        pause_multiplier : float
+            リトライごとに待機時間に掛ける倍率. The default is 2.
+        catalog : string, CatalogStore
+            統計表情報を保存するSQLiteファイルのパス, またはfpy_datareader.catalog.CatalogStore.
+            search_tablesで使う. The default is None.
+        reuse_meta : bool
+            Trueの場合, 統計データ取得で受け取ったメタ情報(TABLE_INF, CLASS_INF)とget_estat_MetaInfoの結果を
+            メモリに保持し, 同じ統計表(同じ絞り込み条件)の2回目以降のページ・分割はmetaGetFlg='N'で
+            リクエストして保持したメタ情報を付け加える. The default is True.
+        meta_cache_size : int
+            メタ情報をメモリに保持する統計表(絞り込み条件)の数. 
+            0の場合は保持しない. The default is 128.
+        base_url : string
+            APIのホスト. fpy_datareader.fake_server等の代替サーバーを使う場合に
+            'http://127.0.0.1:8080'のように指定する. Noneの場合はe-Stat. The default is None.
+        hooks : list
+            リクエスト・処理ごとのイベント(辞書型)を受け取る関数のリスト(add_hookを参照).
+            fpy_datareader.instrument.StageStats等. The default is None.
+        coalesce : bool, SingleFlight
+            Trueの場合, 複数のスレッドから同時に送られた同じリクエスト(appId, エンドポイントとパラメータが同じ)を
+            1回の通信にまとめ, レスポンス本文を共有する(JSONは呼び出しごとに変換する). 
+            fpy_datareader.singleflight.SingleFlightを指定すると複数のeStatReaderでまとめる. The default is True.
+        rate_limit : float, TokenBucket
+            1秒あたりのリクエスト数の上限. リトライを含むすべてのリクエストの前にトークンを取得する.
+            fpy_datareader.ratelimit.TokenBucket(rate, burst)を指定すると複数のeStatReader(スレッド)で, 
+            FileTokenBucket(path, rate, burst)を指定すると同じホストの複数のプロセスで共有する.
+            Noneの場合は制限しない. The default is None.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.appId = appId
+        self.version = version
+        self.cache = cache
+        if not isinstance(retry_count, int) or retry_count < 0:
+            raise ValueError("'retry_count' must be integer larger than or equal to 0")
+        self.retry_count = retry_count
+        self.pause = pause
+        self.pause_multiplier = pause_multiplier
+        self.timeout = timeout
+        self._own_session = session is None
+        self.session = _init_session(session, pool_size)
+        if isinstance(catalog, str):
+            catalog = CatalogStore(catalog)
+        self.catalog = catalog
+        self.reuse_meta = reuse_meta
+        self.meta_cache_size = meta_cache_size
+        self.base_url = base_url
+        self.hooks = list(hooks or [])
+        self.statsDataId = None
+        self._meta_cache = OrderedDict()
+        self._meta_lock = threading.Lock()
+        if coalesce is True:
+            coalesce = SingleFlight()
+        self._flight = coalesce or None
+        self.rate_limit = _init_rate_limit(rate_limit)
+
+    def close(self):
+        """
+        eStatReaderが作成したセッションを閉じる.
+        """
+        if self._own_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+#%%
+    # リクエスト・処理ごとのイベント
+    def add_hook(self, hook):
+        """
+        リクエスト・処理ごとにhook(event)を呼び出す. eventは次の項目をもつ辞書型.
+        
+        event : 'request'(APIへのリクエスト), 'retry'(リトライ), 'stage'(変換等の処理), 
+                'coalesced'(実行中の同じリクエストの結果を待って受け取った), 'throttle'(rate_limitで待機した)
+        endpoint, statsDataId, params : リクエスト先とパラメータ(appIdを除く)
+        status_code, latency, bytes, cache_hit : HTTPステータス, 通信時間(秒), 本文のバイト数, キャッシュから返したか
+        stage, rows : 処理名('decode', 'estat_json_to_df', 'tab_pivot'等), 処理した行数
+        elapsed : 所要時間(秒)
+        
+        複数のスレッドから呼び出される場合がある.
+        """
+        self.hooks.append(hook)
+        return self
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+        return self
+
+    def _emit(self, event):
+        for hook in self.hooks:
+            hook(event)
+
+    @contextlib.contextmanager
+    def _stage(self, stage, **fields):
+        """
+        with内の処理の所要時間をstageイベントとして通知する. 
+        withで受け取る辞書型にrows等を追加できる.
+        """
+        if not self.hooks:
+            yield fields
+            return
+        start = time.perf_counter()
+        yield fields
+        fields.update(event='stage', stage=stage, elapsed=time.perf_counter() - start)
+        self._emit(fields)
+
+#%%
+    # APIへのリクエスト
+    def _url(self, endpoint):
+        return _api_url(self.version, self.base_url, endpoint in SIMPLE_ENDPOINTS) + endpoint
+
+    def _get_response(self, url, params, stream=False):
+        """
+        セッションでGETリクエストを送信. 5xxエラー, 接続エラーの場合は
+        待機時間をpause_multiplier倍ずつ増やしながらretry_count回までリトライ.
+
+        Parameters
+        ----------
+        url : string
+            リクエスト先のURL.
+        params : dict
+            リクエストパラメータ.
+        stream : bool
+            Trueの場合, レスポンス本文を読み込まずに返す. The default is False.
+
+        Returns
+        -------
+        response : requests.Response
+        """
+        pause = self.pause
+        last_error = ''
+        for i in range(self.retry_count + 1):
+            if i > 0:
+                if self.hooks:
+                    self._emit({'event': 'retry', 'url': url, 'attempt': i, 'error': last_error, 'elapsed': pause})
+                time.sleep(pause)
+                pause *= self.pause_multiplier
+            if self.rate_limit is not None:
+                wait = self.rate_limit.acquire()
+                if wait and self.hooks:
+                    self._emit({'event': 'throttle', 'url': url, 'attempt': i, 'elapsed': wait})
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout, stream=stream)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                last_error = repr(e)
+                continue
+            if response.status_code == requests.codes.ok:
+                return response
+            last_error = 'HTTP %d' % response.status_code
+            if (response.status_code < 500) and (response.status_code != 429):
+                break
+        raise RemoteDataError('Unable to read URL: {0}\n{1}'.format(url, last_error))
+
+    def _get_content(self, endpoint, params, parse=None):
+        """
+        APIからレスポンス本文を取得. キャッシュがある場合はキャッシュを優先.
+
+        Parameters
+        ----------
+        endpoint : string
+            'getStatsList', 'getMetaInfo', 'getStatsData'等.
+        params : dict
+            appId以外のリクエストパラメータ. 値がNoneのものは送信しない.
+        parse : function
+            レスポンス本文のファイルオブジェクトを受け取ってJSON(辞書型)を返す関数.
+            指定した場合は本文を読み込みながら変換し, 変換結果を返す. 
+            キャッシュには一時ファイルに少しずつ書き込む. The default is None.
 
         Returns
         -------
-        None.
+        content : bytes
+            レスポンス本文(parseを指定した場合はparseの結果).
+        """
+        url = self._url(endpoint)
+        params = {k: v for k, v in params.items() if v is not None}
+        start = time.perf_counter()
+        event = {'event': 'request', 'endpoint': endpoint, 'statsDataId': params.get('statsDataId'), 'params': params}
+        key = None
+        if self.cache is not None:
+            key = request_key(url, params)
+            content = self.cache.get(key)
+            if content is not None:
+                if self.hooks:
+                    self._emit(dict(event, status_code=None, latency=None, bytes=len(content), 
+                                    cache_hit=True, elapsed=time.perf_counter() - start))
+                return content if parse is None else parse(io.BytesIO(content))
+        query = {'appId': self.appId}
+        query.update(params)
+        response = self._get_response(url, query, stream=parse is not None)
+        if parse is not None:
+            return self._parse_response(response, key, event, start, parse)
+        content = response.content
+        latency = time.perf_counter() - start
+        if (key is not None) and (_content_status(endpoint, content) in (0, 1, 2)):
+            # エラー応答はキャッシュしない
+            self.cache.set(key, content)
+        if self.hooks:
+            self._emit(dict(event, status_code=response.status_code, latency=latency, bytes=len(content), 
+                            cache_hit=False, elapsed=time.perf_counter() - start))
+        return content
 
+    def _parse_response(self, response, key, event, start, parse):
         """
-        self.appId = appId
-        self.version = version
+        レスポンス本文を読み込みながらparseで変換し, キャッシュの一時ファイルにも書き込む(_get_content).
+        """
+        if self.hooks:
+            # 本文は読み込みながら変換するため, 通信時間はヘッダーを受信するまで
+            length = getattr(response, 'headers', {}).get('Content-Length')
+            self._emit(dict(event, status_code=response.status_code, latency=time.perf_counter() - start, 
+                            bytes=int(length) if length else None, cache_hit=False, 
+                            elapsed=time.perf_counter() - start))
+        writer = None if key is None else _cache_writer(self.cache, key)
+        try:
+            response.raw.decode_content = True  # gzipを展開して読み込む
+            jsn = parse(response.raw if writer is None else _TeeReader(response.raw, writer))
+            # エラー応答はキャッシュしない
+            if (writer is not None) and (_result_status(jsn) in (0, 1, 2)):
+                writer.commit()
+        finally:
+            if writer is not None:
+                writer.discard()
+            response.close()
+        return jsn
+
+    def _coalesce(self, kind, endpoint, params, fn):
+        """
+        実行中の同じリクエストがあれば, その結果を待って返す(coalesce=True).
+        """
+        if self._flight is None:
+            return fn(endpoint, params)
+        # 複数のeStatReaderでまとめる場合があるため, appIdもキーに含める
+        key = (kind, self.appId, request_key(self._url(endpoint), {k: v for k, v in params.items() if v is not None}))
+        start = time.perf_counter()
+        result, shared = self._flight.do(key, fn, endpoint, params)
+        if shared and self.hooks:
+            self._emit({'event': 'coalesced', 'endpoint': endpoint, 'statsDataId': params.get('statsDataId'), 
+                        'params': params, 'elapsed': time.perf_counter() - start})
+        return result
+
+    def _get_json(self, endpoint, params):
+        # まとめるのはレスポンス本文まで. 変換した辞書型は呼び出しごとに別のオブジェクトにする
+        content = self._coalesce('content', endpoint, params, self._get_content)
+        with self._stage('decode', endpoint=endpoint, statsDataId=params.get('statsDataId'), bytes=len(content)):
+            return json.loads(content)
+
+    def _get_stats_data_json(self, params, stream=False):
+        """
+        統計データ取得APIのJSONを取得. stream=Trueの場合はレスポンス本文を
+        少しずつ読み込み, DATA_INF.VALUEを列ごとのDataFrameにする(parse_stats_data_stream).
+        reuse_meta=Trueの場合, メタ情報を保持している統計表はmetaGetFlg='N'でリクエストして付け加え,
+        保持していない場合は受け取ったメタ情報を保持する.
+        """
+        if ((not self.reuse_meta) or (self.meta_cache_size <= 0) or ('metaGetFlg' in params) 
+                or (params.get('cntGetFlg') == 'Y')):
+            return self._fetch_stats_data_json(params, stream)
+        statsDataId = params['statsDataId']
+        filters = tuple(sorted((k, str(v)) for k, v in params.items() if (k in STATS_DATA_FILTERS) and (v is not None)))
+        # 絞り込み条件がない場合のメタ情報はget_estat_MetaInfoと共有する
+        key = (statsDataId, filters) if filters else statsDataId
+        meta = self._cached_meta(statsDataId) or self._cached_meta(key)
+        # メタ情報付きのレスポンスがキャッシュにある場合はそれを使う
+        if (meta is not None) and (not self._is_cached('getStatsData', params)):
+            jsn = self._fetch_stats_data_json(dict(params, metaGetFlg='N'), stream)
+            return self._attach_meta(jsn, meta)
+        jsn = self._fetch_stats_data_json(params, stream)
+        RESULT = jsn['GET_STATS_DATA']['RESULT']
+        STATISTICAL_DATA = jsn['GET_STATS_DATA'].get('STATISTICAL_DATA') or {}
+        if (RESULT['STATUS'] in (0, 2)) and ('CLASS_INF' in STATISTICAL_DATA):
+            self._store_meta(key, (STATISTICAL_DATA.get('TABLE_INF'), STATISTICAL_DATA['CLASS_INF'], 
+                                   RESULT['STATUS'], RESULT['DATE']))
+        return jsn
+
+    def _is_cached(self, endpoint, params):
+        if (self.cache is None) or (not hasattr(self.cache, '__contains__')):
+            return False
+        params = {k: v for k, v in params.items() if v is not None}
+        return request_key(self._url(endpoint), params) in self.cache
+
+    def _cached_meta(self, key):
+        """
+        保持しているメタ情報(TABLE_INF, CLASS_INF, STATUS, DATE). ない場合はNone.
+        """
+        with self._meta_lock:
+            if key in self._meta_cache:
+                self._meta_cache.move_to_end(key)
+                return self._meta_cache[key]
+        return None
+
+    def _store_meta(self, key, meta):
+        if self.meta_cache_size > 0:
+            with self._meta_lock:
+                self._meta_cache[key] = meta
+                while len(self._meta_cache) > self.meta_cache_size:
+                    self._meta_cache.popitem(last=False)
+
+    def _fetch_stats_data_json(self, params, stream=False):
+        if not stream:
+            return self._get_json('getStatsData', params)
+        statsDataId = params.get('statsDataId')
+        return self._get_content('getStatsData', params, 
+                                 parse=lambda fp: self._parse_stats_data_stream(fp, statsDataId))
+
+    def _parse_stats_data_stream(self, fp, statsDataId=None):
+        with self._stage('parse_stats_data_stream', statsDataId=statsDataId):
+            return parse_stats_data_stream(fp)
+
+    def _stats_data_to_df(self, jsn, fillna='NULL', typed=False):
+        statsDataId = jsn['GET_STATS_DATA'].get('PARAMETER', {}).get('STATS_DATA_ID', self.statsDataId)
+        with self._stage('stats_data_to_df', statsDataId=statsDataId) as stage:
+            data_value = stats_data_to_df(jsn, fillna, typed)
+            stage['rows'] = data_value.shape[0]
+        return data_value
+
+    def _attach_meta(self, jsn, meta=None):
+        """
+        metaGetFlg='N'で取得した統計データにメタ情報(meta, Noneの場合はget_estat_MetaInfo)の
+        TABLE_INF, CLASS_INFを付け加える. 元のjsnは変更せずに新しい辞書型を返す.
+        """
+        STATISTICAL_DATA = jsn['GET_STATS_DATA'].get('STATISTICAL_DATA')
+        if (STATISTICAL_DATA is None) or ('CLASS_INF' in STATISTICAL_DATA):
+            return jsn
+        if meta is None:
+            statsDataId = jsn['GET_STATS_DATA'].get('PARAMETER', {}).get('STATS_DATA_ID', self.statsDataId)
+            meta = self.get_estat_MetaInfo(statsDataId)
+        TABLE_INF, CLASS_INF, STATUS, _ = meta
+        if STATUS not in (0, 1, 2):
+            return jsn
+        STATISTICAL_DATA = dict(STATISTICAL_DATA, TABLE_INF=TABLE_INF, CLASS_INF=CLASS_INF)
+        return dict(jsn, GET_STATS_DATA=dict(jsn['GET_STATS_DATA'], STATISTICAL_DATA=STATISTICAL_DATA))
 
 #%%
     # e-Statのデータのリストを取得
-    def get_StatsList(self, to_csv=False, path=''):
+    def get_StatsList(self, to_csv=False, path='', to_catalog=False):
         """
         統計表情報取得(約180,000件)
         
@@ -72,6 +1385,8 @@ class eStatReader:
             Trueの場合,CSVファイル出力. The default is False.
         path : string
             CSVファイル出力時のパス. The default is ''.
+        to_catalog : bool
+            Trueの場合, catalog(SQLite)に保存してsearch_tablesで検索できるようにする. The default is False.
     
         Returns
         -------
@@ -109,13 +1424,7 @@ class eStatReader:
         ['GET_STATS_LIST']['PARAMETER']['DATA_FORMAT'] : 出力フォーマット形式「X」：XML形式「J」：JSON形式又はJSONP形式
         
         """
-        request_url_str = 'https://api.e-stat.go.jp/rest/%s/app/json/getStatsList?' % str(self.version)
-        params = {
-            'appId': self.appId,
-        }
-        params_str = urllib.parse.urlencode(query=params)
-        request_url_str += params_str
-        jsn = requests.get(request_url_str).json()
+        jsn = self._get_json('getStatsList', {})
         # 主要な統計表情報APIの出力データ取得
         STATUS = jsn['GET_STATS_LIST']['RESULT']['STATUS']
         DATE = jsn['GET_STATS_LIST']['RESULT']['DATE']
@@ -123,81 +1432,105 @@ class eStatReader:
         NUMBER = jsn['GET_STATS_LIST']['DATALIST_INF']['NUMBER'] 
         RESULT_INF = jsn['GET_STATS_LIST']['DATALIST_INF']['RESULT_INF'] 
         
-        TABLE_INF = pd.DataFrame(jsn['GET_STATS_LIST']['DATALIST_INF']['TABLE_INF'])
-        
-        # TABLE_INFの各セルのディクショナリ型データを結合可能なDataFrameに変換
-        # STAT_NAME, GOV_ORG, TITLE, MAIN_CATEGORY, SUB_CATEGORY, STATISTICS_NAME_SPEC, TITLE_SPEC
-        
-        # STAT_NAME
-        STAT_NAME = []
-        for i, dct in enumerate(TABLE_INF['STAT_NAME']):
-            df_tmp = pd.DataFrame(dct, index=[i])
-            df_tmp.columns = ['STAT_NAME' + '_' + col for col in df_tmp.columns]
-            STAT_NAME += [df_tmp]
-        STAT_NAME = pd.concat(STAT_NAME, axis=0)
-        # GOV_ORG
-        GOV_ORG = []
-        for i, dct in enumerate(TABLE_INF['GOV_ORG']):
-            df_tmp = pd.DataFrame(dct, index=[i])
-            df_tmp.columns = ['GOV_ORG' + '_' + col for col in df_tmp.columns]
-            GOV_ORG += [df_tmp]
-        GOV_ORG = pd.concat(GOV_ORG, axis=0)
-        # TITLE
-        TITLE = []
-        for i, dct in enumerate(TABLE_INF['TITLE']):
-            if type(dct) == dict:
-                df_tmp = pd.DataFrame(dct, index=[i])
-                df_tmp.columns = ['TITLE' + '_' + col for col in df_tmp.columns]
-                TITLE += [df_tmp]
-            elif type(dct) == str:
-                df_tmp = pd.DataFrame([[0, dct]], index=[i])
-                df_tmp.columns = ['TITLE_@no', 'TITLE_$']
-            else:
-                print(dct + "は結合できません。")
-        TITLE = pd.concat(TITLE, axis=0)
-        # MAIN_CATEGORY
-        MAIN_CATEGORY = []
-        for i, dct in enumerate(TABLE_INF['MAIN_CATEGORY']):
-            df_tmp = pd.DataFrame(dct, index=[i])
-            df_tmp.columns = ['MAIN_CATEGORY' + '_' + col for col in df_tmp.columns]
-            MAIN_CATEGORY += [df_tmp]
-        MAIN_CATEGORY = pd.concat(MAIN_CATEGORY, axis=0)
-        # SUB_CATEGORY
-        SUB_CATEGORY = []
-        for i, dct in enumerate(TABLE_INF['SUB_CATEGORY']):
-            df_tmp = pd.DataFrame(dct, index=[i])
-            df_tmp.columns = ['SUB_CATEGORY' + '_' + col for col in df_tmp.columns]
-            SUB_CATEGORY += [df_tmp]
-        SUB_CATEGORY = pd.concat(SUB_CATEGORY, axis=0)
-        # STATISTICS_NAME_SPEC
-        STATISTICS_NAME_SPEC = []
-        for i, dct in enumerate(TABLE_INF['STATISTICS_NAME_SPEC']):
-            if type(dct) == dict:
-                df_tmp = pd.DataFrame(dct, index=[i])
-                df_tmp.columns = ['STATISTICS_NAME_SPEC' + '_' + col for col in df_tmp.columns]
-                STATISTICS_NAME_SPEC += [df_tmp]
-            else:
-                print(dct + "は結合できません。")
-        STATISTICS_NAME_SPEC = pd.concat(STATISTICS_NAME_SPEC, axis=0)
-        # TITLE_SPEC
-        TITLE_SPEC = []
-        for i, dct in enumerate(TABLE_INF['TITLE_SPEC']):
-            if type(dct) == dict:
-                df_tmp = pd.DataFrame(dct, index=[i])
-                df_tmp.columns = ['TITLE_SPEC' + '_' + col for col in df_tmp.columns]
-                TITLE_SPEC += [df_tmp]
-            else:
-                print(dct + "は結合できません。")
-        TITLE_SPEC = pd.concat(TITLE_SPEC, axis=0)
-        # 
-        TABLE_INF = pd.concat([TABLE_INF, STAT_NAME, GOV_ORG, TITLE, MAIN_CATEGORY, SUB_CATEGORY, STATISTICS_NAME_SPEC, TITLE_SPEC], axis=1)
-        TABLE_INF = TABLE_INF.drop(['STAT_NAME', 'GOV_ORG', 'TITLE','MAIN_CATEGORY', 'SUB_CATEGORY', 'STATISTICS_NAME_SPEC', 'TITLE_SPEC'], axis=1)
+        with self._stage('flatten_table_inf') as stage:
+            TABLE_INF = flatten_table_inf(jsn['GET_STATS_LIST']['DATALIST_INF']['TABLE_INF'])
+            stage['rows'] = TABLE_INF.shape[0]
         
         if to_csv:
             TABLE_INF.to_csv(path+'estat_statslist_table_inf.csv')
+        if to_catalog:
+            self._require_catalog().upsert(TABLE_INF)
         
         return TABLE_INF, STATUS, DATE, NUMBER, RESULT_INF
 
+#%%
+    # 更新された統計表情報のみ取得してcatalogに反映
+    def sync_catalog(self, limit=100000):
+        """
+        前回の同期日以降に更新された統計表情報を取得(updatedDate)してcatalogに追加・更新する.
+        初回はすべての統計表情報を取得する. いずれもlimit件ずつstartPositionで取得する.
+        
+        Parameters
+        ----------
+        limit : int
+            1回のリクエストで取得する件数. The default is 100000.
+    
+        Returns
+        -------
+        count : int
+            追加・更新した統計表の件数.
+        
+        """
+        catalog = self._require_catalog()
+        last_sync_date = catalog.get_meta('last_sync_date')
+        params = {'limit': limit}
+        upper = None
+        if last_sync_date is not None:
+            # 同期日当日の更新も含めるため前回の同期日から取得する.
+            # 終了日は日本時間の今日(時計が遅れていても前回の同期日より前にしない)
+            upper = max(last_sync_date, _jst_today())
+            params['updatedDate'] = last_sync_date + '-' + upper
+        sync_date = None
+        count = 0
+        while True:
+            jsn = self._get_json('getStatsList', params)
+            STATUS = jsn['GET_STATS_LIST']['RESULT']['STATUS']
+            if STATUS not in (0, 1, 2):
+                raise RemoteDataError(jsn['GET_STATS_LIST']['RESULT']['ERROR_MSG'])
+            if sync_date is None:
+                # 取得開始時点のAPIサーバーの日付を次回の同期日とする
+                sync_date = jsn['GET_STATS_LIST']['RESULT']['DATE'][:10].replace('-', '')
+                if upper is not None:
+                    # 終了日がAPIサーバーの日付より前の場合は, 次回は終了日から取得する
+                    sync_date = min(sync_date, upper)
+            if STATUS == 1:  # 該当データなし
+                break
+            DATALIST_INF = jsn['GET_STATS_LIST']['DATALIST_INF']
+            count += catalog.upsert(flatten_table_inf(DATALIST_INF['TABLE_INF']))
+            if 'NEXT_KEY' not in DATALIST_INF['RESULT_INF']:
+                break
+            params['startPosition'] = DATALIST_INF['RESULT_INF']['NEXT_KEY']
+        catalog.set_meta('last_sync_date', sync_date)
+        return count
+
+#%%
+    # 保存した統計表情報の検索
+    def _require_catalog(self):
+        if self.catalog is None:
+            raise ValueError("catalog is not set. eStatReader(appId, catalog='estat_catalog.sqlite3')")
+        return self.catalog
+
+    def search_tables(self, query=None, gov_org=None, main_category=None, sub_category=None, 
+                      cycle=None, survey_date=None, limit=100):
+        """
+        catalogに保存した統計表情報を検索する(APIへのリクエストはしない).
+        
+        Parameters
+        ----------
+        query : string
+            タイトル, 統計名, 詳細(SPEC)から検索する語句. 空白区切りで複数指定した場合はAND検索.
+        gov_org : string
+            作成機関のコードまたは名称.
+        main_category : string
+            分野(大分類)のコードまたは名称.
+        sub_category : string
+            分野(小分類)のコードまたは名称.
+        cycle : string
+            周期('年次', '月次'等).
+        survey_date : string, int
+            調査年月. 前方一致.
+        limit : int
+            最大件数. The default is 100.
+    
+        Returns
+        -------
+        TABLE_INF : pandas.core.frame.DataFrame
+            条件に一致した統計表情報. 統計表IDは'@id'.
+        
+        """
+        return self._require_catalog().search(query, gov_org, main_category, sub_category, 
+                                              cycle, survey_date, limit)
+
 #%%
     # e-Statのデータカタログ取得
     def get_estat_DataCatalog(self, limit=100):
@@ -216,7 +1549,7 @@ class eStatReader:
         Returns
         -------
         DATASET : pandas.core.frame.DataFrame
-            カタログデータセット情報を保持.
+            カタログデータセット情報を保持. 辞書型の項目はflatten_data_catalogで列に展開.
             ['GET_DATA_CATALOG']['DATA_CATALOG_LIST_INF']['DATA_CATALOG_INF']['DATASET']
         CATAROG_id : pandas.core.series.Series
             カタログデータセットIDを保持.
@@ -247,41 +1580,23 @@ class eStatReader:
         ['GET_DATA_CATALOG']['DATA_CATALOG_LIST_INF']['DATA_CATALOG_INF'] : len 100
         """
         
-        request_url_str = "https://api.e-stat.go.jp/rest/%s/app/json/getDataCatalog?" % str(self.version)
         params = {
-            "appId": self.appId,
             "limit": limit
         }
-        params_str = urllib.parse.urlencode(query=params)  # urllib
-        request_url_str += params_str
-        jsn = requests.get(request_url_str).json()
+        jsn = self._get_json('getDataCatalog', params)
     
         STATUS = jsn['GET_DATA_CATALOG']['RESULT']['STATUS']
         DATE = jsn['GET_DATA_CATALOG']['RESULT']['DATE'] 
         NUMBER = jsn['GET_DATA_CATALOG']['DATA_CATALOG_LIST_INF']['NUMBER'] 
         RESULT_INF = jsn['GET_DATA_CATALOG']['DATA_CATALOG_LIST_INF']['RESULT_INF'] 
     
-        DATA_CATALOG_INF = pd.DataFrame(jsn['GET_DATA_CATALOG']['DATA_CATALOG_LIST_INF']['DATA_CATALOG_INF'])
-    
-        CATAROG_id = DATA_CATALOG_INF['@id']
-        
-        DATASET = []
-        for i, dct in enumerate(DATA_CATALOG_INF['DATASET']):
-            df_lt = []
-            tmp_lt = []
-            for key, value in dct.items():
-                if type(value) == dict:
-                    df_tmp1 = pd.DataFrame(value, index=[i])
-                    df_tmp1.columns = [key + '_' + c1 for c1 in df_tmp1.columns]
-                    df_lt += [df_tmp1]
-                else:
-                    tmp_lt += [[key, value]]
-                df_tmp1 = pd.concat(df_lt, axis=1)
-                df_tmp2 = pd.DataFrame(tmp_lt, columns=['key', i])
-                df_tmp2 = df_tmp2.set_index('key')
-                df_tmp2 = df_tmp2.T
-            DATASET += [pd.concat([df_tmp1, df_tmp2], axis=1)]
-        DATASET = pd.concat(DATASET, axis=0)
+        with self._stage('flatten_data_catalog') as stage:
+            DATA_CATALOG_INF = jsn['GET_DATA_CATALOG']['DATA_CATALOG_LIST_INF']['DATA_CATALOG_INF']
+            if type(DATA_CATALOG_INF) == dict:
+                DATA_CATALOG_INF = [DATA_CATALOG_INF]
+            CATAROG_id = pd.Series([inf['@id'] for inf in DATA_CATALOG_INF], name='@id')
+            DATASET = flatten_data_catalog(DATA_CATALOG_INF)
+            stage['rows'] = DATASET.shape[0]
     
         return DATASET, CATAROG_id, STATUS, DATE, NUMBER, RESULT_INF
 
@@ -321,21 +1636,39 @@ class eStatReader:
         ['GET_META_INFO']['PARAMETER']['DATA_FORMAT'] : 出力フォーマット形式「X」：XML形式「J」：JSON形式又はJSONP形式
     
         """
-        request_url_str = "https://api.e-stat.go.jp/rest/%s/app/json/getMetaInfo?" % str(self.version)
+        return self._get_meta_info(statsDataId)[:4]
+
+    def _get_meta_info(self, statsDataId):
+        """
+        get_estat_MetaInfoの結果とERROR_MSG(正常終了の場合はNone).
+        """
+        # 取得済みのメタ情報はメモリ(LRU)から返す. ディスクのキャッシュはself.cacheを使う
+        meta = self._cached_meta(statsDataId)
+        if meta is not None:
+            return meta + (None,)
         params = {
-            "appId": self.appId,
             "statsDataId": statsDataId
         }
-        params_str = urllib.parse.urlencode(query=params)  # urllib
-        request_url_str += params_str
-        MetaInfo = requests.get(request_url_str).json()
+        MetaInfo = self._get_json('getMetaInfo', params)
         
-        TABLE_INF = MetaInfo['GET_META_INFO']['METADATA_INF']['TABLE_INF']
-        CLASS_INF = MetaInfo['GET_META_INFO']['METADATA_INF']['CLASS_INF']
         STATUS = MetaInfo['GET_META_INFO']['RESULT']['STATUS']
         DATE = MetaInfo['GET_META_INFO']['RESULT']['DATE']
-    
-        return TABLE_INF, CLASS_INF, STATUS, DATE
+        if STATUS not in (0, 1, 2):
+            return None, None, STATUS, DATE, MetaInfo['GET_META_INFO']['RESULT'].get('ERROR_MSG')
+        TABLE_INF = MetaInfo['GET_META_INFO']['METADATA_INF']['TABLE_INF']
+        CLASS_INF = MetaInfo['GET_META_INFO']['METADATA_INF']['CLASS_INF']
+        
+        self._store_meta(statsDataId, (TABLE_INF, CLASS_INF, STATUS, DATE))
+        return TABLE_INF, CLASS_INF, STATUS, DATE, None
+
+    def _require_meta(self, statsDataId):
+        """
+        get_estat_MetaInfoのCLASS_INF. エラーの場合はAPIのERROR_MSGでRemoteDataErrorにする.
+        """
+        _, CLASS_INF, STATUS, _, ERROR_MSG = self._get_meta_info(statsDataId)
+        if STATUS not in (0, 1, 2):
+            raise RemoteDataError(ERROR_MSG or 'getMetaInfo failed with STATUS %s' % STATUS)
+        return CLASS_INF
 
 
 
@@ -350,7 +1683,7 @@ class eStatReader:
                             lvCat02=None, cdCat02=None, cdCat02From=None, cdCat02To=None, 
                             lvCat03=None, cdCat03=None, cdCat03From=None, cdCat03To=None, 
                             startPosition=None, limit=100000, 
-                            metaGetFlg=None, cntGetFlg=None, version='3.0'):
+                            metaGetFlg=None, cntGetFlg=None, version='3.0', stream=False):
         """
         e-StatAPIから統計データをJSON形式でデータを取得
         
@@ -364,6 +1697,9 @@ class eStatReader:
             データセット取得件数
         version : string, float
             e-Stat APIのバージョン. The default is '3.0'.
+        stream : bool
+            Trueの場合, レスポンスを少しずつ読み込み, DATA_INF.VALUEを辞書型のリストではなく
+            DataFrameで保持する(parse_stats_data_stream, ijsonが必要). The default is False.
     
         Returns
         -------
@@ -371,81 +1707,17 @@ class eStatReader:
             
         
         """
-        request_url_str = 'https://api.e-stat.go.jp/rest/%s/app/json/getStatsData?' % self.version
         self.statsDataId = statsDataId
-        params = {
-            'appId': self.appId,
-            'statsDataId': self.statsDataId,
-            'limit': limit
-        }
-        # 絞り込み条件
-        # 表章事項
-        if (type(lvTab) == int) | (type(lvTab) == str):  # 階層level Table
-            params.update({'lvTab': lvTab})
-        if (type(cdTab) == int) | (type(cdTab) == str):  # コードcode Table
-            params.update({'cdTab': cdTab})
-        if (type(cdTabFrom) == int) | (type(cdTabFrom) == str):
-            params.update({'cdTabFrom': cdTabFrom})
-        if (type(cdTabTo) == int) | (type(cdTabTo) == str):
-            params.update({'cdTabTo': cdTabTo})
-        # 時間軸事項
-        if (type(lvTime) == int) | (type(lvTime) == str):  # 階層level
-            params.update({'lvTime': lvTime})
-        if (type(cdTime) == int) | (type(cdTime) == str):  # コードcode
-            params.update({'cdTime': cdTime})
-        if (type(cdTimeFrom) == int) | (type(cdTimeFrom) == str):
-            params.update({'cdTimeFrom': cdTimeFrom})
-        if (type(cdTimeTo) == int) | (type(cdTimeTo) == str):
-            params.update({'cdTimeTo': cdTimeTo})
-        # 地域事項
-        if (type(lvArea) == int) | (type(lvArea) == str):  # 階層level
-            params.update({'lvArea': lvArea})
-        if (type(cdArea) == int) | (type(cdArea) == str):  # コードcode
-            params.update({'cdArea': cdArea})
-        if (type(cdAreaFrom) == int) | (type(cdAreaFrom) == str):
-            params.update({'cdAreaFrom': cdAreaFrom})
-        if (type(cdAreaTo) == int) | (type(cdAreaTo) == str):
-            params.update({'cdAreaTo': cdAreaTo})
-        # 分類事項1
-        if (type(lvCat01) == int) | (type(lvCat01) == str):  # 階層level Category
-            params.update({'lvCat01': lvCat01})
-        if (type(cdCat01) == int) | (type(cdCat01) == str):  # コードcode Category
-            params.update({'cdCat01': cdCat01})
-        if (type(cdCat01From) == int) | (type(cdCat01From) == str):
-            params.update({'cdCat01From': cdCat01From})
-        if (type(cdCat01To) == int) | (type(cdCat01To) == str):
-            params.update({'cdCat01To': cdCat01To})
-        # 分類事項2
-        if (type(lvCat02) == int) | (type(lvCat02) == str):  # 階層level Category
-            params.update({'lvCat02': lvCat02})
-        if (type(cdCat02) == int) | (type(cdCat02) == str):  # コードcode Category
-            params.update({'cdCat02': cdCat02})
-        if (type(cdCat02From) == int) | (type(cdCat02From) == str):
-            params.update({'cdCat02From': cdCat02From})
-        if (type(cdCat02To) == int) | (type(cdCat02To) == str):
-            params.update({'cdCat02To': cdCat02To})
-        # 分類事項3
-        if (type(lvCat03) == int) | (type(lvCat03) == str):  # 階層level Category
-            params.update({'lvCat03': lvCat03})
-        if (type(cdCat03) == int) | (type(cdCat03) == str):  # コードcode Category
-            params.update({'cdCat03': cdCat03})
-        if (type(cdCat03From) == int) | (type(cdCat03From) == str):
-            params.update({'cdCat03From': cdCat03From})
-        if (type(cdCat03To) == int) | (type(cdCat03To) == str):
-            params.update({'cdCat03To': cdCat03To})
-        # データ取得開始位置
-        if (type(startPosition) == int) | (type(startPosition) == str):
-            params.update({'startPosition': startPosition})
-        # メタ情報有無
-        if (metaGetFlg == 'Y') or (metaGetFlg == 'N'):
-            params.update({'metaGetFlg': metaGetFlg})
-        # 件数取得フラグ
-        if (cntGetFlg == 'Y') or (cntGetFlg == 'N'):
-            params.update({'cntGetFlg': cntGetFlg})
-        
-        params_str = urllib.parse.urlencode(query=params)  # urllib
-        request_url_str += params_str
-        self.json = requests.get(request_url_str).json()  # requests
+        params = _stats_data_params(statsDataId, 
+                                    lvTab=lvTab, cdTab=cdTab, cdTabFrom=cdTabFrom, cdTabTo=cdTabTo, 
+                                    lvTime=lvTime, cdTime=cdTime, cdTimeFrom=cdTimeFrom, cdTimeTo=cdTimeTo, 
+                                    lvArea=lvArea, cdArea=cdArea, cdAreaFrom=cdAreaFrom, cdAreaTo=cdAreaTo, 
+                                    lvCat01=lvCat01, cdCat01=cdCat01, cdCat01From=cdCat01From, cdCat01To=cdCat01To, 
+                                    lvCat02=lvCat02, cdCat02=cdCat02, cdCat02From=cdCat02From, cdCat02To=cdCat02To, 
+                                    lvCat03=lvCat03, cdCat03=cdCat03, cdCat03From=cdCat03From, cdCat03To=cdCat03To, 
+                                    startPosition=startPosition, limit=limit, 
+                                    metaGetFlg=metaGetFlg, cntGetFlg=cntGetFlg)
+        self.json = self._get_stats_data_json(params, stream)
         return self
 
 #%%
@@ -461,7 +1733,7 @@ class eStatReader:
         metaGetFlg : str
             メタ情報有無.
             Y:取得する(省略値)
-            N:取得しない
+            N:取得しない(get_estat_MetaInfoのメタ情報を使う)
     
         Returns
         -------
@@ -480,39 +1752,46 @@ class eStatReader:
             
     
         """
-        if metaGetFlg != 'N':
-            self.STATUS = self.json['GET_STATS_DATA']['RESULT']['STATUS']
-            self.DATE = self.json['GET_STATS_DATA']['RESULT']['DATE'] 
-            if (self.STATUS == 0) | (self.STATUS == 1):
-                self.TOTAL_NUMBER = self.json['GET_STATS_DATA']['STATISTICAL_DATA']['RESULT_INF']['TOTAL_NUMBER']  # レコード数
-                if self.TOTAL_NUMBER > 100000:
-                    print(str(self.TOTAL_NUMBER) + '行のうち100000行を取得しました。')
-                else:
-                    print(str(self.TOTAL_NUMBER) + '行を取得しました。')
-                
-                STAT_NAME = self.json['GET_STATS_DATA']['STATISTICAL_DATA']['TABLE_INF']['STAT_NAME']['$']
-                STATISTICS_NAME = self.json['GET_STATS_DATA']['STATISTICAL_DATA']['TABLE_INF']['STATISTICS_NAME'].replace(' ', '')
-                TITLE = self.json['GET_STATS_DATA']['STATISTICAL_DATA']['TABLE_INF']['TITLE']
-                if type(TITLE) == str:
-                    TITLE = TITLE.replace(' ', '')
-                else:
-                    TITLE = self.json['GET_STATS_DATA']['STATISTICAL_DATA']['TABLE_INF']['TITLE']['$'].replace(' ', '')
-                CYCLE = self.json['GET_STATS_DATA']['STATISTICAL_DATA']['TABLE_INF']['CYCLE']
-                self.DATA_NAME = self.statsDataId + '_' + STAT_NAME + '_' + STATISTICS_NAME + '_' + TITLE + '_' + CYCLE
-                return self
+        with self._stage('estat_json_check', statsDataId=self.statsDataId):
+            return self._estat_json_check()
+
+    def _estat_json_check(self):
+        # metaGetFlg='N'で取得した場合はget_estat_MetaInfoのメタ情報を使う
+        self.json = self._attach_meta(self.json)
+        self.STATUS = self.json['GET_STATS_DATA']['RESULT']['STATUS']
+        self.DATE = self.json['GET_STATS_DATA']['RESULT']['DATE'] 
+        if (self.STATUS == 0) | (self.STATUS == 1):
+            self.TOTAL_NUMBER = self.json['GET_STATS_DATA']['STATISTICAL_DATA']['RESULT_INF']['TOTAL_NUMBER']  # レコード数
+            if self.TOTAL_NUMBER > 100000:
+                print(str(self.TOTAL_NUMBER) + '行のうち100000行を取得しました。iter_stats_dataで全件取得できます。')
             else:
-                print(self.json['GET_STATS_DATA']['RESULT']['ERROR_MSG'])
+                print(str(self.TOTAL_NUMBER) + '行を取得しました。')
+            
+            STAT_NAME = self.json['GET_STATS_DATA']['STATISTICAL_DATA']['TABLE_INF']['STAT_NAME']['$']
+            STATISTICS_NAME = self.json['GET_STATS_DATA']['STATISTICAL_DATA']['TABLE_INF']['STATISTICS_NAME'].replace(' ', '')
+            TITLE = self.json['GET_STATS_DATA']['STATISTICAL_DATA']['TABLE_INF']['TITLE']
+            if type(TITLE) == str:
+                TITLE = TITLE.replace(' ', '')
+            else:
+                TITLE = self.json['GET_STATS_DATA']['STATISTICAL_DATA']['TABLE_INF']['TITLE']['$'].replace(' ', '')
+            CYCLE = self.json['GET_STATS_DATA']['STATISTICAL_DATA']['TABLE_INF']['CYCLE']
+            self.DATA_NAME = self.statsDataId + '_' + STAT_NAME + '_' + STATISTICS_NAME + '_' + TITLE + '_' + CYCLE
+            return self
         else:
-            print('metaGetFlgがNです。')
+            print(self.json['GET_STATS_DATA']['RESULT']['ERROR_MSG'])
     
 #%%
     # 属性マスタと結合しDataFrame形式に変換
-    def estat_json_to_df(self, fillna='NULL'):
+    def estat_json_to_df(self, fillna='NULL', typed=False):
         """
         Parameters
         ----------
         json : dict
             get_estat_StatsData().
+        fillna : string
+            '-', '…', '･･･', 'X'の値を置き換える文字列. The default is 'NULL'.
+        typed : bool
+            Trueの場合, 事項の列をCategorical型, '$'を数値型にする(stats_data_to_df). The default is False.
     
         Returns
         -------
@@ -520,31 +1799,12 @@ class eStatReader:
             統計数値(セル)の情報と項目名.データ件数分だけ出力.
     
         """
-        self.data_value = pd.DataFrame(self.json['GET_STATS_DATA']['STATISTICAL_DATA']['DATA_INF']['VALUE'])
+        with self._stage('estat_json_to_df', statsDataId=self.statsDataId) as stage:
+            self.json = self._attach_meta(self.json)
+            self.data_value = stats_data_to_df(self.json, fillna, typed)
+            stage['rows'] = self.data_value.shape[0]
         if self.data_value.shape[0] == 100000:
             print('行数が100000行です。すべてのデータを取得できていない可能性があります。')
-        self.data_value.columns = [col.replace('@', '') for col in self.data_value.columns]
-        cond = (self.data_value['$']=='-') | (self.data_value['$']=='…') | (self.data_value['$']=='･･･') | (self.data_value['$']=='X')
-        self.data_value['$'] = self.data_value['$'].mask(cond, fillna)
-        
-        # コードをキーとしてマスタテーブルと結合
-        lst = self.json['GET_STATS_DATA']['STATISTICAL_DATA']['CLASS_INF']['CLASS_OBJ']        
-        for i, dct in enumerate(lst):
-            if type(dct['CLASS']) == list:
-                try:
-                    tmp_df = pd.DataFrame(dct['CLASS'])[['@code', '@name', '@level', '@parentCode']]
-                except:
-                    tmp_df = pd.DataFrame(dct['CLASS'])[['@code', '@name', '@level']]
-                tmp_df.columns = [col.replace('@', '')+'_'+dct['@id']+'_'+dct['@name'] for col in tmp_df.columns]
-                tmp_df = tmp_df.rename(columns={'name_'+dct['@id']+'_'+dct['@name']: dct['@name']})
-            else:
-                tmp_S = pd.Series(dct['CLASS'])[['@code', '@name']]
-                tmp_S.index = ['code_'+dct['@id']+'_'+dct['@name'], dct['@name']]
-                #tmp_S.index = [idx.replace('@', '')+'_'+dct['@id']+'_'+dct['@name'] for idx in tmp_S.index]
-                tmp_df = pd.DataFrame(tmp_S).T
-            self.data_value = self.data_value.merge(tmp_df, left_on=dct['@id'], right_on='code_'+dct['@id']+'_'+dct['@name'], how='left')
-            self.data_value['code_name_'+dct['@id']+'_'+dct['@name']] = self.data_value['code_'+dct['@id']+'_'+dct['@name']] + '_' + self.data_value[dct['@name']]
-            self.data_value = self.data_value.drop('code_'+dct['@id']+'_'+dct['@name'], axis=1)
         return self
 
 #%%
@@ -556,7 +1816,7 @@ class eStatReader:
                             lvCat02=None, cdCat02=None, cdCat02From=None, cdCat02To=None, 
                             lvCat03=None, cdCat03=None, cdCat03From=None, cdCat03To=None, 
                             startPosition=None, limit=100000, 
-                            metaGetFlg=None, cntGetFlg=None, version='3.0'):
+                            metaGetFlg=None, cntGetFlg=None, version='3.0', typed=False, stream=False):
         """
         e-StatAPIから統計データをJSON形式でデータを取得
         
@@ -570,6 +1830,10 @@ class eStatReader:
             データセット取得件数
         version : string, float
             e-Stat APIのバージョン. The default is '3.0'.
+        typed : bool
+            Trueの場合, 事項の列をCategorical型, '$'を数値型にする(stats_data_to_df). The default is False.
+        stream : bool
+            Trueの場合, レスポンスを少しずつ読み込む(parse_stats_data_stream). The default is False.
     
         Returns
         -------
@@ -595,82 +1859,619 @@ class eStatReader:
                             lvCat02, cdCat02, cdCat02From, cdCat02To, 
                             lvCat03, cdCat03, cdCat03From, cdCat03To, 
                             startPosition, limit, 
-                            metaGetFlg, cntGetFlg, version)
+                            metaGetFlg, cntGetFlg, version, stream)
             
         self.estat_json_check(metaGetFlg)
         
-        self.estat_json_to_df()
+        self.estat_json_to_df(typed=typed)
         
         return self
 
 
 #%%
-    ## データが10万件を超える場合の一括処理
-    def get_estat_StatsData_df_unlimitTime(self, statsDataId, cdTime=1985):
+    # e-StatAPIから統計データをCSV形式で取得
+    def _get_simple_stats_data(self, params, fillna='NULL', typed=False):
+        """
+        統計データ取得API(CSV形式)で1ページ分を取得し, get_estat_MetaInfoのメタ情報で項目名を付ける.
+        
+        Returns
+        -------
+        header : dict
+            'STATUS', 'TOTAL_NUMBER', 'NEXT_KEY'等の見出しの項目と値(文字列).
+        data_value :  pandas.core.frame.DataFrame
+            統計数値(セル)の情報と項目名.
         """
-        年で2020年から1985年までで分割する。
+        content = self._coalesce('content', 'getSimpleStatsData', dict(params, sectionHeaderFlg=1), self._get_content)
+        header, body = split_simple_stats_data(content)
+        STATUS = int(header.get('STATUS', 0))
+        if STATUS not in (0, 1, 2):
+            raise RemoteDataError(header.get('ERROR_MSG', 'STATUS %d' % STATUS))
+        if (STATUS == 1) or (not body.strip()):  # 該当データなし
+            return header, pd.DataFrame()
+        CLASS_INF = self._require_meta(params['statsDataId'])
+        with self._stage('simple_stats_data_to_df', statsDataId=params['statsDataId'], bytes=len(body)) as stage:
+            data_value = simple_stats_data_to_df(body, CLASS_INF, fillna, typed)
+            stage['rows'] = data_value.shape[0]
+        return header, data_value
+
+    def get_estat_SimpleStatsData_df(self, statsDataId, startPosition=None, limit=100000, 
+                                     fillna='NULL', typed=False, **filters):
         """
-        self.get_estat_StatsData(statsDataId)
-        TOTAL_NUMBER = self.json['GET_STATS_DATA']['STATISTICAL_DATA']['RESULT_INF']['TOTAL_NUMBER']
-        df_lt = []
-        if TOTAL_NUMBER > 100000:
-            for t in range(2020, cdTime, -1):
-                try:
-                    self.get_estat_StatsData_df(statsDataId, cdTimeFrom=t-1, cdTimeTo=t)  # cdTimeTo未満
-                    if self.STATUS == 0:
-                        df_lt += [self.data_value]
-                        time.sleep(1)
-                except:
-                    pass
+        e-StatAPIから統計データをCSV形式(getSimpleStatsData)で取得し, 
+        get_estat_StatsData_dfと同じ列のDataFrameに変換. 
+        JSON形式より転送量が小さく, 変換も速い.
+        
+        Parameters
+        ----------
+        statsDataId : string
+            「統計表情報取得」で得られる統計表IDを指定.
+        startPosition : int
+            データ取得開始位置. The default is None.
+        limit : int
+            データセット取得件数. The default is 100000.
+        fillna : string
+            '-', '…', '･･･', 'X'の値を置き換える文字列. The default is 'NULL'.
+        typed : bool
+            Trueの場合, 事項の列をCategorical型, '$'を数値型にする(stats_data_to_df). The default is False.
+        **filters : 
+            lvTab, cdTab, cdTimeFrom, cdArea等のget_estat_StatsDataの絞り込み条件.
+    
+        Returns
+        -------
+        data_value :  pandas.core.frame.DataFrame
+            統計数値(セル)の情報と項目名.データ件数分だけ出力.
+        TOTAL_NUMBER : int
+            絞込条件に一致する統計データの件.
+        NEXT_KEY : int
+            次のページのデータ取得開始位置. 最後のページの場合はNone.
+        
+        """
+        self.statsDataId = statsDataId
+        params = _stats_data_params(statsDataId, startPosition=startPosition, limit=limit, **filters)
+        header, self.data_value = self._get_simple_stats_data(params, fillna, typed)
+        self.STATUS = int(header.get('STATUS', 0))
+        self.TOTAL_NUMBER = int(header.get('TOTAL_NUMBER') or 0)
+        self.NEXT_KEY = int(header['NEXT_KEY']) if header.get('NEXT_KEY') else None
+        return self
+
+#%%
+    ## データが10万件を超える場合にNEXT_KEYを辿って逐次取得
+    def iter_stats_data(self, statsDataId, limit=100000, startPosition=None, fillna='NULL', typed=False, stream=False, **filters):
+        """
+        統計データをlimit件ずつ取得し, 1ページずつDataFrameを返すジェネレータ.
+        RESULT_INF.NEXT_KEYをstartPositionに指定して最後のページまで取得する.
+        
+        Parameters
+        ----------
+        statsDataId : string
+            「統計表情報取得」で得られる統計表IDを指定.
+        limit : int
+            1回のリクエストで取得する件数. The default is 100000.
+        startPosition : int
+            データ取得開始位置. The default is None.
+        fillna : string
+            '-', '…', '･･･', 'X'の値を置き換える文字列. The default is 'NULL'.
+        typed : bool
+            Trueの場合, 事項の列をCategorical型, '$'を数値型にする(stats_data_to_df). The default is False.
+        stream : bool
+            Trueの場合, レスポンスを少しずつ読み込む(parse_stats_data_stream). The default is False.
+        **filters : 
+            lvTab, cdTab, cdTimeFrom, cdArea等のget_estat_StatsDataの絞り込み条件.
+    
+        Yields
+        -------
+        data_value :  pandas.core.frame.DataFrame
+            1ページ分の統計数値(セル)の情報と項目名.
+        
+        """
+        _stats_data_params(statsDataId, **filters)  # 絞り込み条件の確認
+        while True:
+            self.get_estat_StatsData(statsDataId, startPosition=startPosition, limit=limit, stream=stream, **filters)
+            STATUS = self.json['GET_STATS_DATA']['RESULT']['STATUS']
+            if STATUS == 1:  # 該当データなし
+                return
+            if STATUS not in (0, 2):
+                raise RemoteDataError(self.json['GET_STATS_DATA']['RESULT']['ERROR_MSG'])
+            yield self._stats_data_to_df(self.json, fillna, typed)
+            RESULT_INF = self.json['GET_STATS_DATA']['STATISTICAL_DATA']['RESULT_INF']
+            if 'NEXT_KEY' not in RESULT_INF:
+                return
+            startPosition = RESULT_INF['NEXT_KEY']
+
+#%%
+    ## データが10万件を超える場合にページを並列取得
+    def get_estat_StatsData_df_all(self, statsDataId, limit=100000, max_workers=4, fillna='NULL', typed=False, 
+                                   data_format='json', **filters):
+        """
+        1ページ目のTOTAL_NUMBERから残りのstartPositionを求め, 
+        max_workersのスレッドで同時に取得して順番通りに結合する.
+        
+        Parameters
+        ----------
+        statsDataId : string
+            「統計表情報取得」で得られる統計表IDを指定.
+        limit : int
+            1回のリクエストで取得する件数. The default is 100000.
+        max_workers : int
+            同時に取得するページ数の上限. 1の場合は逐次取得. The default is 4.
+        fillna : string
+            '-', '…', '･･･', 'X'の値を置き換える文字列. The default is 'NULL'.
+        typed : bool
+            Trueの場合, 事項の列をCategorical型, '$'を数値型にする(stats_data_to_df). The default is False.
+        data_format : string
+            'json'の場合は統計データ取得API, 'csv'の場合はCSV形式のAPI(getSimpleStatsData)で取得する.
+            The default is 'json'.
+        **filters : 
+            lvTab, cdTab, cdTimeFrom, cdArea等のget_estat_StatsDataの絞り込み条件.
+    
+        Returns
+        -------
+        data_value :  pandas.core.frame.DataFrame
+            全件の統計数値(セル)の情報と項目名.
+        TOTAL_NUMBER : int
+            絞込条件に一致する統計データの件.
+        
+        """
+        if data_format not in ('json', 'csv'):
+            raise ValueError("'data_format' must be 'json' or 'csv'")
+        if data_format == 'csv':
+            self.get_estat_SimpleStatsData_df(statsDataId, limit=limit, fillna=fillna, typed=typed, **filters)
+            if self.STATUS == 1:  # 該当データなし
+                self.TOTAL_NUMBER = 0
+                return self
+            first_df = self.data_value
+        else:
+            self.get_estat_StatsData(statsDataId, limit=limit, **filters)
+            STATUS = self.json['GET_STATS_DATA']['RESULT']['STATUS']
+            if STATUS == 1:  # 該当データなし
+                self.TOTAL_NUMBER = 0
+                self.data_value = pd.DataFrame()
+                return self
+            if STATUS not in (0, 2):
+                raise RemoteDataError(self.json['GET_STATS_DATA']['RESULT']['ERROR_MSG'])
+            self.TOTAL_NUMBER = self.json['GET_STATS_DATA']['STATISTICAL_DATA']['RESULT_INF']['TOTAL_NUMBER']
+            first_df = self._stats_data_to_df(self.json, fillna, typed)
+        
+        def fetch_page(position):
+            params = _stats_data_params(statsDataId, startPosition=position, limit=limit, **filters)
+            if data_format == 'csv':
+                return self._get_simple_stats_data(params, fillna, typed)[1]
+            jsn = self._get_stats_data_json(params)
+            if jsn['GET_STATS_DATA']['RESULT']['STATUS'] not in (0, 2):
+                raise RemoteDataError(jsn['GET_STATS_DATA']['RESULT']['ERROR_MSG'])
+            return self._stats_data_to_df(jsn, fillna, typed)
+        
+        positions = range(1 + limit, self.TOTAL_NUMBER + 1, limit)
+        df_lt = [first_df]
+        if max_workers > 1 and len(positions) > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(positions))) as executor:
+                df_lt += list(executor.map(fetch_page, positions))
+        else:
+            df_lt += [fetch_page(position) for position in positions]
+        self.data_value = pd.concat(df_lt, axis=0, ignore_index=True)
+        return self
+
+#%%
+    def get_estat_StatsData_df_where(self, statsDataId, where=None, limit=100000, max_workers=4, 
+                                     fillna='NULL', typed=False, data_format='json', **conditions):
+        """
+        事項ごとの条件(項目名, コード, 範囲, 階層)で絞り込んで統計データを取得する.
+        条件はメタ情報で絞り込み条件(lv*, cd*, cd*From, cd*To)に変換し(compile_where), 
+        APIで絞り込めない分だけを取得後に絞り込む.
+        
+        Parameters
+        ----------
+        statsDataId : string
+            「統計表情報取得」で得られる統計表IDを指定.
+        where : dict
+            事項ID('area', 'cat01'等)または事項名('地域'等)をキー, 条件を値とする辞書. The default is None.
+        limit : int
+            1回のリクエストで取得する件数. The default is 100000.
+        max_workers : int
+            同時に取得するページ数の上限. The default is 4.
+        fillna : string
+            '-', '…', '･･･', 'X'の値を置き換える文字列. The default is 'NULL'.
+        typed : bool
+            Trueの場合, 事項の列をCategorical型, '$'を数値型にする(stats_data_to_df). The default is False.
+        data_format : string
+            'json'または'csv'. get_estat_StatsData_df_allを参照. The default is 'json'.
+        **conditions : 
+            事項ID=条件(whereに加える). lvTab, cdArea等の絞り込み条件はそのまま指定する.
+            例: area=['東京都', '大阪府'], cat01={'max_level': 2}, time={'from': 2015}
     
-        self.data_value = pd.concat(df_lt, axis=0)
+        Returns
+        -------
+        data_value :  pandas.core.frame.DataFrame
+            条件に一致する統計数値(セル)の情報と項目名.
+        where_params : dict
+            リクエストに指定した絞り込み条件.
+        residual : dict
+            取得後に絞り込んだ事項と残したコード.
+        
+        """
+        filters = {k: v for k, v in conditions.items() if k in STATS_DATA_FILTERS}
+        where = dict(where or {}, **{k: v for k, v in conditions.items() if k not in STATS_DATA_FILTERS})
+        CLASS_INF = self._require_meta(statsDataId)
+        with self._stage('compile_where', statsDataId=statsDataId):
+            params, self.residual = compile_where(CLASS_INF, where)
+        self.where_params = dict(filters, **params)
+        self.get_estat_StatsData_df_all(statsDataId, limit=limit, max_workers=max_workers, fillna=fillna, 
+                                        typed=typed, data_format=data_format, **self.where_params)
+        if self.residual:
+            self.data_value = apply_residual(self.data_value, self.residual)
         return self
 
 #%%
     ## データが10万件を超える場合の一括処理
-    def get_estat_StatsData_df_unlimitArea(self, statsDataId):
+    def get_estat_StatsData_df_partitioned(self, statsDataId, limit=100000, dimensions=None, 
+                                           max_workers=1, fillna='NULL', typed=False, 
+                                           data_format='json', **filters):
         """
-        年で2020年から1985年までで分割する。
+        メタ情報のCLASS_INFから分割方法を決め(plan_partitions), 分割ごとに取得して結合する.
+        分割後もlimitを超える場合はページングで全件取得する.
+        
+        Parameters
+        ----------
+        statsDataId : string
+            「統計表情報取得」で得られる統計表IDを指定.
+        limit : int
+            1回のリクエストで取得する件数. The default is 100000.
+        dimensions : list
+            分割に使う事項('tab', 'time', 'area', 'cat01'～'cat03')の候補. 
+            Noneの場合は絞り込み条件を指定していないすべての事項. The default is None.
+        max_workers : int
+            分割ごとにページを同時に取得する数. The default is 1.
+        fillna : string
+            '-', '…', '･･･', 'X'の値を置き換える文字列. The default is 'NULL'.
+        typed : bool
+            Trueの場合, 事項の列をCategorical型, '$'を数値型にする(stats_data_to_df). The default is False.
+        data_format : string
+            'json'または'csv'. get_estat_StatsData_df_allを参照. The default is 'json'.
+        **filters : 
+            lvTab, cdTab, cdTimeFrom, cdArea等のget_estat_StatsDataの絞り込み条件.
+    
+        Returns
+        -------
+        data_value :  pandas.core.frame.DataFrame
+            全件の統計数値(セル)の情報と項目名.
+        partitions : list
+            分割ごとの絞り込み条件.
+        
         """
-        self.get_estat_StatsData(statsDataId)
+        # 件数のみ取得
+        self.get_estat_StatsData(statsDataId, limit=1, cntGetFlg='Y', **filters)
+        STATUS = self.json['GET_STATS_DATA']['RESULT']['STATUS']
+        if STATUS not in (0, 1, 2):
+            raise RemoteDataError(self.json['GET_STATS_DATA']['RESULT']['ERROR_MSG'])
         TOTAL_NUMBER = self.json['GET_STATS_DATA']['STATISTICAL_DATA']['RESULT_INF']['TOTAL_NUMBER']
+        
+        # 階層・コードの絞り込み条件を指定した事項では分割しない
+        if dimensions is None:
+            dimensions = [dim for dim, name in FILTER_DIMENSIONS.items() 
+                          if ('lv' + name not in filters) and ('cd' + name not in filters)]
+        CLASS_INF = _filter_class_range(self._require_meta(statsDataId), filters)
+        dimension, self.partitions = plan_partitions(CLASS_INF, TOTAL_NUMBER, limit, dimensions)
+        if dimension is not None:
+            # 分割に使う事項の範囲はコードの指定に置き換わる
+            name = FILTER_DIMENSIONS[dimension]
+            filters = {k: v for k, v in filters.items() if k not in ('cd' + name + 'From', 'cd' + name + 'To')}
+        
         df_lt = []
-        if TOTAL_NUMBER > 100000:
-            for ca in [('0' + str(i) + '000')[-5:] for i in range(48)]:
-                try:
-                    self.get_estat_StatsData_df(statsDataId, cdArea=ca)  # cdTimeTo未満
-                    if self.STATUS == 0:
-                        df_lt += [self.data_value]
-                        time.sleep(1)
-                except:
-                    pass
+        for partition in self.partitions:
+            self.get_estat_StatsData_df_all(statsDataId, limit=limit, max_workers=max_workers, 
+                                            fillna=fillna, typed=typed, data_format=data_format, 
+                                            **dict(filters, **partition))
+            if self.data_value.shape[0] > 0:
+                df_lt += [self.data_value]
+        self.data_value = pd.concat(df_lt, axis=0, ignore_index=True) if df_lt else pd.DataFrame()
+        self.TOTAL_NUMBER = TOTAL_NUMBER
+        return self
+
+#%%
+    ## データが10万件を超える場合の一括処理
+    def get_estat_StatsData_df_unlimitTime(self, statsDataId, cdTime=None, limit=100000):
+        """
+        時間軸事項のコードで分割して取得する.
+        cdTimeを指定した場合はその年以降(cdTimeFrom)に絞り込む.
+        limitは1回のリクエストで取得する件数(get_estat_StatsData_df_partitioned).
+        """
+        filters = {} if cdTime is None else {'cdTimeFrom': cdTime}
+        return self.get_estat_StatsData_df_partitioned(statsDataId, limit=limit, dimensions=['time'], **filters)
+
+#%%
+    ## データが10万件を超える場合の一括処理
+    def get_estat_StatsData_df_unlimitArea(self, statsDataId, limit=100000):
+        """
+        地域事項のコードで分割して取得する.
+        limitは1回のリクエストで取得する件数(get_estat_StatsData_df_partitioned).
+        """
+        return self.get_estat_StatsData_df_partitioned(statsDataId, limit=limit, dimensions=['area'])
+
+#%%
+    ## Parquet形式での保存・読み込み
+    def to_parquet(self, path, partition_cols=PARTITION_COLUMNS, compression='snappy'):
+        """
+        取得した統計データ(self.data_value)を時間軸・地域コードで分割してParquet形式で保存する.
+        
+        Parameters
+        ----------
+        path : string
+            保存先のディレクトリ.
+        partition_cols : list
+            分割に使う列. The default is ('time', 'area').
+        compression : string
+            圧縮形式. The default is 'snappy'.
+    
+        Returns
+        -------
+        None.
+        
+        """
+        to_parquet(self.data_value, path, partition_cols, compression)
+        return self
+
+    def read_parquet(self, path, columns=None, **filters):
+        """
+        to_parquetで保存した統計データのうち, 指定した分割・列だけをself.data_valueに読み込む.
+        
+        Parameters
+        ----------
+        path : string
+            to_parquetの保存先のディレクトリ.
+        columns : list
+            読み込む列. Noneの場合はすべて. The default is None.
+        **filters : 
+            time='2020000000', area=['13000', '14000']等の列名=値(またはリスト)の絞り込み条件.
+    
+        Returns
+        -------
+        data_value :  pandas.core.frame.DataFrame
+            統計データ.
+        
+        """
+        self.data_value = read_parquet(path, columns, **filters)
+        return self
+
+#%%
+    def parse_time(self, kind='period', column='time'):
+        """
+        時間軸事項のコードを期間に変換した列を加える(parse_time_codes).
+        コードで判別できない場合は項目名('2020年度'等)で判別する.
+        
+        Parameters
+        ----------
+        kind : string
+            'period'の場合は列'period'(Period), 'timestamp'の場合は列'date'(期間の開始日). 
+            The default is 'period'.
+        column : string
+            時間軸事項のコードの列. The default is 'time'.
     
-        self.data_value = pd.concat(df_lt, axis=0)
+        Returns
+        -------
+        data_value :  pandas.core.frame.DataFrame
+            列'period'または'date'を加えた統計データ.
+        """
+        data_value = self.data_value
+        if column not in data_value.columns:
+            raise KeyError('%r is not in data_value' % column)
+        names = None
+        code_name = [col for col in data_value.columns if col.startswith('code_name_%s_' % column)]
+        if code_name and code_name[0][len('code_name_%s_' % column):] in data_value.columns:
+            names = data_value[code_name[0][len('code_name_%s_' % column):]]
+        with self._stage('parse_time', statsDataId=self.statsDataId, rows=data_value.shape[0]):
+            index = parse_time_codes(data_value[column], names=names, kind=kind)
+        data_value['period' if kind == 'period' else 'date'] = np.asarray(index) if index.dtype == object else index.array
         return self
 
 #%%
     def tab_pivot(self, to_numeric=False):
-        self.data_value['code_name_tab_表章項目_unit_level'] = self.data_value['code_name_tab_表章項目'] + '(' + self.data_value['unit'].fillna('') + ')'
-        if 'level_tab_表章項目' in self.data_value.columns:
-            self.data_value['code_name_tab_表章項目_unit_level'] = self.data_value['code_name_tab_表章項目_unit_level'] + self.data_value['level_tab_表章項目']
-        self.data_value['code_name_tab_表章項目_unit_level'] = self.data_value['code_name_tab_表章項目_unit_level'].str.replace('()', '', regex=False)
-        self.data_value = self.data_value.drop(['tab', '表章項目', 'code_name_tab_表章項目', 'unit'], axis=1)
-        if 'level_tab_表章項目' in self.data_value.columns:
-            self.data_value = self.data_value.drop('level_tab_表章項目', axis=1)
-        cols_lst = list(self.data_value.columns)
-        cols_lst.remove('$')
-        df_tab = self.data_value.set_index(cols_lst).unstack()
-        df_tab.columns = [j for i, j in df_tab.columns]
-        if to_numeric:
-            for c in df_tab:
-                try:
-                    df_tab[c] = df_tab[c].astype(int)
-                    print(c, 'をint型に変換しました')
-                except:
-                    try:
-                        df_tab[c] = df_tab[c].astype(float)
-                        print(c, 'をfloat型に変換しました')
-                    except:
-                        print(c, 'はint,floatに変換できません')
-        self.data_value = df_tab.reset_index()
+        """
+        表章項目(tab)ごとの統計数値を列にする. 列名は'コード_項目名(単位)階層'.
+        行・列は文字列ではなく整数のIDで対応付けるため, 入力と同程度のメモリで変換できる.
+        
+        Parameters
+        ----------
+        to_numeric : bool
+            Trueの場合, 統計数値を数値にする. '-', 'X'等の数値でない値はNaN.
+            整数のみの列は整数型(NaNを含む場合はInt64型), それ以外はfloat64型. The default is False.
+    
+        Returns
+        -------
+        data_value :  pandas.core.frame.DataFrame
+            表章項目以外の事項を行, 表章項目を列とする統計数値.
+        
+        """
+        with self._stage('tab_pivot', statsDataId=self.statsDataId, rows=self.data_value.shape[0]):
+            return self._tab_pivot(to_numeric)
+
+    def _tab_pivot(self, to_numeric=False):
+        data_value = self.data_value
+        tab_cols = [col for col in ('code_name_tab_表章項目', 'unit', 'level_tab_表章項目') if col in data_value.columns]
+        drop_cols = {'tab', '表章項目', 'code_name_tab_表章項目', 'unit', 'level_tab_表章項目', '$', 'flag'}
+        row_cols = [col for col in data_value.columns if col not in drop_cols]
+        
+        # 列: 表章項目・単位・階層の組み合わせごとに列名を作る
+        tab_ids, tab_first = _group_ids(data_value, tab_cols)
+        tab_keys = data_value[tab_cols].iloc[tab_first].astype(object)
+        labels = tab_keys['code_name_tab_表章項目'] + '(' + tab_keys['unit'].fillna('') + ')' if 'unit' in tab_cols else tab_keys['code_name_tab_表章項目']
+        if 'level_tab_表章項目' in tab_cols:
+            labels = labels + tab_keys['level_tab_表章項目']
+        labels = labels.str.replace('()', '', regex=False)
+        label_ids, labels = pd.factorize(labels.to_numpy(), sort=True)
+        col_ids = label_ids[tab_ids]
+        
+        # 行: 表章項目以外の事項の組み合わせ
+        row_ids, row_first = _group_ids(data_value, row_cols)
+        n_rows, n_cols = len(row_first), len(labels)
+        cell = row_ids * n_cols + col_ids
+        if pd.Index(cell).has_duplicates:
+            raise ValueError('同じ行・表章項目の統計数値が%d件あります. 絞り込み条件を確認してください.'
+                             % pd.Index(cell).duplicated().sum())
+        
+        values = data_value['$']
+        if to_numeric or pd.api.types.is_numeric_dtype(values):
+            matrix = np.full((n_rows, n_cols), np.nan)
+            matrix[row_ids, col_ids] = pd.to_numeric(values, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+            columns = {label: _downcast(matrix[:, j]) for j, label in enumerate(labels)}
+        else:
+            matrix = np.full((n_rows, n_cols), np.nan, dtype=object)
+            matrix[row_ids, col_ids] = values.to_numpy(dtype=object)
+            columns = {label: matrix[:, j] for j, label in enumerate(labels)}
+        df_tab = data_value[row_cols].iloc[row_first].reset_index(drop=True)
+        self.data_value = pd.concat([df_tab, pd.DataFrame(columns, index=df_tab.index)], axis=1)
         return self
+
+
+#%%
+class estatReader:
+    def __init__(self, symbols, start=None, end=None, chunksize=25, max_workers=4, 
+                 retry_count=3, pause=0.1, timeout=30, session=None, api_key=None, 
+                 output='concat', limit=100000, fillna='NULL', typed=False, data_format='json', 
+                 parse_dates=False, where=None, **kwargs):
+        """
+        pandas-datareader形式で複数の統計表を取得する. 
+        統計表IDをchunksize件ずつに分け, max_workersのスレッドで同時に取得する.
+        
+        Parameters
+        ----------
+        symbols : string, list
+            統計表ID, または統計表IDのリスト.
+        start : string, int, date, datetime, Timestamp, Period
+            期間の開始. 時間軸事項のコード, 年(2015), 年月('2015-04')等. 
+            cdTimeFromに変換して取得する(time_code_bound). The default is None.
+        end : string, int, date, datetime, Timestamp, Period
+            期間の終了. cdTimeToに変換して取得する. The default is None.
+        chunksize : int
+            一度に取得を開始する統計表の数. The default is 25.
+        max_workers : int
+            同時に取得する統計表の数の上限. The default is 4.
+        retry_count : int
+            5xxエラー, 接続エラー時のリトライ回数. The default is 3.
+        pause : float
+            最初のリトライまでの待機時間(秒). The default is 0.1.
+        timeout : int, float
+            1リクエストあたりのタイムアウト(秒). The default is 30.
+        session : requests.Session
+            すべてのリクエストで共有するセッション. Noneの場合は作成する. The default is None.
+        api_key : string
+            アプリケーションID. Noneの場合は環境変数ESTAT_APP_ID. The default is None.
+        output : string
+            'dict'の場合は統計表IDをキーとする辞書型, 'concat'の場合は統計表IDを
+            インデックスの1階層目として結合したDataFrame. The default is 'concat'.
+        limit : int
+            1回のリクエストで取得する件数. The default is 100000.
+        fillna : string
+            '-', '…', '･･･', 'X'の値を置き換える文字列. The default is 'NULL'.
+        typed : bool
+            Trueの場合, 事項の列をCategorical型, '$'を数値型にする(stats_data_to_df). The default is False.
+        data_format : string
+            'json'または'csv'(get_estat_StatsData_df_allを参照). The default is 'json'.
+        parse_dates : bool
+            Trueの場合, 期間の開始日の列'date'を加える(eStatReader.parse_time). The default is False.
+        where : dict
+            事項ごとの条件(eStatReader.get_estat_StatsData_df_where). The default is None.
+        **kwargs : 
+            cache, base_url, hooks等のeStatReaderの引数, 
+            またはcdArea等のget_estat_StatsDataの絞り込み条件.
+
+        Returns
+        -------
+        None.
+
+        """
+        if output not in ('dict', 'concat'):
+            raise ValueError("'output' must be 'dict' or 'concat'")
+        api_key = api_key or os.getenv('ESTAT_APP_ID')
+        if not api_key:
+            raise ValueError('The e-Stat appId must be provided either through the api_key variable '
+                             'or through the environment variable ESTAT_APP_ID')
+        self.symbols = symbols
+        self.chunksize = chunksize
+        self.max_workers = max_workers
+        self.output = output
+        self.limit = limit
+        self.fillna = fillna
+        self.typed = typed
+        self.data_format = data_format
+        self.filters = {k: v for k, v in kwargs.items() if k in STATS_DATA_FILTERS}
+        # 必要な期間だけを取得する(年度, 四半期等はコードの範囲で除けないため取得後にも絞り込む)
+        self.start = start
+        self.end = end
+        if start is not None:
+            self.filters['cdTimeFrom'] = time_code_bound(start, 'start')
+        if end is not None:
+            self.filters['cdTimeTo'] = time_code_bound(end, 'end')
+        self.parse_dates = parse_dates
+        self.where = where
+        options = {k: v for k, v in kwargs.items() if k not in STATS_DATA_FILTERS}
+        # すべての統計表でセッション(コネクションプール)を共有する
+        self._own_session = session is None
+        self.session = _init_session(session, pool_size=max(max_workers, 10))
+        # 統計表ごとのeStatReaderで同じリクエストをまとめ, リクエスト数の上限を共有する
+        options.setdefault('coalesce', SingleFlight())
+        options['rate_limit'] = _init_rate_limit(options.get('rate_limit'))
+        self._reader_options = dict(options, appId=api_key, session=self.session, timeout=timeout, 
+                                    retry_count=retry_count, pause=pause)
+
+    def close(self):
+        if self._own_session:
+            self.session.close()
+
+    def read(self):
+        """
+        すべての統計表を取得する.
+
+        Returns
+        -------
+        data : pandas.core.frame.DataFrame, dict
+            symbolsが文字列の場合は統計表のDataFrame. 
+            リストの場合はoutputに応じて辞書型または結合したDataFrame.
+        """
+        try:
+            if isinstance(self.symbols, str):
+                return self._read_one(self.symbols)
+            return self._read_many(list(self.symbols))
+        finally:
+            self.close()
+
+    def _read_one(self, statsDataId):
+        # 統計表ごとに結果を保持するため, eStatReaderはスレッドごとではなく統計表ごとに作成する
+        reader = eStatReader(**self._reader_options)
+        if self.where:
+            reader.get_estat_StatsData_df_where(statsDataId, self.where, limit=self.limit, max_workers=1, 
+                                                fillna=self.fillna, typed=self.typed, 
+                                                data_format=self.data_format, **self.filters)
+        else:
+            reader.get_estat_StatsData_df_all(statsDataId, limit=self.limit, max_workers=1, fillna=self.fillna, 
+                                              typed=self.typed, data_format=self.data_format, **self.filters)
+        reader.data_value = truncate_time(reader.data_value, self.start, self.end)
+        if self.parse_dates:
+            if (reader.data_value.shape[0] == 0) and ('time' not in reader.data_value.columns):
+                # 該当データなし(STATUS=1)は列もないため, 変換後の列だけ加える
+                reader.data_value = reader.data_value.assign(date=pd.Series(dtype='datetime64[ns]'))
+            else:
+                reader.parse_time(kind='timestamp')
+        return reader.data_value
+
+    def _read_many(self, symbols):
+        data = {}
+        failed = []
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            for i in range(0, len(symbols), self.chunksize):
+                chunk = symbols[i:i + self.chunksize]
+                futures = [(statsDataId, executor.submit(self._read_one, statsDataId)) for statsDataId in chunk]
+                for statsDataId, future in futures:
+                    try:
+                        data[statsDataId] = future.result()
+                    except (RemoteDataError, KeyError, ValueError) as e:
+                        warnings.warn('Failed to read symbol: {0!r}, {1}'.format(statsDataId, e))
+                        failed.append(statsDataId)
+        if symbols and (len(failed) == len(symbols)):
+            raise RemoteDataError('No data fetched using {0!r}'.format(self.__class__.__name__))
+        self.failed = failed
+        if self.output == 'dict':
+            return data
+        frames = {statsDataId: df for statsDataId, df in data.items() if df.shape[0] > 0}
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, names=['statsDataId', None])
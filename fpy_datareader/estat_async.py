@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+総務省統計局e-StatAPIからasyncioでデータを取得する
+https://www.e-stat.go.jp/api/api-info/e-stat-manual3-0
+
+author: WeLLiving@well-living
+"""
+
+import asyncio
+import functools
+import json
+
+from fpy_datareader.cache import request_key
+from fpy_datareader.estat import (
+    RemoteDataError,
+    _api_url,
+    _result_status,
+    _stats_data_params,
+    flatten_table_inf,
+    stats_data_to_df,
+)
+from fpy_datareader.lazy import lazy_import
+
+pd = lazy_import('pandas')
+aiohttp = lazy_import('aiohttp', optional=True)
+
+
+#%%
+def _to_thread(func, *args, **kwargs):
+    """
+    funcを既定のスレッドプールで実行して結果を待つ(asyncio.to_threadはPython 3.9以降のため).
+    """
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+#%%
+class AsyncEStatReader:
+    def __init__(self, appId, version='3.0', cache=None,
+                 limit=10, timeout=30,
+                 retry_count=3, pause=0.1, pause_multiplier=2, base_url=None):
+        """
+        eStatReaderのasyncio版. aiohttpで同時にlimit本までの接続を使う.
+
+        Parameters
+        ----------
+        appId : string
+            取得したアプリケーションIDを指定.
+        version : string, float
+            e-Stat APIのバージョン. The default is '3.0'.
+        cache : object
+            get(key)とset(key, content)を持つレスポンスキャッシュ.
+            fpy_datareader.cache.FileCache等. Noneの場合はキャッシュしない. The default is None.
+        limit : int
+            同時接続数の上限. The default is 10.
+        timeout : int, float
+            1リクエストあたりのタイムアウト(秒). The default is 30.
+        retry_count : int
+            5xxエラー, 接続エラー時のリトライ回数. The default is 3.
+        pause : float
+            最初のリトライまでの待機時間(秒). The default is 0.1.
+        pause_multiplier : float
+            リトライごとに待機時間に掛ける倍率. The default is 2.
+        base_url : string
+            APIのホスト. Noneの場合はe-Stat(eStatReaderと同じ). The default is None.
+
+        Returns
+        -------
+        None.
+
+        """
+        if aiohttp is None:
+            raise ImportError('AsyncEStatReader requires aiohttp. pip install aiohttp')
+        if not isinstance(retry_count, int) or retry_count < 0:
+            raise ValueError("'retry_count' must be integer larger than or equal to 0")
+        self.appId = appId
+        self.version = version
+        self.cache = cache
+        self.limit = limit
+        self.timeout = timeout
+        self.retry_count = retry_count
+        self.pause = pause
+        self.pause_multiplier = pause_multiplier
+        self.base_url = base_url
+        self.session = None
+
+    async def _get_session(self):
+        # aiohttpのセッションはイベントループの中で作成する
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'Accept-Encoding': 'gzip, deflate'},
+            )
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+#%%
+    # APIへのリクエスト
+    def _url(self, endpoint):
+        return _api_url(self.version, self.base_url) + endpoint
+
+    async def _get_response(self, url, params):
+        session = await self._get_session()
+        pause = self.pause
+        last_error = ''
+        for i in range(self.retry_count + 1):
+            if i > 0:
+                await asyncio.sleep(pause)
+                pause *= self.pause_multiplier
+            try:
+                async with session.get(url, params=params) as response:
+                    if response.status == 200:
+                        return await response.read()
+                    last_error = 'HTTP %d' % response.status
+                    if (response.status < 500) and (response.status != 429):
+                        break
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                last_error = repr(e)
+        raise RemoteDataError('Unable to read URL: {0}\n{1}'.format(url, last_error))
+
+    async def _get_json(self, endpoint, params):
+        """
+        APIからJSONを取得. キャッシュがある場合はキャッシュを優先.
+        キャッシュの読み書き(gzip, ディスク)とJSONの変換はイベントループを止めないように別スレッドで行う.
+        """
+        url = self._url(endpoint)
+        params = {k: str(v) for k, v in params.items() if v is not None}
+        key = None
+        if self.cache is not None:
+            key = request_key(url, params)
+            content = await _to_thread(self.cache.get, key)
+            if content is not None:
+                return await _to_thread(json.loads, content)
+        query = {'appId': self.appId}
+        query.update(params)
+        content = await self._get_response(url, query)
+        jsn = await _to_thread(json.loads, content)
+        # エラー応答はキャッシュしない
+        if (key is not None) and (_result_status(jsn) in (0, 1, 2)):
+            await _to_thread(self.cache.set, key, content)
+        return jsn
+
+#%%
+    async def get_stats_list(self, **params):
+        """
+        統計表情報取得
+
+        Parameters
+        ----------
+        **params :
+            surveyYears, statsCode, searchWord, updatedDate等のgetStatsListのパラメータ.
+
+        Returns
+        -------
+        TABLE_INF : pandas.core.frame.DataFrame
+            統計表の情報. 辞書型の項目はflatten_table_infで列に展開.
+        STATUS : int
+            0～2の場合は正常終了、100以上の場合はエラー.
+        DATE : date
+            このJSONデータが出力された日時.
+        NUMBER : int
+            出力される統計表の件数.
+        RESULT_INF : dict
+            データの開始位置、データの終了位置.
+        """
+        jsn = await self._get_json('getStatsList', params)
+        STATUS = jsn['GET_STATS_LIST']['RESULT']['STATUS']
+        DATE = jsn['GET_STATS_LIST']['RESULT']['DATE']
+        if STATUS not in (0, 1, 2):
+            raise RemoteDataError(jsn['GET_STATS_LIST']['RESULT']['ERROR_MSG'])
+        DATALIST_INF = jsn['GET_STATS_LIST'].get('DATALIST_INF', {})
+        NUMBER = DATALIST_INF.get('NUMBER', 0)
+        RESULT_INF = DATALIST_INF.get('RESULT_INF')
+        TABLE_INF = await _to_thread(flatten_table_inf, DATALIST_INF.get('TABLE_INF', []))
+        return TABLE_INF, STATUS, DATE, NUMBER, RESULT_INF
+
+    async def get_meta_info(self, statsDataId):
+        """
+        メタ情報取得
+
+        Returns
+        -------
+        TABLE_INF, CLASS_INF, STATUS, DATE
+            eStatReader.get_estat_MetaInfoと同じ.
+        """
+        MetaInfo = await self._get_json('getMetaInfo', {'statsDataId': statsDataId})
+        STATUS = MetaInfo['GET_META_INFO']['RESULT']['STATUS']
+        if STATUS not in (0, 1, 2):
+            raise RemoteDataError(MetaInfo['GET_META_INFO']['RESULT']['ERROR_MSG'])
+        TABLE_INF = MetaInfo['GET_META_INFO']['METADATA_INF']['TABLE_INF']
+        CLASS_INF = MetaInfo['GET_META_INFO']['METADATA_INF']['CLASS_INF']
+        DATE = MetaInfo['GET_META_INFO']['RESULT']['DATE']
+        return TABLE_INF, CLASS_INF, STATUS, DATE
+
+    async def get_stats_data(self, statsDataId, limit=100000, fillna='NULL', typed=False, **filters):
+        """
+        統計データを全件取得する. 1ページ目のTOTAL_NUMBERから残りのページを同時に取得する.
+
+        Parameters
+        ----------
+        statsDataId : string
+            「統計表情報取得」で得られる統計表IDを指定.
+        limit : int
+            1回のリクエストで取得する件数. The default is 100000.
+        fillna : string
+            '-', '…', '･･･', 'X'の値を置き換える文字列. The default is 'NULL'.
+        typed : bool
+            Trueの場合, 事項の列をCategorical型, '$'を数値型にする(stats_data_to_df). The default is False.
+        **filters :
+            lvTab, cdTab, cdTimeFrom, cdArea等のget_estat_StatsDataの絞り込み条件.
+
+        Returns
+        -------
+        data_value :  pandas.core.frame.DataFrame
+            全件の統計数値(セル)の情報と項目名.
+        """
+        async def fetch_page(position):
+            params = _stats_data_params(statsDataId, startPosition=position, limit=limit, **filters)
+            jsn = await self._get_json('getStatsData', params)
+            STATUS = jsn['GET_STATS_DATA']['RESULT']['STATUS']
+            if STATUS not in (0, 1, 2):
+                raise RemoteDataError(jsn['GET_STATS_DATA']['RESULT']['ERROR_MSG'])
+            return jsn
+
+        first = await fetch_page(None)
+        if first['GET_STATS_DATA']['RESULT']['STATUS'] == 1:  # 該当データなし
+            return pd.DataFrame()
+        TOTAL_NUMBER = first['GET_STATS_DATA']['STATISTICAL_DATA']['RESULT_INF']['TOTAL_NUMBER']
+        positions = range(1 + limit, TOTAL_NUMBER + 1, limit)
+        # DataFrameへの変換はイベントループを止めないように別スレッドで行う
+        df_lt = [await _to_thread(stats_data_to_df, first, fillna, typed)]
+        for jsn in await asyncio.gather(*[fetch_page(position) for position in positions]):
+            df_lt += [await _to_thread(stats_data_to_df, jsn, fillna, typed)]
+        return await _to_thread(pd.concat, df_lt, axis=0, ignore_index=True)
+
+    async def gather_stats_data(self, statsDataIds, return_exceptions=False, **kwargs):
+        """
+        複数の統計表を同時に取得する.
+
+        Parameters
+        ----------
+        statsDataIds : list
+            統計表IDのリスト.
+        return_exceptions : bool
+            Trueの場合, 取得に失敗した統計表は例外オブジェクトを返す. The default is False.
+        **kwargs :
+            get_stats_dataの引数.
+
+        Returns
+        -------
+        data : dict
+            統計表IDをキー, DataFrameを値とする辞書.
+        """
+        results = await asyncio.gather(
+            *[self.get_stats_data(statsDataId, **kwargs) for statsDataId in statsDataIds],
+            return_exceptions=return_exceptions,
+        )
+        return dict(zip(statsDataIds, results))
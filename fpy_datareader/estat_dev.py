@@ -74,7 +74,7 @@ class etatReader():
         self.end = end
 
         if not isinstance(retry_count, int) or retry_count < 0:
-            raise ValueError("'retry_count' must be integer larger than 0")
+            raise ValueError("'retry_count' must be integer larger than or equal to 0")
         self.retry_count = retry_count
         self.pause = pause
         self.timeout = timeout
@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+"""
+負荷試験・動作確認用のe-StatAPIの代替サーバー
+記録したレスポンス, またはfpy_datareader.testingで生成したデータを返す
+
+    python -m fpy_datareader.fake_server --port 8080 --latency 0.05 --error-rate 0.01 --rate-limit 10
+
+    esr = estat.eStatReader(appId, base_url='http://127.0.0.1:8080')
+
+author: WeLLiving@well-living
+"""
+
+import argparse
+import collections
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from fpy_datareader.estat import FILTER_DIMENSIONS
+from fpy_datareader.testing import (
+    RESULT,
+    make_data_catalog,
+    make_stats_data,
+    make_stats_list,
+)
+
+
+#%%
+PATH_PATTERN = re.compile(r'^/rest/(?P<version>[^/]+)/app/(?:(?P<format>json)/)?(?P<endpoint>\w+)$')
+
+ERROR_MSG = {
+    0: '正常に終了しました。',
+    1: '正常に終了しましたが、該当データはありませんでした。',
+    2: '正常に終了しましたが、一部にエラーがあります。',
+    100: '認証に失敗しました。アプリケーションIDを確認して下さい。',
+    101: 'パラメータが不正です。',
+}
+
+
+def _result(status, msg=None):
+    return dict(RESULT, STATUS=status, ERROR_MSG=msg or ERROR_MSG.get(status, ''),
+                DATE=time.strftime('%Y-%m-%dT%H:%M:%S.000+09:00'))
+
+def _as_list(obj):
+    return obj if type(obj) == list else [obj]
+
+def _level_range(value):
+    """
+    lv*の指定('1', '1-3', '-3', '2-')を(下限, 上限)にする.
+    """
+    value = str(value)
+    if '-' not in value:
+        return int(value), int(value)
+    low, high = value.split('-', 1)
+    return int(low) if low else 0, int(high) if high else 10 ** 9
+
+#%%
+class FakeEStatServer:
+    def __init__(self, host='127.0.0.1', port=0, fixtures=None, shape=None, n_tables=1000,
+                 latency=0.0, error_rate=0.0, rate_limit=None, seed=0):
+        """
+        e-StatAPI(/rest/<version>/app/json/*, getSimpleStatsData)と同じURL・パラメータで応答するHTTPサーバー.
+        startPosition, limit, lv*, cd*, cd*From, cd*To, metaGetFlg, cntGetFlgに対応する.
+
+        Parameters
+        ----------
+        host : string
+            待ち受けるホスト. The default is '127.0.0.1'.
+        port : int
+            待ち受けるポート. 0の場合は空いているポート. The default is 0.
+        fixtures : string, dict
+            統計データ取得APIのレスポンス(全件, metaGetFlg='Y')を統計表IDごとに持つ辞書,
+            または'<statsDataId>.json'を保存したディレクトリ.
+            ディレクトリに'getStatsList.json'がある場合は統計表情報取得APIのレスポンスに使う.
+            fixturesにない統計表IDはmake_stats_dataで生成する. The default is None.
+        shape : dict
+            生成する統計データの事項ごとのクラス数(make_stats_data). The default is None.
+        n_tables : int
+            生成する統計表情報の件数(make_stats_list). The default is 1000.
+        latency : float
+            1リクエストごとの待機時間(秒). The default is 0.0.
+        error_rate : float
+            HTTP 503を返す割合. The default is 0.0.
+        rate_limit : float
+            1秒あたりのリクエスト数の上限. 超えた場合はHTTP 429. Noneの場合は制限なし. The default is None.
+        seed : int
+            乱数のシード. The default is 0.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.shape = shape
+        self.n_tables = n_tables
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent = collections.deque()
+        self.counts = collections.Counter()
+        self.stats_list = None
+        self.tables = {}
+        if isinstance(fixtures, str):
+            for name in os.listdir(fixtures):
+                if not name.endswith('.json'):
+                    continue
+                with open(os.path.join(fixtures, name), 'rb') as f:
+                    jsn = json.load(f)
+                if name == 'getStatsList.json':
+                    self.stats_list = jsn
+                else:
+                    self.tables[name[:-len('.json')]] = jsn
+        elif fixtures is not None:
+            self.tables.update(fixtures)
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        eStatReader(base_url=...)に指定するURL.
+        """
+        host, port = self.httpd.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+#%%
+    # 応答するデータ
+    def _table(self, statsDataId):
+        with self._lock:
+            if statsDataId not in self.tables:
+                seed = self.seed + sum(map(ord, statsDataId))
+                self.tables[statsDataId] = make_stats_data(self.shape, limit=10 ** 12, seed=seed,
+                                                           statsDataId=statsDataId)
+            return self.tables[statsDataId]
+
+    def _get_stats_list(self):
+        with self._lock:
+            if self.stats_list is None:
+                self.stats_list = make_stats_list(self.n_tables, self.seed)
+            return self.stats_list
+
+    def _filter_rows(self, table, params):
+        STATISTICAL_DATA = table['GET_STATS_DATA']['STATISTICAL_DATA']
+        rows = _as_list(STATISTICAL_DATA.get('DATA_INF', {}).get('VALUE', []))
+        levels = {
+            obj['@id']: {c['@code']: c.get('@level') for c in _as_list(obj['CLASS'])}
+            for obj in STATISTICAL_DATA['CLASS_INF']['CLASS_OBJ']
+        }
+        for dim, name in FILTER_DIMENSIONS.items():
+            key = '@' + dim
+            if params.get('lv' + name):
+                low, high = _level_range(params['lv' + name])
+                level = levels.get(dim, {})
+                rows = [r for r in rows if low <= int(level.get(r.get(key)) or 0) <= high]
+            if params.get('cd' + name):
+                codes = set(params['cd' + name].split(','))
+                rows = [r for r in rows if r.get(key) in codes]
+            # 範囲は前方一致で比較する(cdTimeFrom='2015'は'2015000000'以降, estat._filter_class_range)
+            if params.get('cd' + name + 'From'):
+                low = params['cd' + name + 'From']
+                rows = [r for r in rows if r.get(key, '')[:len(low)] >= low]
+            if params.get('cd' + name + 'To'):
+                high = params['cd' + name + 'To']
+                rows = [r for r in rows if r.get(key, '')[:len(high)] <= high]
+        return rows
+
+    def get_stats_data(self, params):
+        statsDataId = params.get('statsDataId')
+        if not statsDataId:
+            return {'GET_STATS_DATA': {'RESULT': _result(101, 'statsDataIdを指定して下さい。'), 'PARAMETER': params}}
+        table = self._table(statsDataId)
+        rows = self._filter_rows(table, params)
+        start = int(params.get('startPosition') or 1)
+        limit = int(params.get('limit') or 100000)
+        page = rows[start - 1:start - 1 + limit]
+        STATISTICAL_DATA = {
+            k: v for k, v in table['GET_STATS_DATA']['STATISTICAL_DATA'].items()
+            if k not in ('DATA_INF', 'RESULT_INF')
+        }
+        if params.get('metaGetFlg') == 'N':
+            STATISTICAL_DATA.pop('TABLE_INF', None)
+            STATISTICAL_DATA.pop('CLASS_INF', None)
+        RESULT_INF = {'TOTAL_NUMBER': len(rows), 'FROM_NUMBER': start, 'TO_NUMBER': start - 1 + len(page)}
+        if start - 1 + limit < len(rows):
+            RESULT_INF['NEXT_KEY'] = start + limit
+        STATISTICAL_DATA = dict({'RESULT_INF': RESULT_INF}, **STATISTICAL_DATA)
+        if page and (params.get('cntGetFlg') != 'Y'):
+            STATISTICAL_DATA['DATA_INF'] = {'VALUE': page[0] if len(page) == 1 else page}
+        status = 0 if rows else 1
+        return {'GET_STATS_DATA': {
+            'RESULT': _result(status),
+            'PARAMETER': dict(table['GET_STATS_DATA'].get('PARAMETER', {}), STATS_DATA_ID=statsDataId),
+            'STATISTICAL_DATA': STATISTICAL_DATA,
+        }}
+
+    def get_simple_stats_data(self, params):
+        """
+        getStatsDataの応答をCSV形式(sectionHeaderFlg=1)にする.
+        """
+        jsn = self.get_stats_data(params)['GET_STATS_DATA']
+        out = io.StringIO()
+        writer = csv.writer(out, quoting=csv.QUOTE_ALL, lineterminator='\r\n')
+        writer.writerow(['RESULT'])
+        for key in ('STATUS', 'ERROR_MSG', 'DATE'):
+            writer.writerow([key, jsn['RESULT'][key]])
+        STATISTICAL_DATA = jsn.get('STATISTICAL_DATA', {})
+        if 'RESULT_INF' in STATISTICAL_DATA:
+            writer.writerow(['STATISTICAL_DATA'])
+            for key, value in STATISTICAL_DATA['RESULT_INF'].items():
+                writer.writerow([key, value])
+        if 'DATA_INF' in STATISTICAL_DATA:
+            CLASS_OBJ = self._table(params['statsDataId'])['GET_STATS_DATA']['STATISTICAL_DATA']['CLASS_INF']['CLASS_OBJ']
+            names = {obj['@id']: {c['@code']: c['@name'] for c in _as_list(obj['CLASS'])} for obj in CLASS_OBJ}
+            header = []
+            for obj in CLASS_OBJ:
+                header += [obj['@id'] + '_code', obj['@name']]
+            writer.writerow(['VALUE'])
+            writer.writerow(header + ['unit', 'value'])
+            for row in _as_list(STATISTICAL_DATA['DATA_INF']['VALUE']):
+                line = []
+                for obj in CLASS_OBJ:
+                    code = row.get('@' + obj['@id'], '')
+                    line += [code, names[obj['@id']].get(code, '')]
+                writer.writerow(line + [row.get('@unit', ''), row['$']])
+        return out.getvalue()
+
+    def get_meta_info(self, params):
+        statsDataId = params.get('statsDataId')
+        if not statsDataId:
+            return {'GET_META_INFO': {'RESULT': _result(101, 'statsDataIdを指定して下さい。'), 'PARAMETER': params}}
+        STATISTICAL_DATA = self._table(statsDataId)['GET_STATS_DATA']['STATISTICAL_DATA']
+        return {'GET_META_INFO': {
+            'RESULT': _result(0),
+            'PARAMETER': {'LANG': 'J', 'STATS_DATA_ID': statsDataId, 'DATA_FORMAT': 'J'},
+            'METADATA_INF': {'TABLE_INF': STATISTICAL_DATA['TABLE_INF'], 'CLASS_INF': STATISTICAL_DATA['CLASS_INF']},
+        }}
+
+    def get_stats_list(self, params):
+        jsn = self._get_stats_list()
+        tables = _as_list(jsn['GET_STATS_LIST']['DATALIST_INF'].get('TABLE_INF', []))
+        if params.get('statsCode'):
+            tables = [t for t in tables if t['STAT_NAME']['@code'] == params['statsCode']]
+        if params.get('updatedDate'):
+            # yyyy, yyyymm, yyyymmddまたはyyyymmdd-yyyymmddの期間
+            low, _, high = params['updatedDate'].partition('-')
+            high = high or low
+            tables = [t for t in tables
+                      if low <= t.get('UPDATED_DATE', '').replace('-', '')[:len(low)]
+                      and t.get('UPDATED_DATE', '').replace('-', '')[:len(high)] <= high]
+        start = int(params.get('startPosition') or 1)
+        limit = int(params.get('limit') or 100000)
+        page = tables[start - 1:start - 1 + limit]
+        RESULT_INF = {'FROM_NUMBER': start, 'TO_NUMBER': start - 1 + len(page)}
+        if start - 1 + limit < len(tables):
+            RESULT_INF['NEXT_KEY'] = start + limit
+        DATALIST_INF = {'NUMBER': len(tables), 'RESULT_INF': RESULT_INF}
+        if page:
+            DATALIST_INF['TABLE_INF'] = page[0] if len(page) == 1 else page
+        return {'GET_STATS_LIST': {
+            'RESULT': _result(0 if tables else 1),
+            'PARAMETER': dict(params, LANG='J', DATA_FORMAT='J'),
+            'DATALIST_INF': DATALIST_INF,
+        }}
+
+    def get_data_catalog(self, params):
+        jsn = make_data_catalog(int(params.get('limit') or 100), self.seed)
+        jsn['GET_DATA_CATALOG']['RESULT'] = _result(0)
+        return jsn
+
+#%%
+    # HTTPリクエストの処理
+    def _throttle(self):
+        """
+        遅延, エラー, 流量制限を適用し, 返すHTTPステータスを決める(200, 429, 503).
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self.rate_limit is not None:
+                now = time.monotonic()
+                while self._recent and (now - self._recent[0] >= 1.0):
+                    self._recent.popleft()
+                if len(self._recent) >= self.rate_limit:
+                    return 429
+                self._recent.append(now)
+            if self.error_rate and (self._random.random() < self.error_rate):
+                return 503
+        return 200
+
+    def handle(self, path, params):
+        """
+        リクエストのパスとパラメータからHTTPステータス, Content-Type, 本文を返す.
+        """
+        match = PATH_PATTERN.match(path)
+        if match is None:
+            return 404, 'text/plain; charset=utf-8', 'Not Found'
+        endpoint, is_json = match.group('endpoint'), match.group('format') == 'json'
+        handlers = {
+            'getStatsList': self.get_stats_list,
+            'getMetaInfo': self.get_meta_info,
+            'getStatsData': self.get_stats_data,
+            'getDataCatalog': self.get_data_catalog,
+        }
+        if (endpoint not in handlers) and not (endpoint == 'getSimpleStatsData' and not is_json):
+            return 404, 'text/plain; charset=utf-8', 'Not Found'
+        with self._lock:
+            self.counts[endpoint] += 1
+        status = self._throttle()
+        if status != 200:
+            return status, 'text/plain; charset=utf-8', 'Too Many Requests' if status == 429 else 'Service Unavailable'
+        appId = params.pop('appId', None)
+        if endpoint == 'getSimpleStatsData':
+            if not appId:
+                RESULT = _result(100)
+                return 200, 'text/csv; charset=utf-8', '"RESULT"\r\n' + ''.join(
+                    '"%s","%s"\r\n' % (key, RESULT[key]) for key in ('STATUS', 'ERROR_MSG', 'DATE'))
+            return 200, 'text/csv; charset=utf-8', self.get_simple_stats_data(params)
+        if not appId:
+            # getStatsList -> GET_STATS_LIST
+            key = 'GET_' + re.sub(r'(?<!^)(?=[A-Z])', '_', endpoint[3:]).upper()
+            return 200, 'application/json; charset=utf-8', json.dumps(
+                {key: {'RESULT': _result(100), 'PARAMETER': params}}, ensure_ascii=False)
+        return 200, 'application/json; charset=utf-8', json.dumps(handlers[endpoint](params), ensure_ascii=False)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                status, content_type, body = server.handle(url.path, dict(parse_qsl(url.query)))
+                body = body.encode('utf-8')
+                gzipped = 'gzip' in self.headers.get('Accept-Encoding', '')
+                if gzipped:
+                    body = gzip.compress(body, compresslevel=1)
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                if gzipped:
+                    self.send_header('Content-Encoding', 'gzip')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+#%%
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='e-StatAPIの代替サーバー')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--fixtures', help="'<statsDataId>.json'を保存したディレクトリ")
+    parser.add_argument('--n-tables', type=int, default=1000, help='生成する統計表情報の件数')
+    parser.add_argument('--latency', type=float, default=0.0, help='1リクエストごとの待機時間(秒)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='HTTP 503を返す割合')
+    parser.add_argument('--rate-limit', type=float, help='1秒あたりのリクエスト数の上限')
+    args = parser.parse_args(argv)
+    server = FakeEStatServer(args.host, args.port, fixtures=args.fixtures, n_tables=args.n_tables,
+                             latency=args.latency, error_rate=args.error_rate, rate_limit=args.rate_limit)
+    print('serving on ' + server.url)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+eStatReaderのリクエスト・処理ごとのイベントを集計する
+
+    stats = StageStats()
+    esr = estat.eStatReader(appId, hooks=[stats])
+    esr.get_estat_StatsData_df(statsDataId)
+    stats.summary()
+
+author: WeLLiving@well-living
+"""
+
+import threading
+from collections import defaultdict
+
+from fpy_datareader.lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+#%%
+def event_name(event):
+    """
+    集計の単位. requestは'request:<endpoint>', stageは処理名, それ以外はevent.
+    """
+    if event['event'] == 'request':
+        return 'request:' + event['endpoint'] + (':cache' if event.get('cache_hit') else '')
+    if event['event'] == 'stage':
+        return event['stage']
+    return event['event']
+
+#%%
+class StageStats:
+    def __init__(self):
+        """
+        eStatReader(hooks=[...])またはadd_hookに指定して, イベントごとの
+        所要時間(elapsed), 通信時間(latency), バイト数, 行数を集計する.
+        複数のスレッドから呼び出してもよい.
+
+        Returns
+        -------
+        None.
+
+        """
+        self._lock = threading.Lock()
+        self.clear()
+
+    def __call__(self, event):
+        name = event_name(event)
+        with self._lock:
+            record = self._records[name]
+            record['elapsed'].append(event.get('elapsed') or 0.0)
+            if event.get('latency') is not None:
+                record['latency'].append(event['latency'])
+            record['bytes'] += event.get('bytes') or 0
+            record['rows'] += event.get('rows') or 0
+
+    def clear(self):
+        with self._lock:
+            self._records = defaultdict(lambda: {'elapsed': [], 'latency': [], 'bytes': 0, 'rows': 0})
+
+    def summary(self):
+        """
+        イベントごとの件数, 所要時間の合計・p50・p95・最大(秒), 通信時間のp50・p95(秒),
+        バイト数・行数の合計. 所要時間の合計が大きい順.
+
+        Returns
+        -------
+        summary : pandas.core.frame.DataFrame
+        """
+        rows = []
+        with self._lock:
+            for name, record in self._records.items():
+                elapsed = np.array(record['elapsed'])
+                latency = np.array(record['latency'])
+                rows.append({
+                    'name': name,
+                    'count': elapsed.size,
+                    'total_s': elapsed.sum(),
+                    'p50_s': np.percentile(elapsed, 50),
+                    'p95_s': np.percentile(elapsed, 95),
+                    'max_s': elapsed.max(),
+                    'latency_p50_s': np.percentile(latency, 50) if latency.size else np.nan,
+                    'latency_p95_s': np.percentile(latency, 95) if latency.size else np.nan,
+                    'bytes': record['bytes'],
+                    'rows': record['rows'],
+                })
+        columns = ['name', 'count', 'total_s', 'p50_s', 'p95_s', 'max_s',
+                   'latency_p50_s', 'latency_p95_s', 'bytes', 'rows']
+        summary = pd.DataFrame(rows, columns=columns)
+        return summary.sort_values('total_s', ascending=False).set_index('name')
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+pandas, numpy, requests等を最初に使うときまで読み込まない(import fpy_datareaderを速くする)
+
+author: WeLLiving@well-living
+"""
+
+import importlib
+import importlib.util
+import sys
+import types
+
+
+#%%
+class _LazyModule(types.ModuleType):
+    """
+    最初に属性にアクセスしたときにimportlib.import_moduleで読み込むモジュール.
+    sys.modulesには登録しないため, 複数のスレッドから同時にアクセスしても
+    importのロックで読み込みが終わるまで待つ(LazyLoaderはPython 3.11以前でスレッドセーフではない).
+    """
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__name__)
+        # 以降は__getattr__を経由しない
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+def lazy_import(name, optional=False):
+    """
+    モジュールを属性に最初にアクセスしたときに読み込む.
+    すでに読み込まれている場合はそのモジュールを返す.
+
+    Parameters
+    ----------
+    name : string
+        モジュール名('pandas'等).
+    optional : bool
+        Trueの場合, インストールされていなければNoneを返す. The default is False.
+
+    Returns
+    -------
+    module : module
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if importlib.util.find_spec(name) is None:
+        if optional:
+            return None
+        raise ImportError('No module named %r' % name, name=name)
+    return _LazyModule(name)
+
+def is_loaded(name):
+    """
+    モジュールが読み込み済みかどうか.
+    """
+    return name in sys.modules
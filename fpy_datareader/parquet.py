@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+取得した統計データをParquet形式(時間軸・地域コードで分割)で保存・読み込みする
+
+author: WeLLiving@well-living
+"""
+
+import importlib
+import json
+import os
+
+
+#%%
+# 分割に使う列(時間軸事項, 地域事項のコード)
+PARTITION_COLUMNS = ('time', 'area')
+
+# 列の型(pandasのメタデータを含む)を保存するファイル
+COMMON_METADATA = '_common_metadata'
+PARTITION_KEY = b'fpy_datareader.partition_cols'
+
+
+def _require_pyarrow():
+    """
+    pyarrow, pyarrow.dataset, pyarrow.parquetを読み込む(読み込みに時間がかかるため使うときに読み込む).
+    """
+    try:
+        return tuple(importlib.import_module(name) for name in ('pyarrow', 'pyarrow.dataset', 'pyarrow.parquet'))
+    except ImportError:
+        raise ImportError('Parquet requires pyarrow. pip install pyarrow')
+
+#%%
+def to_parquet(data_value, path, partition_cols=PARTITION_COLUMNS, compression='snappy'):
+    """
+    統計データをpath以下に'time=2020000000/area=13000/'のようなディレクトリに分割して保存する.
+    typed=Trueで取得した場合のCategorical型, Int64型もそのまま保存する.
+    同じ分割のファイルがある場合は置き換える.
+
+    Parameters
+    ----------
+    data_value : pandas.core.frame.DataFrame
+        stats_data_to_dfで変換した統計データ.
+    path : string
+        保存先のディレクトリ.
+    partition_cols : list
+        分割に使う列. data_valueにない列は無視する. The default is ('time', 'area').
+    compression : string
+        圧縮形式. The default is 'snappy'.
+
+    Returns
+    -------
+    partition_cols : list
+        分割に使った列.
+    """
+    pa, ds, pq = _require_pyarrow()
+    partition_cols = [col for col in partition_cols if col in data_value.columns]
+    table = pa.Table.from_pandas(data_value, preserve_index=False)
+    # 分割数の上限(既定は1024)を時間軸×地域の組み合わせ数まで広げる
+    n_partitions = data_value[partition_cols].drop_duplicates().shape[0] if partition_cols else 1
+    pq.write_to_dataset(
+        table, path, partition_cols=partition_cols or None, compression=compression,
+        existing_data_behavior='delete_matching', max_partitions=max(n_partitions, 1024),
+    )
+    # 分割に使った列の型と列の順序を読み込み時に復元できるようにスキーマを保存する
+    metadata = dict(table.schema.metadata or {})
+    metadata[PARTITION_KEY] = json.dumps(partition_cols).encode('utf-8')
+    pq.write_metadata(table.schema.with_metadata(metadata), os.path.join(path, COMMON_METADATA))
+    return partition_cols
+
+#%%
+def read_parquet(path, columns=None, **filters):
+    """
+    to_parquetで保存した統計データを読み込む.
+    filtersで指定した分割のディレクトリ, columnsで指定した列だけを読み込む.
+
+    Parameters
+    ----------
+    path : string
+        to_parquetの保存先のディレクトリ.
+    columns : list
+        読み込む列. Noneの場合はすべて. The default is None.
+    **filters :
+        列名=値(またはリスト)の絞り込み条件. time='2020000000', area=['13000', '14000']等.
+        分割に使った列以外でも指定できる(ファイルを読み込んでから絞り込む).
+
+    Returns
+    -------
+    data_value : pandas.core.frame.DataFrame
+        統計データ. 列の順序と型は保存したときと同じ.
+    """
+    pa, ds, pq = _require_pyarrow()
+    schema = pq.read_schema(os.path.join(path, COMMON_METADATA))
+    partition_cols = json.loads(schema.metadata.get(PARTITION_KEY, b'[]'))
+    fields = []
+    for name in partition_cols:
+        field = schema.field(name)
+        if pa.types.is_dictionary(field.type):
+            # ディレクトリ名から辞書を作る場合のインデックスはint32
+            field = pa.field(name, pa.dictionary(pa.int32(), field.type.value_type))
+        fields.append(field)
+    partitioning = ds.partitioning(pa.schema(fields), flavor='hive', dictionaries='infer') if fields else None
+    dataset = ds.dataset(path, format='parquet', partitioning=partitioning)
+
+    expr = None
+    for name, value in filters.items():
+        if name not in schema.names:
+            raise TypeError("read_parquet() got an unexpected filter '%s'" % name)
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        value_type = schema.field(name).type
+        if pa.types.is_dictionary(value_type):
+            value_type = value_type.value_type
+        if pa.types.is_string(value_type) or pa.types.is_large_string(value_type):
+            # コードは文字列で比較する(area=13000等)
+            values = [str(v) for v in values]
+        cond = ds.field(name).isin(values)
+        expr = cond if expr is None else expr & cond
+    if columns is None:
+        columns = schema.names
+    table = dataset.to_table(columns=list(columns), filter=expr)
+    # 分割に使った列は末尾になるため保存したときの順序に戻す
+    data_value = table.replace_schema_metadata(schema.metadata).to_pandas()
+    return data_value[list(columns)]
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+e-StatAPIへのリクエスト数を制限するトークンバケット(スレッド間, 同じホストのプロセス間で共有)
+
+    limiter = FileTokenBucket('/tmp/estat.bucket', rate=5, burst=10)
+    esr = estat.eStatReader(appId, rate_limit=limiter)
+
+author: WeLLiving@well-living
+"""
+
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+#%%
+def _reserve(tokens, last, now, rate, burst, n):
+    """
+    経過時間分のトークンを補充してn個を予約する. トークンが足りない場合は負になり,
+    0に戻るまでの時間を待機時間として返す(待機中もほかの呼び出しは順番に予約できる).
+
+    Returns
+    -------
+    tokens : float
+    wait : float
+    """
+    tokens = min(float(burst), tokens + max(0.0, now - last) * rate) - n
+    wait = -tokens / rate if tokens < 0 else 0.0
+    return tokens, wait
+
+#%%
+class TokenBucket:
+    def __init__(self, rate, burst=1):
+        """
+        1秒あたりrate個のトークンを補充し, 最大burst個まで貯めるトークンバケット.
+        複数のスレッドで共有できる.
+
+        Parameters
+        ----------
+        rate : float
+            1秒あたりのリクエスト数.
+        burst : int
+            連続して送れるリクエスト数. The default is 1.
+
+        Returns
+        -------
+        None.
+
+        """
+        if rate <= 0:
+            raise ValueError("'rate' must be larger than 0")
+        if burst < 1:
+            raise ValueError("'burst' must be larger than or equal to 1")
+        self.rate = float(rate)
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+
+    def acquire(self, n=1):
+        """
+        トークンをn個取得する. 足りない場合は補充されるまで待つ.
+
+        Returns
+        -------
+        wait : float
+            待機した時間(秒).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens, wait = _reserve(self._tokens, self._last, now, self.rate, self.burst, n)
+            self._last = now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+#%%
+class FileTokenBucket:
+    # トークン数と最終更新時刻(UNIX時間)
+    _STATE = struct.Struct('<dd')
+
+    def __init__(self, path, rate, burst=1):
+        """
+        状態をファイルに保存するトークンバケット. 同じファイルを指定した
+        同じホストのプロセス(とスレッド)で1つのバケットを共有する.
+        更新はファイルロック(fcntl.flock, Windowsはmsvcrt.locking)の中で行う.
+
+        Parameters
+        ----------
+        path : string
+            状態を保存するファイルのパス. なければ作成する.
+        rate : float
+            1秒あたりのリクエスト数.
+        burst : int
+            連続して送れるリクエスト数. The default is 1.
+
+        Returns
+        -------
+        None.
+
+        """
+        if rate <= 0:
+            raise ValueError("'rate' must be larger than 0")
+        if burst < 1:
+            raise ValueError("'burst' must be larger than or equal to 1")
+        self.path = path
+        self.rate = float(rate)
+        self.burst = burst
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def _lock_file(self, fd):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_LOCK, self._STATE.size)
+
+    def _unlock_file(self, fd):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, self._STATE.size)
+
+    def acquire(self, n=1):
+        """
+        トークンをn個取得する. 足りない場合は補充されるまで待つ.
+
+        Returns
+        -------
+        wait : float
+            待機した時間(秒).
+        """
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                self._lock_file(fd)
+                try:
+                    data = os.pread(fd, self._STATE.size, 0) if hasattr(os, 'pread') else os.read(fd, self._STATE.size)
+                    now = time.time()
+                    if len(data) == self._STATE.size:
+                        tokens, last = self._STATE.unpack(data)
+                    else:  # 新しいファイル
+                        tokens, last = float(self.burst), now
+                    tokens, wait = _reserve(tokens, last, now, self.rate, self.burst, n)
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    os.write(fd, self._STATE.pack(tokens, now))
+                finally:
+                    self._unlock_file(fd)
+            finally:
+                os.close(fd)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+同じリクエストを同時に送らない(実行中の同じリクエストの結果を待って共有する)
+
+author: WeLLiving@well-living
+"""
+
+import threading
+
+
+#%%
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    def __init__(self):
+        """
+        キーごとに実行中の処理を1つにまとめる.
+        実行中の同じキーの呼び出しは, 最初の呼び出しが終わるまで待って同じ結果(または例外)を受け取る.
+        結果は保持しない(終わった後の呼び出しは再び実行する).
+
+        Returns
+        -------
+        None.
+
+        """
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        keyの処理が実行中でなければfn(*args, **kwargs)を実行し, 実行中であれば終わるまで待つ.
+
+        Parameters
+        ----------
+        key : hashable
+            同じ処理とみなすキー(fpy_datareader.cache.request_key等).
+        fn : callable
+            実行する処理.
+
+        Returns
+        -------
+        result : object
+            fnの戻り値. 待っていたすべての呼び出しで同じオブジェクト.
+        shared : bool
+            ほかの呼び出しの結果を受け取った場合はTrue.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self):
+        """
+        実行中のキーの数.
+        """
+        with self._lock:
+            return len(self._calls)
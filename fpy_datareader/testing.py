@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+ベンチマーク・動作確認用にe-StatAPIのレスポンスと同じ形式のデータを生成する
+
+author: WeLLiving@well-living
+"""
+
+import itertools
+import random
+
+
+#%%
+# 事項ごとのクラス数(getStatsDataの行数はこれらの積)
+DEFAULT_SHAPE = {'tab': 2, 'cat01': 10, 'area': 48, 'time': 50}
+
+CLASS_NAMES = {
+    'tab': '表章項目', 'time': '時間軸(年次)', 'area': '地域',
+    'cat01': '分類事項01', 'cat02': '分類事項02', 'cat03': '分類事項03',
+}
+
+# 数値の代わりに出力される記号
+SYMBOLS = ('-', '…', '･･･', 'X')
+
+RESULT = {'STATUS': 0, 'ERROR_MSG': '正常に終了しました。', 'DATE': '2022-01-01T00:00:00.000+09:00'}
+
+
+def _class_codes(class_id, n):
+    """
+    事項ごとのクラス(@code, @name, @level, @parentCode, @unit)のリスト.
+    """
+    classes = []
+    for i in range(n):
+        if class_id == 'time':
+            # yyyy000000(年次)
+            classes.append({'@code': '%d000000' % (1970 + i), '@name': '%d年' % (1970 + i), '@level': '1'})
+        elif class_id == 'area':
+            # 00000(全国)と都道府県(01000～)の2階層
+            if i == 0:
+                classes.append({'@code': '00000', '@name': '全国', '@level': '1'})
+            else:
+                classes.append({'@code': '%02d000' % i, '@name': '地域%02d' % i, '@level': '2', '@parentCode': '00000'})
+        elif class_id == 'tab':
+            classes.append({'@code': '%03d' % (i + 1), '@name': '表章項目%d' % (i + 1), '@level': '',
+                            '@unit': ('人', '世帯', '円', '%')[i % 4]})
+        else:
+            classes.append({'@code': '%03d' % i, '@name': '%s_%d' % (CLASS_NAMES.get(class_id, class_id), i),
+                            '@level': '1' if i == 0 else '2', **({} if i == 0 else {'@parentCode': '000'})})
+    return classes
+
+#%%
+def make_class_inf(shape=None):
+    """
+    メタ情報のCLASS_INFを生成する.
+
+    Parameters
+    ----------
+    shape : dict
+        事項ID('tab', 'cat01', 'area', 'time'等)をキー, クラス数を値とする辞書.
+        Noneの場合はDEFAULT_SHAPE. The default is None.
+
+    Returns
+    -------
+    CLASS_INF : dict
+        {'CLASS_OBJ': [...]}. クラスが1件の事項はCLASSが辞書型(e-StatAPIと同じ).
+    """
+    shape = DEFAULT_SHAPE if shape is None else shape
+    CLASS_OBJ = []
+    for class_id, n in shape.items():
+        classes = _class_codes(class_id, n)
+        CLASS_OBJ.append({
+            '@id': class_id, '@name': CLASS_NAMES.get(class_id, class_id),
+            'CLASS': classes[0] if n == 1 else classes,
+        })
+    return {'CLASS_OBJ': CLASS_OBJ}
+
+def make_table_inf(statsDataId='0000000001', seed=0):
+    """
+    統計表情報(TABLE_INF)を1件生成する.
+    """
+    rng = random.Random(seed)
+    stat_code = '%08d' % rng.randrange(100000, 99999999)
+    year = rng.randrange(1970, 2023)
+    return {
+        '@id': statsDataId,
+        'STAT_NAME': {'@code': stat_code, '$': '統計調査%s' % stat_code[-3:]},
+        'GOV_ORG': {'@code': stat_code[:5], '$': ('総務省', '厚生労働省', '経済産業省', '農林水産省')[rng.randrange(4)]},
+        'STATISTICS_NAME': '統計調査%s %d年 結果' % (stat_code[-3:], year),
+        'TITLE': {'@no': '%03d' % rng.randrange(1, 999), '$': '人口及び世帯数 第%d表' % rng.randrange(1, 100)},
+        'CYCLE': ('年次', '月次', '四半期', '-')[rng.randrange(4)],
+        'SURVEY_DATE': '%d01' % year,
+        'OPEN_DATE': '%d-06-30' % (year + 1),
+        'SMALL_AREA': rng.randrange(2),
+        'COLLECT_AREA': '該当なし',
+        'MAIN_CATEGORY': {'@code': '%02d' % rng.randrange(1, 18), '$': '人口・世帯'},
+        'SUB_CATEGORY': {'@code': '%02d' % rng.randrange(1, 10), '$': '人口'},
+        'OVERALL_TOTAL_NUMBER': rng.randrange(1, 1000000),
+        'UPDATED_DATE': '%d-06-30' % (year + 1),
+        'STATISTICS_NAME_SPEC': {'TABULATION_CATEGORY': '統計調査%s' % stat_code[-3:],
+                                 'TABULATION_SUB_CATEGORY1': '%d年' % year},
+        'DESCRIPTION': '',
+        'TITLE_SPEC': {'TABLE_NAME': '人口及び世帯数'},
+    }
+
+#%%
+def make_stats_data(shape=None, n_rows=None, startPosition=1, limit=100000,
+                    metaGetFlg='Y', symbol_rate=0.05, seed=0, statsDataId='0000000001'):
+    """
+    統計データ取得API(getStatsData)のレスポンスを生成する.
+
+    Parameters
+    ----------
+    shape : dict
+        事項ごとのクラス数(make_class_inf). The default is None.
+    n_rows : int
+        データ件数. Noneの場合はクラス数の積. 積より小さい場合は先頭から. The default is None.
+    startPosition : int
+        データ取得開始位置. The default is 1.
+    limit : int
+        データ取得件数. 残りがある場合はRESULT_INFにNEXT_KEYを付ける. The default is 100000.
+    metaGetFlg : string
+        'N'の場合はTABLE_INF, CLASS_INFを付けない. The default is 'Y'.
+    symbol_rate : float
+        '-', 'X'等の記号にする値の割合. The default is 0.05.
+    seed : int
+        乱数のシード. The default is 0.
+    statsDataId : string
+        統計表ID. The default is '0000000001'.
+
+    Returns
+    -------
+    jsn : dict
+        e-StatAPIのJSONと同じ構造の辞書型.
+    """
+    rng = random.Random(seed)
+    CLASS_INF = make_class_inf(shape)
+    CLASS_OBJ = CLASS_INF['CLASS_OBJ']
+    codes = [[c['@code'] for c in (obj['CLASS'] if type(obj['CLASS']) == list else [obj['CLASS']])]
+             for obj in CLASS_OBJ]
+    units = {}
+    if CLASS_OBJ and CLASS_OBJ[0]['@id'] == 'tab':
+        tabs = CLASS_OBJ[0]['CLASS'] if type(CLASS_OBJ[0]['CLASS']) == list else [CLASS_OBJ[0]['CLASS']]
+        units = {c['@code']: c.get('@unit') for c in tabs}
+    keys = ['@' + obj['@id'] for obj in CLASS_OBJ]
+    TOTAL_NUMBER = 1
+    for lst in codes:
+        TOTAL_NUMBER *= len(lst)
+    if n_rows is not None:
+        TOTAL_NUMBER = min(TOTAL_NUMBER, n_rows)
+    stop = min(startPosition - 1 + limit, TOTAL_NUMBER)
+    VALUE = []
+    for combo in itertools.islice(itertools.product(*codes), startPosition - 1, stop):
+        row = dict(zip(keys, combo))
+        if units.get(row.get('@tab')):
+            row['@unit'] = units[row['@tab']]
+        row['$'] = SYMBOLS[rng.randrange(len(SYMBOLS))] if rng.random() < symbol_rate else str(rng.randrange(0, 10 ** 7))
+        VALUE.append(row)
+    RESULT_INF = {'TOTAL_NUMBER': TOTAL_NUMBER, 'FROM_NUMBER': startPosition, 'TO_NUMBER': stop}
+    if stop < TOTAL_NUMBER:
+        RESULT_INF['NEXT_KEY'] = stop + 1
+    STATISTICAL_DATA = {'RESULT_INF': RESULT_INF}
+    if metaGetFlg != 'N':
+        STATISTICAL_DATA['TABLE_INF'] = make_table_inf(statsDataId, seed)
+        STATISTICAL_DATA['CLASS_INF'] = CLASS_INF
+    if VALUE:
+        STATISTICAL_DATA['DATA_INF'] = {'VALUE': VALUE[0] if len(VALUE) == 1 else VALUE}
+    status = 0 if VALUE else 1
+    return {'GET_STATS_DATA': {
+        'RESULT': dict(RESULT, STATUS=status),
+        'PARAMETER': {'LANG': 'J', 'STATS_DATA_ID': statsDataId, 'DATA_FORMAT': 'J',
+                      'START_POSITION': startPosition, 'LIMIT': limit, 'METAGET_FLG': metaGetFlg},
+        'STATISTICAL_DATA': STATISTICAL_DATA,
+    }}
+
+def make_meta_info(shape=None, seed=0, statsDataId='0000000001'):
+    """
+    メタ情報取得API(getMetaInfo)のレスポンスを生成する.
+    """
+    return {'GET_META_INFO': {
+        'RESULT': RESULT,
+        'PARAMETER': {'LANG': 'J', 'STATS_DATA_ID': statsDataId, 'DATA_FORMAT': 'J'},
+        'METADATA_INF': {'TABLE_INF': make_table_inf(statsDataId, seed), 'CLASS_INF': make_class_inf(shape)},
+    }}
+
+#%%
+def make_stats_list(n_tables=180000, seed=0):
+    """
+    統計表情報取得API(getStatsList)のレスポンスを生成する(e-Statの全件は約180,000件).
+    """
+    TABLE_INF = [make_table_inf('%010d' % (i + 1), seed + i) for i in range(n_tables)]
+    return {'GET_STATS_LIST': {
+        'RESULT': RESULT,
+        'PARAMETER': {'LANG': 'J', 'DATA_FORMAT': 'J'},
+        'DATALIST_INF': {
+            'NUMBER': n_tables,
+            'RESULT_INF': {'FROM_NUMBER': 1, 'TO_NUMBER': n_tables},
+            'TABLE_INF': TABLE_INF,
+        },
+    }}
+
+def make_data_catalog(n_datasets=100, seed=0):
+    """
+    データカタログ情報取得API(getDataCatalog)のレスポンスを生成する.
+    """
+    DATA_CATALOG_INF = []
+    for i in range(n_datasets):
+        table = make_table_inf('%010d' % (i + 1), seed + i)
+        DATA_CATALOG_INF.append({
+            '@id': '%012d' % (i + 1),
+            'DATASET': {
+                'STAT_NAME': table['STAT_NAME'],
+                'ORGANIZATION': table['GOV_ORG'],
+                'TITLE': {'NAME': table['STATISTICS_NAME'], 'TABULATION_CATEGORY': table['TITLE']['$'],
+                          'CYCLE': table['CYCLE'], 'SURVEY_DATE': table['SURVEY_DATE']},
+                'DESCRIPTION': '',
+                'PUBLISHER': table['GOV_ORG']['$'],
+                'CONTACT_POINT': table['GOV_ORG']['$'],
+                'CREATOR': table['GOV_ORG']['$'],
+                'RELEASE_DATE': table['OPEN_DATE'],
+                'LAST_MODIFIED_DATE': table['UPDATED_DATE'],
+                'FREQUENCY': table['CYCLE'],
+                'LANGUAGE': 'J',
+            },
+            'RESOURCES': {'RESOURCE': [{'@id': table['@id'], 'TITLE': {'NAME': table['TITLE']['$']}}]},
+        })
+    return {'GET_DATA_CATALOG': {
+        'RESULT': RESULT,
+        'PARAMETER': {'LANG': 'J', 'DATA_FORMAT': 'J', 'LIMIT': n_datasets},
+        'DATA_CATALOG_LIST_INF': {
+            'NUMBER': n_datasets,
+            'RESULT_INF': {'FROM_NUMBER': 1, 'TO_NUMBER': n_datasets},
+            'DATA_CATALOG_INF': DATA_CATALOG_INF,
+        },
+    }}
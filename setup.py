@@ -14,10 +14,16 @@ setup(
     description="Data reader for financial planning",
     author="well-living",
     license="MIT",
-    packages=find_packages(),  # "fpy_datareader"
-    classfiers=[
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*", "tests", "tests.*"]),  # "fpy_datareader"
+    python_requires=">=3.8",
+    classifiers=[
         "Development Status :: 4 - Beta",
         "Programming Language :: Python :: 3.8",
     ],
-    install_requires=["numpy", "pandas", "requests"],
+    install_requires=["numpy", "pandas>=1.5", "requests"],
+    extras_require={
+        "async": ["aiohttp"],
+        "stream": ["ijson>=3.1"],
+        "parquet": ["pyarrow"],
+    },
 )
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+fpy_datareader.cacheのテスト
+
+author: WeLLiving@well-living
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from fpy_datareader.cache import FileCache
+
+
+#%%
+def test_set_does_not_scan_every_write(tmp_path, monkeypatch):
+    cache = FileCache(str(tmp_path), evict_every=100)
+    scans = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, 'evict', lambda: (scans.append(1), evict()))
+    for i in range(50):
+        cache.set('key%d' % i, b'x' * 100)
+    assert len(scans) == 1  # 合計サイズを求める最初の1回
+
+def test_max_size(tmp_path):
+    content = os.urandom(1000)  # 圧縮しても小さくならない
+    cache = FileCache(str(tmp_path), max_size=10000)
+    for i in range(30):
+        cache.set('key%d' % i, content)
+    total = sum(entry.stat().st_size for entry in os.scandir(str(tmp_path)) if entry.name.endswith('.gz'))
+    assert total <= 10000
+    assert cache.get('key29') == content
+
+def test_counters_from_threads(tmp_path):
+    cache = FileCache(str(tmp_path))
+    cache.set('hit', b'content')
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda i: cache.get('hit' if i % 2 else 'miss'), range(2000)))
+    assert cache.stats()['hits'] == 1000
+    assert cache.stats()['misses'] == 1000
+
+def test_writer(tmp_path):
+    cache = FileCache(str(tmp_path))
+    with cache.writer('key') as f:
+        for i in range(10):
+            f.write(b'%d,' % i)
+        assert cache.get('key') is None  # withを抜けるまで保存しない
+    assert cache.get('key') == b'0,1,2,3,4,5,6,7,8,9,'
+
+    try:
+        with cache.writer('error') as f:
+            f.write(b'partial')
+            raise ValueError
+    except ValueError:
+        pass
+    assert cache.get('error') is None
+    assert not [entry.name for entry in os.scandir(str(tmp_path)) if entry.name.endswith('.tmp')]
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+fpy_datareader.catalogのテスト
+
+author: WeLLiving@well-living
+"""
+
+import sqlite3
+
+import pytest
+
+from fpy_datareader import estat, testing
+from fpy_datareader.catalog import FTS_COLUMNS, CatalogStore
+
+
+#%%
+@pytest.fixture(scope='module')
+def store():
+    store = CatalogStore(':memory:')
+    jsn = testing.make_stats_list(n_tables=2000)
+    store.upsert(estat.flatten_table_inf(jsn['GET_STATS_LIST']['DATALIST_INF']['TABLE_INF']))
+    yield store
+    store.close()
+
+def _like(store, term):
+    """
+    全文検索の対象の列を部分一致で検索した統計表ID.
+    """
+    cols = [col for cols in FTS_COLUMNS.values() for col in cols]
+    where = ' OR '.join('"%s" LIKE ?' % col for col in cols)
+    rows = store.conn.execute('SELECT "@id" FROM tables WHERE %s ORDER BY "@id"' % where,
+                              ['%' + term + '%'] * len(cols)).fetchall()
+    return [row[0] for row in rows]
+
+#%%
+@pytest.mark.parametrize('term', ['人口', '世帯', '結果', '省', '0'])
+def test_short_terms_match_like(store, term):
+    assert store.search(term, limit=None)['@id'].tolist() == _like(store, term)
+
+def test_short_terms_use_index(store):
+    sql, params = store._search_sql('人口')
+    plan = ' '.join(row[-1] for row in store.conn.execute('EXPLAIN QUERY PLAN ' + sql, params))
+    # MATCHで全文検索インデックスを使う(LIKEで全件を走査しない)
+    assert 'tables_bigram VIRTUAL TABLE INDEX 0:M' in plan
+    assert 'tables_fts' not in plan
+
+def test_upsert_updates_short_term_index(store):
+    TABLE_INF = store.search(limit=1)
+    TABLE_INF['TITLE_$'] = '賃金構造'
+    store.upsert(TABLE_INF)
+    assert TABLE_INF['@id'].iloc[0] in store.search('賃金', limit=None)['@id'].tolist()
+
+#%%
+@pytest.fixture
+def fallback_store(tmp_path):
+    # trigramがないSQLite(3.34より前)と同じunicode61のtables_ftsを先に作成しておく
+    path = str(tmp_path / 'catalog.sqlite3')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE VIRTUAL TABLE tables_fts USING fts5(%s)' % ', '.join(FTS_COLUMNS))
+    conn.close()
+    store = CatalogStore(path)
+    jsn = testing.make_stats_list(n_tables=500)
+    store.upsert(estat.flatten_table_inf(jsn['GET_STATS_LIST']['DATALIST_INF']['TABLE_INF']))
+    yield store
+    store.close()
+
+def test_trigram_detected(store, fallback_store):
+    assert store.trigram
+    assert not fallback_store.trigram
+
+@pytest.mark.parametrize('term', ['人口', '統計調査', '及び世帯', '世帯数', '調査74', '結果 人口及び', '2020'])
+def test_fallback_terms_match_like(fallback_store, term):
+    expected = set(_like(fallback_store, term.split()[0]))
+    for t in term.split()[1:]:
+        expected &= set(_like(fallback_store, t))
+    result = fallback_store.search(term, limit=None)['@id'].tolist()
+    assert result == sorted(expected)
+    assert len(result) > 0
+
+def test_fallback_uses_bigram_index(fallback_store):
+    sql, params = fallback_store._search_sql('統計調査')
+    plan = ' '.join(row[-1] for row in fallback_store.conn.execute('EXPLAIN QUERY PLAN ' + sql, params))
+    assert 'tables_bigram VIRTUAL TABLE INDEX 0:M' in plan
+    assert 'tables_fts' not in plan
@@ -0,0 +1,436 @@
+# -*- coding: utf-8 -*-
+"""
+fpy_datareader.estatのテスト(fpy_datareader.fake_serverを使う)
+
+author: WeLLiving@well-living
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from benchmarks.baseline import flatten_data_catalog_loop, flatten_table_inf_loop
+from fpy_datareader import estat, testing
+from fpy_datareader.cache import FileCache
+from fpy_datareader.data import DataReader
+from fpy_datareader.fake_server import FakeEStatServer
+from fpy_datareader.singleflight import SingleFlight
+
+
+SHAPE = {'tab': 1, 'area': 3, 'time': 4}
+
+
+#%%
+@pytest.fixture
+def server():
+    with FakeEStatServer(shape=SHAPE) as server:
+        yield server
+
+#%%
+def test_stream_uses_cache(server, tmp_path):
+    pytest.importorskip('ijson')
+    esr = estat.eStatReader('x', base_url=server.url, cache=FileCache(str(tmp_path)))
+    params = {'statsDataId': '0000000001', 'limit': 100}
+    first = esr._get_stats_data_json(params, stream=True)
+    second = esr._get_stats_data_json(params, stream=True)
+    assert server.counts['getStatsData'] == 1
+    assert first['GET_STATS_DATA']['STATISTICAL_DATA']['DATA_INF']['VALUE'].equals(
+        second['GET_STATS_DATA']['STATISTICAL_DATA']['DATA_INF']['VALUE'])
+
+#%%
+def test_sync_catalog_with_clock_behind_server(server, tmp_path, monkeypatch):
+    events = []
+    esr = estat.eStatReader('x', base_url=server.url, catalog=str(tmp_path / 'catalog.sqlite'), 
+                            hooks=[events.append])
+    server.n_tables = 50
+    esr.sync_catalog()
+    last_sync_date = esr.catalog.get_meta('last_sync_date')
+
+    # クライアントの時計がAPIサーバー(前回の同期日)より前の日付
+    monkeypatch.setattr(estat, '_jst_today', lambda: '20000101')
+    esr.sync_catalog()
+    params = [e['params'] for e in events if e['event'] == 'request'][-1]
+    low, high = params['updatedDate'].split('-')
+    assert low <= high
+    assert esr.catalog.get_meta('last_sync_date') == last_sync_date
+
+#%%
+def test_partitioned_meta_error(server, monkeypatch):
+    esr = estat.eStatReader('x', base_url=server.url)
+    get_json = esr._get_json
+    error = {'GET_META_INFO': {'RESULT': {'STATUS': 100, 'ERROR_MSG': '認証に失敗しました。', 
+                                          'DATE': '2022-01-01T00:00:00.000+09:00'}}}
+    monkeypatch.setattr(esr, '_get_json', 
+                        lambda endpoint, params: error if endpoint == 'getMetaInfo' else get_json(endpoint, params))
+    with pytest.raises(estat.RemoteDataError, match='認証に失敗しました'):
+        esr.get_estat_StatsData_df_partitioned('0000000001', limit=5)
+
+#%%
+def test_fake_server_code_range_is_prefix(server):
+    esr = estat.eStatReader('x', base_url=server.url)
+    esr.get_estat_StatsData_df_all('0000000001', cdTimeFrom='1971', cdTimeTo='1972')
+    assert sorted(esr.data_value['time'].unique()) == ['1971000000', '1972000000']
+
+#%%
+def _fiscal_quarter_table(statsDataId='0000000099'):
+    """
+    時間軸事項が年度の四半期('yyyy10mmMM')の統計表.
+    """
+    codes = ['2014100406', '2014100103', '2015100406', '2015101012', '2015100103', '2016100406']
+    jsn = testing.make_stats_data(shape={'tab': 1, 'time': len(codes)}, statsDataId=statsDataId)
+    STATISTICAL_DATA = jsn['GET_STATS_DATA']['STATISTICAL_DATA']
+    for obj in STATISTICAL_DATA['CLASS_INF']['CLASS_OBJ']:
+        if obj['@id'] == 'time':
+            for dct, code in zip(obj['CLASS'], codes):
+                dct['@code'] = code
+    for row, code in zip(STATISTICAL_DATA['DATA_INF']['VALUE'], codes):
+        row['@time'] = code
+    return jsn
+
+@pytest.mark.parametrize('start, end, expected', [
+    # 2014100103は2015年1～3月
+    (2015, None, ['2014100103', '2015100103', '2015100406', '2015101012', '2016100406']),
+    (None, 2015, ['2014100103', '2014100406', '2015100406', '2015101012']),
+    (2015, 2015, ['2014100103', '2015100406', '2015101012']),
+    ('2015-04', '2016-03', ['2015100103', '2015100406', '2015101012']),
+])
+def test_read_fiscal_quarters_with_start_end(start, end, expected):
+    with FakeEStatServer(fixtures={'0000000099': _fiscal_quarter_table()}) as server:
+        df = DataReader('0000000099', 'estat', api_key='x', base_url=server.url, start=start, end=end)
+    assert sorted(df['time']) == expected
+
+#%%
+def test_reuse_meta_after_first_page(server):
+    events = []
+    esr = estat.eStatReader('x', base_url=server.url, hooks=[events.append])
+    df = esr.get_estat_StatsData_df_all('0000000001', limit=5, max_workers=1).data_value
+    flags = [e['params'].get('metaGetFlg') for e in events 
+             if (e['event'] == 'request') and (e['endpoint'] == 'getStatsData')]
+    assert flags == [None, 'N', 'N']
+    assert server.counts.get('getMetaInfo', 0) == 0
+    assert df.shape[0] == 12
+    assert df['area'].notna().all()
+
+    # 分割(件数の確認を除く)はget_estat_MetaInfoのメタ情報を使う
+    del events[:]
+    esr.get_estat_StatsData_df_partitioned('0000000001', limit=5)
+    flags = [e['params'].get('metaGetFlg') for e in events 
+             if (e['event'] == 'request') and (e['endpoint'] == 'getStatsData') 
+             and (e['params'].get('cntGetFlg') != 'Y')]
+    assert flags and all(flag == 'N' for flag in flags)
+
+#%%
+def test_typed_keeps_codes_missing_from_class_inf():
+    jsn = testing.make_stats_data(shape=SHAPE)
+    VALUE = jsn['GET_STATS_DATA']['STATISTICAL_DATA']['DATA_INF']['VALUE']
+    VALUE[0]['@area'] = '99000'
+    df = estat.stats_data_to_df(jsn, typed=True)
+    assert df['area'].iloc[0] == '99000'
+    assert df['area'].notna().all()
+    assert list(df['area'].cat.categories[-1:]) == ['99000']
+    assert df.filter(like='code_name_area').iloc[0].isna().all()
+    assert (df['area'].astype(str) == estat.stats_data_to_df(jsn)['area']).all()
+
+#%%
+def test_stream_writes_cache_while_parsing(server, tmp_path, monkeypatch):
+    pytest.importorskip('ijson')
+    cache = FileCache(str(tmp_path))
+    writes = []
+    writer = cache.writer
+    def counting_writer(key):
+        f = writer(key)
+        write = f.write
+        f.write = lambda data: (writes.append(len(data)), write(data))[1]
+        return f
+    monkeypatch.setattr(cache, 'writer', counting_writer)
+    esr = estat.eStatReader('x', base_url=server.url, cache=cache, reuse_meta=False)
+    jsn = esr._get_stats_data_json({'statsDataId': '0000000001'}, stream=True)
+    assert len(writes) > 1 and sum(writes) > 0
+    assert not [p for p in tmp_path.iterdir() if p.suffix == '.tmp']
+    esr._get_stats_data_json({'statsDataId': '0000000001'}, stream=True)
+    assert server.counts['getStatsData'] == 1
+    assert jsn['GET_STATS_DATA']['STATISTICAL_DATA']['DATA_INF']['VALUE'].shape[0] == 12
+
+#%%
+@pytest.mark.parametrize('code, start, end', [
+    # 年次, 年度
+    ('2020000000', '2020-01-01', '2020-12-31'),
+    ('2020100000', '2020-04-01', '2021-03-31'),
+    # 四半期
+    ('2020000103', '2020-01-01', '2020-03-31'),
+    ('2020001012', '2020-10-01', '2020-12-31'),
+    # 月次
+    ('2020000101', '2020-01-01', '2020-01-31'),
+    ('2020001212', '2020-12-01', '2020-12-31'),
+    # 年度の四半期. 1～3月は年度の年のコードで翌年
+    ('2020100406', '2020-04-01', '2020-06-30'),
+    ('2020101012', '2020-10-01', '2020-12-31'),
+    ('2020100103', '2021-01-01', '2021-03-31'),
+])
+def test_parse_time_codes(code, start, end):
+    period = estat.parse_time_codes([code])[0]
+    assert (period.start_time, period.end_time.normalize()) == (pd.Timestamp(start), pd.Timestamp(end))
+    assert estat.parse_time_codes([code], kind='timestamp')[0] == pd.Timestamp(start)
+
+@pytest.mark.parametrize('code, name, start', [
+    ('9999', '2020年度', '2020-04-01'),
+    ('9999', '2020年', '2020-01-01'),
+    ('9999', '2020年3月', '2020-03-01'),
+    ('9999', '不詳', None),
+    ('2020000013', None, None),
+])
+def test_parse_time_codes_unknown(code, name, start):
+    index = estat.parse_time_codes([code, code], names=None if name is None else [name, name], kind='timestamp')
+    if start is None:
+        assert index.isna().all()
+    else:
+        assert list(index) == [pd.Timestamp(start)] * 2
+
+def test_parse_time_codes_mixed_frequencies():
+    codes = pd.Categorical(['2020000000', '2020100000', '2020000101', '2020000000', None])
+    index = estat.parse_time_codes(codes)
+    assert [p.freqstr[0] for p in index[:4]] == ['Y', 'Y', 'M', 'Y']
+    assert index[0] == index[3]
+    assert index[4] is pd.NaT
+
+TRUNCATE_CODES = ['2019100000', '2020000000', '2020000103', '2020100406', '2020100000', 
+                  '2020100103', '2021000101', 'unknown']
+
+@pytest.mark.parametrize('start, end, expected', [
+    (None, None, TRUNCATE_CODES),
+    (2020, 2020, ['2020000000', '2020000103', '2020100406', 'unknown']),
+    # 年度の境界
+    ('2020-04', '2021-03', ['2020100406', '2020100000', '2020100103', '2021000101', 'unknown']),
+    ('2020-04', None, ['2020100406', '2020100000', '2020100103', '2021000101', 'unknown']),
+    (None, '2020-03', ['2019100000', '2020000103', 'unknown']),
+    # コードで指定
+    ('2020100000', '2020100000', ['2020100406', '2020100000', '2020100103', '2021000101', 'unknown']),
+    ('2021000101', None, ['2020100103', '2021000101', 'unknown']),
+])
+def test_truncate_time(start, end, expected):
+    df = pd.DataFrame({'time': TRUNCATE_CODES, '$': range(len(TRUNCATE_CODES))})
+    assert list(estat.truncate_time(df, start, end)['time']) == expected
+
+def test_parse_time():
+    esr = estat.eStatReader('x')
+    esr.data_value = pd.DataFrame({
+        'time': ['2020100000', '2021100000', 'x'], 
+        '時間軸(年度)': ['2020年度', '2021年度', '2022年度'],
+        'code_name_time_時間軸(年度)': ['2020100000_2020年度', '2021100000_2021年度', 'x_2022年度'],
+    })
+    assert list(esr.parse_time().data_value['period'].map(lambda p: p.start_time)) == [
+        pd.Timestamp('2020-04-01'), pd.Timestamp('2021-04-01'), pd.Timestamp('2022-04-01')]
+    assert list(esr.parse_time(kind='timestamp').data_value['date']) == [
+        pd.Timestamp('2020-04-01'), pd.Timestamp('2021-04-01'), pd.Timestamp('2022-04-01')]
+    with pytest.raises(KeyError):
+        esr.parse_time(column='area')
+
+#%%
+PARTITION_SHAPE = {'tab': 2, 'area': 10, 'time': 6}
+
+@pytest.mark.parametrize('total_number, limit, dimensions, max_codes, dimension, n_partitions', [
+    (120, 120, None, 100, None, 1),
+    # 地域は2コードずつ5回, 時間軸は1コードずつ6回, 表章項目はlimitを超える
+    (120, 30, None, 100, 'area', 5),
+    (120, 30, ['time'], 100, 'time', 6),
+    (120, 30, ['tab', 'time'], 100, 'time', 6),
+    (120, 30, None, 1, 'time', 6),
+    # コードあたりの件数がlimitを超える事項しかない
+    (120, 30, ['tab'], 100, 'tab', 2),
+])
+def test_plan_partitions(total_number, limit, dimensions, max_codes, dimension, n_partitions):
+    CLASS_INF = testing.make_class_inf(PARTITION_SHAPE)
+    result, partitions = estat.plan_partitions(CLASS_INF, total_number, limit, dimensions, max_codes)
+    assert result == dimension
+    assert len(partitions) == n_partitions
+    if dimension is None:
+        assert partitions == [{}]
+        return
+    # すべてのコードがちょうど1回ずつ現れる
+    key = 'cd' + estat.FILTER_DIMENSIONS[dimension]
+    codes = [code for partition in partitions for code in partition[key].split(',')]
+    assert codes == [c['@code'] for c in testing._class_codes(dimension, PARTITION_SHAPE[dimension])]
+
+@pytest.fixture
+def partition_server():
+    with FakeEStatServer(shape=PARTITION_SHAPE) as server:
+        yield server
+
+def _assert_same_rows(df, expected):
+    keys = ['tab', 'area', 'time']
+    assert df.shape[0] == expected.shape[0]
+    assert not df.duplicated(keys).any()
+    pd.testing.assert_frame_equal(df.sort_values(keys).reset_index(drop=True)[expected.columns], 
+                                  expected.sort_values(keys).reset_index(drop=True))
+
+@pytest.mark.parametrize('filters', [{}, {'cdTimeFrom': '1972'}, {'cdArea': '00000,01000,02000'}])
+def test_partitioned_matches_single_fetch(partition_server, filters):
+    esr = estat.eStatReader('x', base_url=partition_server.url)
+    expected = esr.get_estat_StatsData_df_all('0000000001', **filters).data_value
+    df = esr.get_estat_StatsData_df_partitioned('0000000001', limit=7, **filters).data_value
+    assert len(esr.partitions) > 1
+    _assert_same_rows(df, expected)
+
+@pytest.mark.parametrize('method, key', [
+    ('get_estat_StatsData_df_unlimitTime', 'cdTime'), 
+    ('get_estat_StatsData_df_unlimitArea', 'cdArea'),
+])
+def test_unlimit(partition_server, method, key):
+    esr = estat.eStatReader('x', base_url=partition_server.url)
+    expected = esr.get_estat_StatsData_df_all('0000000001').data_value
+    df = getattr(esr, method)('0000000001', limit=30).data_value
+    assert len(esr.partitions) > 1
+    assert all(list(partition) == [key] for partition in esr.partitions)
+    _assert_same_rows(df, expected)
+
+def test_unlimit_time_from(partition_server):
+    esr = estat.eStatReader('x', base_url=partition_server.url)
+    expected = esr.get_estat_StatsData_df_all('0000000001', cdTimeFrom='1973').data_value
+    df = esr.get_estat_StatsData_df_unlimitTime('0000000001', cdTime='1973', limit=30).data_value
+    assert sorted(df['time'].unique()) == ['1973000000', '1974000000', '1975000000']
+    _assert_same_rows(df, expected)
+
+#%%
+def _where_class_inf():
+    """
+    地域は全国(階層1), 都道府県(階層2), 都道府県ごとの市(階層3). 
+    cat04はAPIで絞り込めない事項.
+    """
+    CLASS_INF = testing.make_class_inf({'tab': 2, 'time': 10, 'cat04': 3})
+    area = [{'@code': '00000', '@name': '全国', '@level': '1'}]
+    for i in range(1, 48):
+        area.append({'@code': '%02d000' % i, '@name': '県%02d' % i, '@level': '2', '@parentCode': '00000'})
+        area.append({'@code': '%02d100' % i, '@name': '市%02d' % i, '@level': '3', '@parentCode': '%02d000' % i})
+    CLASS_INF['CLASS_OBJ'].append({'@id': 'area', '@name': '地域', 'CLASS': area})
+    many = [{'@code': '%04d' % i, '@name': '分類%d' % i, '@level': '1'} for i in range(250)]
+    CLASS_INF['CLASS_OBJ'].append({'@id': 'cat01', '@name': '分類事項01', 'CLASS': many})
+    return CLASS_INF
+
+PREFECTURES = ['%02d000' % i for i in range(1, 48)]
+
+@pytest.mark.parametrize('where, params, residual', [
+    # コードのリスト(項目名でもよい)
+    ({'area': ['13000', '県27']}, {'cdArea': '13000,27000'}, {}),
+    # コードの範囲
+    ({'time': {'from': 1972, 'to': 1975}}, {'cdTimeFrom': '1972000000', 'cdTimeTo': '1975000000'}, {}),
+    ({'time': {'from': 1975}}, {'cdTimeFrom': '1975000000'}, {}),
+    # 階層
+    ({'area': {'level': 2}}, {'lvArea': '2'}, {}),
+    ({'地域': {'min_level': 2, 'max_level': 3}}, {'lvArea': '2-3'}, {}),
+    # 階層と範囲
+    ({'area': {'level': 2, 'from': '05000', 'to': '35000'}}, 
+     {'lvArea': '2', 'cdAreaFrom': '05000', 'cdAreaTo': '35000'}, {}),
+    # 同じ事項の条件は積
+    ({'area': {'level': 2}, '地域': {'contains': '県1'}}, 
+     {'lvArea': '2', 'cdAreaFrom': '10000', 'cdAreaTo': '19000'}, {}),
+    ({'area': ['01000', '01100'], '地域': {'level': 3}}, {'cdArea': '01100'}, {}),
+    # APIで絞り込めない事項
+    ({'cat04': ['001']}, {}, {'cat04': {'001'}}),
+    # コードがMAX_CODESを超える場合は範囲で取得して残りを取得後に絞り込む
+    ({'cat01': ['%04d' % i for i in range(10, 240, 2)]}, {'cdCat01From': '0010', 'cdCat01To': '0238'}, 
+     {'cat01': {'%04d' % i for i in range(10, 240, 2)}}),
+])
+def test_compile_where(where, params, residual):
+    result, result_residual = estat.compile_where(_where_class_inf(), where)
+    assert result == params
+    assert result_residual == residual
+
+@pytest.mark.parametrize('where, error', [
+    ({'cat09': ['001']}, KeyError),
+    ({'分類事項09': ['001']}, KeyError),
+    ({'area': ['99000']}, KeyError),
+    ({'area': {'level': 1}, '地域': ['01000']}, ValueError),
+    ({'area': {'between': 1}}, TypeError),
+])
+def test_compile_where_errors(where, error):
+    with pytest.raises(error):
+        estat.compile_where(_where_class_inf(), where)
+
+@pytest.mark.parametrize('codes, params, n_superset', [
+    (set(PREFECTURES + ['00000']) | {'%02d100' % i for i in range(1, 48)}, {}, 95),
+    ({'01000', '01100'}, {'cdArea': '01000,01100'}, 2),
+    (set(PREFECTURES), {'lvArea': '2'}, 47),
+    ({'00000'} | set(PREFECTURES), {'lvArea': '1-2'}, 48),
+    ({'%02d%d00' % (i, j) for i in range(40, 48) for j in (0, 1)}, {'cdAreaFrom': '40000'}, 16),
+])
+def test_narrowest_params(codes, params, n_superset):
+    class_obj = [c for c in _where_class_inf()['CLASS_OBJ'] if c['@id'] == 'area'][0]
+    result, superset = estat._narrowest_params(class_obj, codes)
+    assert result == params
+    assert len(superset) == n_superset
+    assert codes <= superset
+
+def test_apply_residual():
+    df = pd.DataFrame({'area': ['01000', '02000', '03000', '01000'], 'cat04': ['001', '001', '002', '002'], 
+                       '$': ['1', '2', '3', '4']})
+    assert estat.apply_residual(df, {}) is df
+    result = estat.apply_residual(df, {'area': {'01000', '03000'}, 'cat04': {'002'}})
+    assert list(result['$']) == ['3', '4']
+    assert list(result.index) == [0, 1]
+    assert estat.apply_residual(df, {'area': {'99000'}}).shape[0] == 0
+    assert estat.apply_residual(df.iloc[:0], {'area': {'01000'}}).shape[0] == 0
+
+#%%
+def test_coalesce_concurrent_requests():
+    with FakeEStatServer(shape=SHAPE, latency=0.3) as server:
+        events = []
+        esr = estat.eStatReader('x', base_url=server.url, hooks=[events.append])
+        barrier = threading.Barrier(8)
+        def fetch(i):
+            barrier.wait()
+            return esr._get_json('getMetaInfo', {'statsDataId': '0000000001'})
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(fetch, range(8)))
+        assert server.counts['getMetaInfo'] == 1
+        assert sum(e['event'] == 'coalesced' for e in events) == 7
+        # 呼び出しごとに別のオブジェクト
+        assert len({id(jsn) for jsn in results}) == 8
+        results[0]['GET_META_INFO']['METADATA_INF']['CLASS_INF'] = None
+        assert all(jsn['GET_META_INFO']['METADATA_INF']['CLASS_INF'] is not None for jsn in results[1:])
+
+        # appIdが異なるリクエストはまとめない
+        flight = SingleFlight()
+        readers = [estat.eStatReader(appId, base_url=server.url, coalesce=flight) for appId in ('x', 'y') * 4]
+        barrier = threading.Barrier(8)
+        def fetch_with(esr):
+            barrier.wait()
+            return esr._get_json('getMetaInfo', {'statsDataId': '0000000002'})
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(fetch_with, readers))
+        assert server.counts['getMetaInfo'] == 3
+
+#%%
+@pytest.mark.parametrize('kwargs', [{'cdArea': '99000'}, {'start': 2100}])
+def test_read_empty_with_parse_dates(server, kwargs):
+    df = DataReader('0000000001', 'estat', api_key='x', base_url=server.url, parse_dates=True, **kwargs)
+    data = DataReader(['0000000001'], 'estat', api_key='x', base_url=server.url, parse_dates=True, 
+                      output='dict', **kwargs)
+    for df in (df, data['0000000001']):
+        assert df.shape[0] == 0
+        assert df['date'].dtype.kind == 'M'
+
+#%%
+@pytest.mark.parametrize('retry_count', [-1, 1.5, None])
+def test_invalid_retry_count(retry_count):
+    with pytest.raises(ValueError, match='larger than or equal to 0'):
+        estat.eStatReader('x', retry_count=retry_count)
+    assert estat.eStatReader('x', retry_count=0).retry_count == 0
+
+#%%
+def test_flatten_matches_baseline():
+    table_inf = testing.make_stats_list(300)['GET_STATS_LIST']['DATALIST_INF']['TABLE_INF']
+    pd.testing.assert_frame_equal(estat.flatten_table_inf(table_inf), flatten_table_inf_loop(table_inf), 
+                                  check_dtype=False)
+    data_catalog_inf = testing.make_data_catalog(30)['GET_DATA_CATALOG']['DATA_CATALOG_LIST_INF']['DATA_CATALOG_INF']
+    pd.testing.assert_frame_equal(estat.flatten_data_catalog(data_catalog_inf), 
+                                  flatten_data_catalog_loop(data_catalog_inf), check_dtype=False)
+    assert estat.flatten_data_catalog(data_catalog_inf[0]).shape[0] == 1
+
+def test_get_estat_DataCatalog(server):
+    esr = estat.eStatReader('x', base_url=server.url)
+    DATASET, CATAROG_id, STATUS, _, NUMBER, _ = esr.get_estat_DataCatalog(limit=5)
+    assert DATASET.shape[0] == len(CATAROG_id) == NUMBER
+    assert {'STAT_NAME_$', 'TITLE_NAME', 'PUBLISHER'} <= set(DATASET.columns)
+    assert STATUS == 0
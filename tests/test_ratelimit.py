@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+fpy_datareader.ratelimitのテスト(時間を測るテストは許容幅を大きくとる)
+
+author: WeLLiving@well-living
+"""
+
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from fpy_datareader.ratelimit import FileTokenBucket, TokenBucket, _reserve
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#%%
+@pytest.mark.parametrize('tokens, last, now, rate, burst, n, expected', [
+    # トークンが足りる
+    (3.0, 0.0, 0.0, 2.0, 5, 1, (2.0, 0.0)),
+    # 経過時間分を補充(burstが上限)
+    (0.0, 0.0, 1.0, 2.0, 5, 1, (1.0, 0.0)),
+    (0.0, 0.0, 10.0, 2.0, 5, 1, (4.0, 0.0)),
+    # 足りない分は負になり, 0に戻るまで待つ
+    (0.0, 0.0, 0.0, 2.0, 5, 1, (-1.0, 0.5)),
+    (-1.0, 0.0, 0.0, 2.0, 5, 1, (-2.0, 1.0)),
+    # 時計が戻った場合は補充しない
+    (1.0, 5.0, 4.0, 2.0, 5, 1, (0.0, 0.0)),
+])
+def test_reserve(tokens, last, now, rate, burst, n, expected):
+    assert _reserve(tokens, last, now, rate, burst, n) == pytest.approx(expected)
+
+@pytest.mark.parametrize('cls, args', [(TokenBucket, ()), (FileTokenBucket, ('bucket',))])
+def test_invalid_arguments(cls, args, tmp_path):
+    args = tuple(str(tmp_path / a) for a in args)
+    with pytest.raises(ValueError):
+        cls(*args, rate=0)
+    with pytest.raises(ValueError):
+        cls(*args, rate=1, burst=0)
+
+def _max_in_window(times, window):
+    times = sorted(times)
+    return max(sum(1 for u in times[i:] if u < t + window) for i, t in enumerate(times))
+
+#%%
+def test_token_bucket_rate_across_threads():
+    rate, burst = 20, 5
+    bucket = TokenBucket(rate, burst)
+    times = []
+    start = time.monotonic()
+    with ThreadPoolExecutor(4) as executor:
+        for _ in executor.map(lambda i: (bucket.acquire(), times.append(time.monotonic())), range(25)):
+            pass
+    elapsed = time.monotonic() - start
+    # 最初のburst個はすぐ, 残りは1/rate秒ごと
+    assert elapsed >= (25 - burst) / rate * 0.9
+    assert elapsed < (25 - burst) / rate + 1.0
+    assert sum(1 for t in times if t - start < 0.2) >= burst
+    assert _max_in_window(times, 0.5) <= burst + rate * 0.5 + 1
+
+#%%
+CHILD = '''
+import sys, time
+from fpy_datareader.ratelimit import FileTokenBucket
+path, rate, n, start = sys.argv[1], float(sys.argv[2]), int(sys.argv[3]), float(sys.argv[4])
+bucket = FileTokenBucket(path, rate=rate, burst=1)
+time.sleep(max(0.0, start - time.time()))
+for _ in range(n):
+    bucket.acquire()
+    print(time.time(), flush=True)
+'''
+
+def test_file_token_bucket_shared_across_processes(tmp_path):
+    rate, n, n_procs = 20, 10, 3
+    path = str(tmp_path / 'estat.bucket')
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    # すべてのプロセスが起動してから同時に取得を始める
+    start = time.time() + 1.0
+    procs = [subprocess.Popen([sys.executable, '-c', CHILD, path, str(rate), str(n), repr(start)], 
+                              stdout=subprocess.PIPE, env=env, universal_newlines=True) 
+             for _ in range(n_procs)]
+    times = []
+    for proc in procs:
+        out, _ = proc.communicate(timeout=60)
+        assert proc.returncode == 0
+        times += [float(line) for line in out.split()]
+    assert len(times) == n * n_procs
+    # 共有しない場合はプロセス数倍の速さになる
+    assert max(times) - min(times) >= (n * n_procs - 1) / rate * 0.9
+    assert _max_in_window(times, 0.5) <= 1 + rate * 0.5 + 1